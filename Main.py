@@ -1,36 +1,62 @@
 import os
+import time
+
+STARTUP_BEGAN = time.perf_counter_ns()  # Before the imports, for --startup-time
+
 import warnings
-import requests
-import pyedflib
 import weakref
 import numpy as np
 import pyqtgraph as pg
 import tempfile
 import shutil
-import datetime
 
-from scipy.interpolate import interp1d
+from signal_processing import (DERIVED_TRACES, GAP_FILL_METHODS, ResampleCache, StatisticsCache, bridge_signals,
+                               crossfade_overlap, estimate_lag, find_best_splice, minmax_decimate, signal_statistics)
 
 from PyQt5 import QtCore, QtGui, QtWidgets
 from PyQt5.QtCore import QRect, QSize, Qt, QCoreApplication, QMetaObject, QTimer
 from PyQt5.QtGui import QCursor, QFont
 from PyQt5.QtWidgets import (
     QDialog, QLabel, QPushButton, QColorDialog, QSlider, QComboBox,
-    QFileDialog, QVBoxLayout, QMainWindow, QWidget, QHBoxLayout, QLineEdit, QFormLayout
+    QFileDialog, QVBoxLayout, QMainWindow, QWidget, QHBoxLayout, QLineEdit, QFormLayout, QSpinBox
 )
 
-from matplotlib.animation import FuncAnimation
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-from matplotlib.widgets import RectangleSelector
-import matplotlib.pyplot as plt
+# matplotlib, pyEDFlib, requests, scipy and reportlab are imported by the pages and features that use them, so
+# starting the viewer and opening the rectangular page does not pay for them
 
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch
+from reporting import ReportBuilder, format_statistics, report_trace, signal_digest
+from session_store import SessionStore
+from signal_io import (STORAGE_POLICIES, UniformTime, load_time_series, read_edf_signal, set_storage_policy,
+                       store_signal)
+from instrumentation import FrameStats, StartupTimer, tracer
+from workspace import WORKSPACE_EXTENSION, Workspace, WorkspaceWriter, check_source, source_reference
+from realtime_dsp import (FILTER_PRESETS, AnomalyScorer, AnomalyTracker, BeatTracker, FilterChain, PlaybackFilter,
+                          StreamingSpectrogram, sample_rate, window_features)
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
+# Statistics of saved signals, keyed by content digest so every version is only computed once
+statistics_cache = StatisticsCache()
+# Signals resampled onto the grid of another signal, the rates detected from time columns, summary indexes
+# and derived traces
+resample_cache = ResampleCache()
+# Window of the derived traces drawn over the rectangular graphs, in seconds
+DERIVED_TRACE_WINDOW = 0.2
+# Points sent to a curve for the visible part of a signal on an implicit time axis (min/max per pixel column)
+VISIBLE_POINTS = 4000
+# File types of "Save Workspace": samples stored raw (memory-mapped on restore), compressed, or as references
+# to their source files
+WORKSPACE_FILTERS = {f"Workspace (*{WORKSPACE_EXTENSION})": 'raw',
+                     f"Compressed workspace (*{WORKSPACE_EXTENSION})": 'compressed',
+                     f"Workspace referencing the source files (*{WORKSPACE_EXTENSION})": 'references'}
+
+# Glue sessions saved with "Save Data", kept in a local database until "Get Report" includes them
+global_saved_sessions = SessionStore()
+
+# Duration, jitter and dropped frames of the timer-driven callbacks, shown with F3 and dumped every
+# SIGNAL_VIEWER_FRAME_DUMP seconds (to SIGNAL_VIEWER_FRAME_DUMP_FILE as JSON Lines, or printed)
+frame_stats = FrameStats()
+
 
 class ReplaceSignalDialog(QDialog):
     def __init__(self, parent=None):
@@ -319,14 +345,56 @@ class ColorPickerDialog(QDialog):
         self.main_window.canvas.draw_idle()  # Redraw the canvas with updated colors
 
 
+class ReportWorker(QtCore.QThread):
+    """
+    Write a report on a background thread, reporting progress to the GUI thread.
+    """
+    progress = QtCore.pyqtSignal(int, int)
+    report_ready = QtCore.pyqtSignal(str)
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, builder, store, total):
+        """
+        Args:
+            builder: The ReportBuilder writing the PDF.
+            store: The SessionStore whose pending sessions are included.
+            total: Number of entries in the pending sessions.
+        """
+        # Owned by the application so a closed glue window cannot destroy a running thread
+        super().__init__(QtWidgets.QApplication.instance())
+        self.builder = builder
+        self.store = store
+        self.total = total
+
+    def run(self):
+        try:
+            reported = []  # Ids of the sessions drawn, marked reported only once the PDF is saved
+
+            def sessions():
+                for session in self.store.drain():
+                    reported.append(session['id'])
+                    yield session
+
+            path = self.builder.build(sessions(), self.total, lambda done, total: self.progress.emit(done, total))
+            self.store.mark_reported(reported)
+            self.report_ready.emit(path)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
 class GlueSignalsWindow(QMainWindow):
-    def __init__(self, signal1, signal2, parent=None):  # Allow a generic parent
+    PREVIEW_POINTS = 4000  # Maximum number of points drawn per preview curve
+    SPLICE_SEARCH = 0.05  # Seconds searched on each side of both boundaries by Snap Splice
+    SPLICE_SEARCH_SAMPLES = 64  # Samples searched instead when the sampling rate is not known
+
+    def __init__(self, signal1, signal2, parent=None, rate=None):  # Allow a generic parent
         """
         Initialize the GlueSignalsWindow for selecting and gluing signal portions.
         Args:
             signal1: The first signal as a numpy array.
             signal2: The second signal as a numpy array.
             parent: The parent window (typically an instance of QMainWindow or None).
+            rate: Sampling rate of both signals in Hz, or None if it is not known.
         """
         super().__init__(parent)  # Initialize with the parent if provided
         self.parent_window = weakref.ref(parent) if parent else None  # Store a weak reference to the parent
@@ -346,10 +414,22 @@ class GlueSignalsWindow(QMainWindow):
         # Convert signals to numpy arrays (if not already)
         self.signal1 = np.array(signal1)
         self.signal2 = np.array(signal2)
+        self.rate = rate
         self.glued_signal = None  # Initialize a placeholder for the glued signal
+        self.signal_digests = None  # Content hashes of signal1 and signal2, computed on the first save
+        self.report_worker = None  # Thread writing the report, if one is being generated
+        self.glue_parts = None  # Portions and join of the latest glue
+        self.preview_keys = {}  # Ranges currently shown by the preview curves
+
+        # Coalesce region and control changes into at most one preview update per frame
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(16)
+        self.preview_timer.timeout.connect(self.on_preview_timeout)
 
         # Set up the user interface
         self.setup_ui()
+        self.schedule_glue_preview()
 
         # Debug message for initialization
         print("GlueSignalsWindow initialized.")
@@ -359,256 +439,303 @@ class GlueSignalsWindow(QMainWindow):
         Perform the glue operation based on selected regions and user input.
         """
         try:
-            # Ensure regions are defined
-            if not hasattr(self, 'region1') or not hasattr(self, 'region2'):
-                raise ValueError("Regions for the signals are not properly defined.")
+            self.preview_timer.stop()  # Any pending preview is covered by this update
+            self.refresh_glue_preview()
+            print("Glued signal plotted with distinct colors.")
 
-            # Get selected regions from both signals
-            start1, end1 = map(int, self.region1.getRegion())
-            start2, end2 = map(int, self.region2.getRegion())
+        except Exception as e:
+            self.show_error_message(f"Error during glue operation: {e}")
 
-            # Extract portions of the signals
-            signal1_portion = self.signal1[start1:end1]
-            signal2_portion = self.signal2[start2:end2]
+    def schedule_glue_preview(self, *args):
+        """
+        Request a live preview update. All changes made within one frame are coalesced into a single update.
+        """
+        if not self.preview_timer.isActive():
+            self.preview_timer.start()
 
-            # Get gap and interpolation order from user input
-            gap = self.gap_slider.value()  # Using QSlider for gap
-            self.gap_slider_value.setText(f"Gap: {gap}")
-            interpolation_order = int(self.interpolation_combo.currentText())  # Using QComboBox for interpolation order
+    def on_preview_timeout(self):
+        """
+        Run a coalesced preview update. Errors are only logged so that dragging is never interrupted by dialogs.
+        """
+        try:
+            self.refresh_glue_preview()
+        except Exception as e:
+            print(f"Error updating glue preview: {e}")
 
-            # Generate the gap signal with interpolation
-            gap_signal = self.interpolate_gap(
-                np.linspace(signal1_portion[-1], signal2_portion[0], gap + 2),
-                interpolation_order
-            )
+    @tracer.traced('glue')
+    def refresh_glue_preview(self):
+        """
+        Recompute the glue for the current regions and update the glued plot incrementally.
 
-            # Glue the signals
-            glued_signal = np.concatenate([signal1_portion, gap_signal, signal2_portion])
-            self.glued_signal = glued_signal  # Store the glued signal
+        The portions are taken as views of the original signals and only the join between them is synthesized.
+        A portion is decimated and re-sent to its curve only when its own range changed; moving the join only
+        shifts the Signal 2 curve. The full glued signal is assembled on demand by get_glued_signal().
+        """
+        # Ensure regions are defined
+        if not hasattr(self, 'region1') or not hasattr(self, 'region2'):
+            raise ValueError("Regions for the signals are not properly defined.")
 
-            # Generate x-axis ranges for each segment
-            x_signal1 = np.arange(len(signal1_portion))
-            x_gap = np.arange(len(signal1_portion), len(signal1_portion) + len(gap_signal))
-            x_signal2 = np.arange(len(signal1_portion) + len(gap_signal),
-                                  len(signal1_portion) + len(gap_signal) + len(signal2_portion))
+        # Get selected regions from both signals, clipped to the signal bounds
+        start1, end1 = np.clip(np.array(self.region1.getRegion(), dtype=int), 0, len(self.signal1))
+        start2, end2 = np.clip(np.array(self.region2.getRegion(), dtype=int), 0, len(self.signal2))
 
-            # Clear the glued signal plot widget
-            self.glued_plot_widget.clear()
+        # Extract portions of the signals
+        signal1_portion = self.signal1[start1:end1]
+        signal2_portion = self.signal2[start2:end2]
 
-            # Plot Signal 1 in blue
-            self.glued_plot_widget.plot(x_signal1, signal1_portion, pen=pg.mkPen(color="b", width=2))
+        # Get gap, gap fill method and context length from user input
+        gap = self.gap_slider.value()  # Using QSlider for gap
+        self.gap_slider_value.setText(f"Gap: {gap}")
+        method = self.interpolation_combo.currentText().lower()  # Using QComboBox for the gap fill method
+        context = self.context_spin.value()
 
-            # Plot gap in white
-            self.glued_plot_widget.plot(x_gap, gap_signal, pen=pg.mkPen(color="w", width=2))
+        overlap = min(self.crossfade_spin.value(), len(signal1_portion), len(signal2_portion))
+        if overlap > 0:
+            # Overlap the portions with a cross-fade instead of inserting a gap
+            split = len(signal1_portion) - overlap
+            gap_signal = crossfade_overlap(signal1_portion[split:], signal2_portion[:overlap])
+            signal1_portion, signal2_portion = signal1_portion[:split], signal2_portion[overlap:]
+        else:
+            # Synthesize the gap from the samples on both sides of the join
+            gap_signal = self.interpolate_gap(signal1_portion, signal2_portion, gap, method, context)
 
-            # Plot Signal 2 in green
-            self.glued_plot_widget.plot(x_signal2, signal2_portion, pen=pg.mkPen(color="g", width=2))
+        # The glued signal is only assembled when it is needed
+        self.glue_parts = (signal1_portion, gap_signal, signal2_portion)
+        self.glued_signal = None
 
-            print("Glued signal plotted with distinct colors.")
+        # Signal 1 in blue, only re-sent when its range changed
+        key1 = (start1, end1, overlap)
+        if self.preview_keys.get('signal1') != key1:
+            self.glue_curves['signal1'].setData(*minmax_decimate(signal1_portion, self.PREVIEW_POINTS))
+            self.preview_keys['signal1'] = key1
+
+        # Gap in white, always recomputed since it depends on both portions
+        x_gap, y_gap = minmax_decimate(gap_signal, self.PREVIEW_POINTS)
+        self.glue_curves['gap'].setData(x_gap + len(signal1_portion), y_gap)
+
+        # Signal 2 in green: a moved join only shifts the existing curve
+        key2 = (start2, end2, overlap)
+        if self.preview_keys.get('signal2') != key2:
+            self.glue_curves['signal2'].setData(*minmax_decimate(signal2_portion, self.PREVIEW_POINTS))
+            self.preview_keys['signal2'] = key2
+        self.glue_curves['signal2'].setPos(len(signal1_portion) + len(gap_signal), 0)
+
+    def get_glued_signal(self):
+        """
+        Assemble the glued signal from the parts of the latest glue.
+        Returns:
+            The glued signal as a numpy array, or None if nothing has been glued yet.
+        """
+        if self.glued_signal is None and self.glue_parts is not None:
+            self.glued_signal = np.concatenate(self.glue_parts)
+        return self.glued_signal
+
+    def snap_to_best_splice(self):
+        """
+        Move the end of region 1 and the start of region 2 to the nearby splice that best continues Signal 1
+        into Signal 2, then glue again.
+        """
+        try:
+            start1, end1 = map(int, self.region1.getRegion())
+            start2, end2 = map(int, self.region2.getRegion())
+
+            # Search a short window around each boundary: the join should only move by a fraction of a beat
+            if self.rate:
+                radius = max(1, int(round(self.SPLICE_SEARCH * self.rate)))
+            else:
+                radius = self.SPLICE_SEARCH_SAMPLES
+            new_end1, new_start2, score = find_best_splice(self.signal1, end1, self.signal2, start2, radius=radius)
+
+            # Keep the regions non-empty
+            new_end1 = max(new_end1, start1 + 1)
+            new_start2 = min(new_start2, end2 - 1)
+
+            self.region1.setRegion((start1, new_end1))
+            self.region2.setRegion((new_start2, end2))
+            print(f"Snapped splice to Signal 1 end {new_end1} and Signal 2 start {new_start2} (score {score:.3f}).")
+
+            self.perform_glue()
 
         except Exception as e:
-            self.show_error_message(f"Error during glue operation: {e}")
+            self.show_error_message(f"Error finding the best splice: {e}")
 
-    def interpolate_gap(self, gap_signal, order):
+    def interpolate_gap(self, signal1_portion, signal2_portion, gap, method, context=16):
         """
-        Smooth the gap using robust interpolation.
+        Synthesize the gap between two signal portions from the context on both sides of the join.
         Args:
-            gap_signal: The signal data for the gap.
-            order: The interpolation order (1 for linear, 2 for quadratic, 3 for cubic).
+            signal1_portion: The portion placed before the gap.
+            signal2_portion: The portion placed after the gap.
+            gap: Number of samples to synthesize.
+            method: The gap fill method ('linear', 'pchip', 'cubic' or 'ar').
+            context: Number of samples taken from each portion to fit the bridge.
         Returns:
-            The interpolated gap signal.
+            The synthesized gap samples.
         """
         try:
-            # Ensure gap_signal is valid
-            gap_signal = np.array(gap_signal)
-            if len(gap_signal) < 2:
-                print("Insufficient data for interpolation. Returning original gap signal.")
-                return gap_signal
-
-            # Create x values for the gap
-            x = np.linspace(0, len(gap_signal) - 1, len(gap_signal))
-
-            # Define interpolation kinds
-            interpolation_kinds = {1: 'linear', 2: 'quadratic', 3: 'cubic'}
-            kind = interpolation_kinds.get(order, 'linear')
-
-            # Ensure sufficient points for quadratic or cubic interpolation
-            if kind == 'quadratic' and len(x) < 3:
-                print("Insufficient points for quadratic interpolation. Falling back to linear.")
-                kind = 'linear'
-            elif kind == 'cubic' and len(x) < 4:
-                print("Insufficient points for cubic interpolation. Falling back to linear.")
-                kind = 'linear'
-
-            # Perform interpolation
-            interpolator = interp1d(x, gap_signal, kind=kind, fill_value="extrapolate")
-            interpolated_signal = interpolator(np.arange(len(gap_signal)))
+            if len(signal1_portion) == 0 or len(signal2_portion) == 0:
+                print("Empty signal portion. Returning an empty gap.")
+                return np.empty(0)
+
+            gap_signal = bridge_signals(signal1_portion, signal2_portion, gap, method=method, context=context)
 
             # Check for NaN values in interpolated result
-            if np.isnan(interpolated_signal).any():
-                print("NaN values detected in interpolated signal. Returning original gap signal.")
-                return gap_signal
+            if np.isnan(gap_signal).any():
+                raise ValueError("NaN values detected in the synthesized gap")
 
-            return interpolated_signal
+            return gap_signal
 
         except Exception as e:
-            print(f"Error during interpolation: {e}. Returning original gap signal.")
-            return gap_signal
+            print(f"Error during interpolation: {e}. Falling back to a linear gap.")
+            return np.linspace(signal1_portion[-1], signal2_portion[0], gap + 2)[1:-1]
 
+    @tracer.traced('report')
     def save_data(self):
         """
-        Save snapshots and statistics of signals to arrays, avoiding duplicates for Signal 1 and Signal 2,
-        but allowing multiple glued signals if they are different.
+        Save report traces and statistics of signals to the session index, avoiding duplicates for Signal 1 and
+        Signal 2, but allowing multiple glued signals if they are different.
         """
         try:
-            # Prepare current signal data for saving
-            current_snapshot = {
-                'Signal 1': self.capture_snapshot(self.signal1, "blue"),
-                'Signal 2': self.capture_snapshot(self.signal2, "green")
-            }
-            current_stats = {
-                'Signal 1': self.calculate_statistics(self.signal1),
-                'Signal 2': self.calculate_statistics(self.signal2)
-            }
-
-            # Check if the current signals (Signal 1 and Signal 2) have already been saved
-            def is_duplicate():
-                for prev in global_saved_snapshots:
-                    if (np.array_equal(prev['Signal 1'], self.signal1) and
-                            np.array_equal(prev['Signal 2'], self.signal2)):
-                        return True
-                return False
-
-            if not is_duplicate():
-                # If not duplicates, proceed to handle and save glued signals
-                if self.glued_signal is not None:
-                    if isinstance(self.glued_signal, list):
-                        for index, glued in enumerate(self.glued_signal):
-                            key = f'Glued Signal {index + 1}'
-                            current_snapshot[key] = self.capture_snapshot(glued, f"red{index + 1}")
-                            current_stats[key] = self.calculate_statistics(glued)
-                    else:
-                        # Single glued signal scenario
-                        current_snapshot['Glued Signal'] = self.capture_snapshot(self.glued_signal, "red")
-                        current_stats['Glued Signal'] = self.calculate_statistics(self.glued_signal)
-
-                # Append the snapshot and statistics data to the global arrays
-                global_saved_snapshots.append(current_snapshot)
-                global_saved_statistics.append(current_stats)
+            # Signals are identified by content hashes, so duplicate checks are dictionary lookups
+            if self.signal_digests is None:
+                self.signal_digests = (signal_digest(self.signal1), signal_digest(self.signal2))
+            digest1, digest2 = self.signal_digests
+
+            session = global_saved_sessions.find(digest1, digest2)
+            if session is None:
+                session = global_saved_sessions.add_session(digest1, digest2, {
+                    'Signal 1': self.create_entry(self.signal1, "blue", digest1),
+                    'Signal 2': self.create_entry(self.signal2, "green", digest2)
+                })
                 print("Data saved successfully.")
             else:
-                # Notify if duplicates are found and not saved
-                print("Duplicate Signal 1 and Signal 2 found, not saving.")
+                # Notify that Signal 1 and Signal 2 are not saved again
+                print("Duplicate Signal 1 and Signal 2 found, only saving new glued signals.")
+
+            # Save the glued signal unless an identical one is already part of the session
+            glued_signal = self.get_glued_signal()
+            if glued_signal is not None:
+                glued_digest = signal_digest(glued_signal)
+                name = global_saved_sessions.add_glued(
+                    session, glued_digest, lambda: self.create_entry(glued_signal, "red", glued_digest))
+                if name:
+                    print(f"{name} saved successfully.")
+                else:
+                    print("Duplicate glued signal found, not saving.")
         except Exception as e:
             print(f"Error saving data: {e}")
 
-    def capture_snapshot(self, signal, color):
+    def create_entry(self, signal, color, digest):
         """
-        Capture a snapshot of a signal with unique naming to prevent overwrites.
+        Create the saved entry of a signal.
+        Args:
+            signal: The signal data as a numpy array.
+            color: The line color of its report plot.
+            digest: The signal_digest of the signal.
+        Returns:
+            A dictionary with the digest, color, report trace and statistics of the signal.
         """
-        timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-        filename = f"signal_{color}_{timestamp}_snapshot.png"
-        snapshot_path = os.path.join(tempfile.gettempdir(), filename)
-        plt.figure()
-        plt.plot(signal, color=color)
-        plt.title(f"Signal {color.title()}")
-        plt.savefig(snapshot_path)
-        plt.close()
-        return snapshot_path
+        return {
+            'digest': digest,
+            'color': color,
+            'trace': report_trace(signal),
+            'statistics': self.calculate_statistics(signal, digest),
+        }
 
+    @tracer.traced('report')
     def generate_report(self):
         """
-        Generate a professional report with snapshots and statistics for all saved Signal 1, Signal 2,
-        and any glued signals. Uses either from live data or from previously saved data arrays.
+        Generate a professional report with plots and statistics for all saved Signal 1, Signal 2,
+        and any glued signals. The report is written on a worker thread and opened when it is ready.
         """
         try:
+            if self.report_worker is not None:
+                print("A report is already being generated.")
+                return
+
+            total = global_saved_sessions.count_entries()
+            if total == 0:
+                self.show_error_message("No saved data. Press Save Data before generating a report.")
+                return
+
             report_path = os.path.join(tempfile.gettempdir(), "Signal_Statistics_Report_Professional.pdf")
-            c = canvas.Canvas(report_path, pagesize=letter)
-            width, height = letter
-            margin = 0.7 * inch
-            content_width = width - 2 * margin
-            line_spacing = 0.2 * inch
-
-            # Set up the document title and subtitle
-            c.setFont("Times-Bold", 20)
-            c.drawCentredString(width / 2, height - 1 * inch, "Signal Statistics Report")
-            c.setFont("Times-Italic", 14)
-            c.drawCentredString(width / 2, height - 1.3 * inch, "Generated by Signal Viewer Application")
-
-            y_position = height - 1.8 * inch
-
-            # Check if there is saved data
-            while global_saved_snapshots and global_saved_statistics:
-                snapshots = global_saved_snapshots.pop(0)
-                statistics = global_saved_statistics.pop(0)
-
-                # Write statistics and add snapshots for each signal
-                for signal_name, stats in statistics.items():
-                    if stats:
-                        c.setStrokeColorRGB(0, 0, 0)
-                        c.setLineWidth(1)
-                        c.setDash(3, 3)
-                        c.rect(margin, y_position - 4.5 * inch, content_width, 4.4 * inch, stroke=True, fill=False)
-
-                        text_x = margin + 0.2 * inch
-                        text_y = y_position - 0.5 * inch
-                        c.setFont("Times-Bold", 12)
-                        c.drawString(text_x, text_y, signal_name)
-                        text_y -= line_spacing
-
-                        c.setFont("Times-Roman", 11)
-                        for key, value in stats.items():
-                            if value is not None:
-                                c.drawString(text_x, text_y, f"{key}: {value}")
-                                text_y -= line_spacing
-
-                        if signal_name in snapshots:
-                            image_x = width - margin - 4 * inch
-                            c.drawImage(
-                                snapshots[signal_name],
-                                image_x,
-                                y_position - 4 * inch,
-                                width=3.8 * inch,
-                                height=3.8 * inch,
-                            )
-
-                        y_position -= 5 * inch
-                        if y_position < 5 * inch:
-                            c.showPage()
-                            y_position = height - margin
-
-            # Finalize the PDF and open it
-            c.save()
-            print(f"Professional report generated at: {report_path}")
-            os.system(f"open '{report_path}'")
+
+            # Go through every pending session on the worker thread; they are kept if the report fails
+            self.report_worker = ReportWorker(ReportBuilder(report_path), global_saved_sessions, total)
+            self.report_worker.progress.connect(self.on_report_progress)
+            self.report_worker.report_ready.connect(self.on_report_ready)
+            self.report_worker.failed.connect(self.on_report_failed)
+            self.report_worker.finished.connect(self.report_worker.deleteLater)
+            self.get_report_button.setEnabled(False)
+            self.report_worker.start()
 
         except Exception as e:
             self.show_error_message(f"Error generating report: {e}")
 
-    def calculate_statistics(self, signal):
+    def on_report_progress(self, done, total):
+        """Show the report progress on the Get Report button."""
+        self.get_report_button.setText(f"Report {100 * done // max(total, 1)}%")
+
+    def on_report_ready(self, report_path):
+        """Open the finished report with the system viewer."""
+        self.reset_report_button()
+        print(f"Professional report generated at: {report_path}")
+        QtGui.QDesktopServices.openUrl(QtCore.QUrl.fromLocalFile(report_path))
+
+    def on_report_failed(self, message):
+        """Report an error raised while writing the report."""
+        self.reset_report_button()
+        self.show_error_message(f"Error generating report: {message}")
+
+    def reset_report_button(self):
+        """Make the Get Report button available again."""
+        self.report_worker = None
+        self.get_report_button.setText("Get Report")
+        self.get_report_button.setEnabled(True)
+
+    @tracer.traced('stats')
+    def calculate_statistics(self, signal, digest=None):
         """
-        Calculate basic statistics for a given signal.
+        Calculate the statistics of a given signal in a single chunked pass.
         Args:
             signal: The signal data as a numpy array.
+            digest: The signal_digest of the signal; when given, the result is cached for this signal version.
         Returns:
-            A dictionary containing mean, std, min, max, and duration of the signal.
+            A dictionary containing mean, std, RMS, min, max, peak-to-peak, percentiles, zero-crossing rate
+            and duration of the signal.
         """
         if signal is None or len(signal) == 0:
             return {
                 "mean": "N/A",
                 "std": "N/A",
+                "rms": "N/A",
                 "min": "N/A",
                 "max": "N/A",
+                "peak_to_peak": "N/A",
+                "p5": "N/A",
+                "median": "N/A",
+                "p95": "N/A",
+                "zero_crossing_rate": "N/A",
                 "duration": "N/A",
             }
 
-        return {
-            "mean": round(np.mean(signal), 2),
-            "std": round(np.std(signal), 2),
-            "min": round(np.min(signal), 2),
-            "max": round(np.max(signal), 2),
-            "duration": len(signal),  # Assuming duration is the number of data points
-        }
+        if digest is not None:
+            stats = statistics_cache.get(signal, digest)
+        else:
+            stats = signal_statistics(signal)
+
+        return format_statistics(stats, len(signal))
+
+    def update_selection_statistics(self, region, signal, label):
+        """
+        Show the statistics of the samples selected by a region.
+        Args:
+            region: The LinearRegionItem selecting sample indices.
+            signal: The signal data shown under the region.
+            label: The QLabel showing the statistics.
+        """
+        start, end = region.getRegion()
+        stats = resample_cache.summary_index(signal).query(np.ceil(start), np.floor(end) + 1)
+        label.setText(format_range_statistics(stats))
 
     def close_and_unglue(self):
         """
@@ -657,6 +784,17 @@ class GlueSignalsWindow(QMainWindow):
         self.glued_plot_widget.setBackground("k")  # Set background color to black
         main_layout.addWidget(self.glued_plot_widget)
 
+        # Persistent curves for Signal 1 (blue), the gap (white) and Signal 2 (green)
+        self.glue_curves = {
+            'signal1': self.glued_plot_widget.plot([], [], pen=pg.mkPen(color="b", width=2)),
+            'gap': self.glued_plot_widget.plot([], [], pen=pg.mkPen(color="w", width=2)),
+            'signal2': self.glued_plot_widget.plot([], [], pen=pg.mkPen(color="g", width=2)),
+        }
+
+        # Update the preview live while the regions are dragged
+        self.region1.sigRegionChanged.connect(self.schedule_glue_preview)
+        self.region2.sigRegionChanged.connect(self.schedule_glue_preview)
+
         # Add control buttons and input fields
         self.add_controls(main_layout)
 
@@ -673,13 +811,24 @@ class GlueSignalsWindow(QMainWindow):
         button_layout = QHBoxLayout()
         input_layout = QHBoxLayout()  # For horizontal alignment of input fields
 
-        # Add input fields for gap and interpolation order
-        interpolation_label = self.create_label("Interpolation Order:")
+        # Add input fields for the gap fill method and the context length
+        interpolation_label = self.create_label("Gap Fill:")
         self.interpolation_combo = QComboBox()
-        self.interpolation_combo.addItems(['1', '2', '3'])  # Add options for linear, quadratic, and cubic interpolation
+        self.interpolation_combo.addItems([method.upper() if method in ('ar', 'pchip') else method.title()
+                                           for method in GAP_FILL_METHODS])  # Linear, PCHIP, Cubic and AR bridges
+        self.interpolation_combo.setCurrentText("PCHIP")
+        self.interpolation_combo.currentTextChanged.connect(self.schedule_glue_preview)
         input_layout.addWidget(interpolation_label)
         input_layout.addWidget(self.interpolation_combo)
 
+        context_label = self.create_label("Context:")
+        self.context_spin = QSpinBox()
+        self.context_spin.setRange(2, 512)  # Samples taken from each side of the join
+        self.context_spin.setValue(16)
+        self.context_spin.valueChanged.connect(self.schedule_glue_preview)
+        input_layout.addWidget(context_label)
+        input_layout.addWidget(self.context_spin)
+
         gap_label = self.create_label("Gap:")
         self.gap_slider = QSlider(Qt.Horizontal)
         self.gap_slider.setMinimum(1)  # Set minimum value
@@ -687,7 +836,7 @@ class GlueSignalsWindow(QMainWindow):
         self.gap_slider.setTickInterval(5)  # Set tick interval
         self.gap_slider.setMaximumWidth(700)
         self.gap_slider.setTickPosition(QSlider.TicksBelow)
-        self.gap_slider.valueChanged.connect(self.perform_glue)
+        self.gap_slider.valueChanged.connect(self.schedule_glue_preview)
 
         self.gap_slider_value = self.create_label('')
         self.gap_slider_value.setMaximumSize(150, 100)
@@ -696,9 +845,18 @@ class GlueSignalsWindow(QMainWindow):
         input_layout.addWidget(self.gap_slider)
         input_layout.addWidget(self.gap_slider_value)
 
+        crossfade_label = self.create_label("Cross-fade:")
+        self.crossfade_spin = QSpinBox()
+        self.crossfade_spin.setRange(0, 10000)  # Overlapping samples, 0 inserts the gap instead
+        self.crossfade_spin.valueChanged.connect(self.schedule_glue_preview)
+        input_layout.addWidget(crossfade_label)
+        input_layout.addWidget(self.crossfade_spin)
+
         # Add Glue, Cancel, and Get Report buttons
         back_button = self.create_button("Back", self.close_and_unglue)
         back_button.setFixedSize(150, 40)  # Adjust button size
+        snap_button = self.create_button("Snap Splice", self.snap_to_best_splice)
+        snap_button.setFixedSize(150, 40)  # Adjust button size
         save_data_button = self.create_button("Save Data", self.save_data)
         save_data_button.setFixedSize(150, 40)  # Adjust button size
         get_report_button = self.create_button("Get Report", self.generate_report)
@@ -706,6 +864,7 @@ class GlueSignalsWindow(QMainWindow):
 
         # Add buttons to the button layout
         button_layout.addWidget(back_button)
+        button_layout.addWidget(snap_button)
         button_layout.addWidget(save_data_button)
         button_layout.addWidget(get_report_button)  # Add Get Report button
 
@@ -767,6 +926,12 @@ class GlueSignalsWindow(QMainWindow):
         plot.addItem(region)
         layout.addWidget(plot)
 
+        # Statistics of the selection, answered from the block summary index while the region is dragged
+        selection_label = self.create_label('')
+        layout.addWidget(selection_label)
+        region.sigRegionChanged.connect(lambda: self.update_selection_statistics(region, signal, selection_label))
+        self.update_selection_statistics(region, signal, selection_label)
+
         # Store the region item for further use
         if title == "Signal 1 Portion":
             self.region1 = region
@@ -774,6 +939,115 @@ class GlueSignalsWindow(QMainWindow):
             self.region2 = region
 
 
+def format_range_statistics(stats):
+    """
+    Format the statistics of a selection, as returned by BlockSummaryIndex.query, on a single line.
+    """
+    if stats is None:
+        return "Selection: empty"
+    return (f"Selection: {stats['count']} samples | Mean: {stats['mean']:.4g} | Std: {stats['std']:.4g} | "
+            f"RMS: {stats['rms']:.4g} | Min: {stats['min']:.4g} | Max: {stats['max']:.4g}")
+
+
+class FrameStatsHUD(QLabel):
+    """
+    Overlay in the top right corner of a window showing the frame statistics of the playback callbacks.
+    """
+
+    def __init__(self, parent, refresh_ms=500):
+        super().__init__(parent)
+        self.setFont(QFont("Courier New", 9))
+        self.setStyleSheet("QLabel { background-color: rgb(20, 20, 20); color: rgb(147, 247, 167); "
+                           "border: 1px solid rgb(147, 247, 167); padding: 4px; }")
+        self.setAttribute(Qt.WA_StyledBackground)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(refresh_ms)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def toggle(self):
+        """Show or hide the overlay; it is only refreshed while shown."""
+        if self.isVisible():
+            self.refresh_timer.stop()
+            self.hide()
+        else:
+            self.refresh()
+            self.show()
+            self.raise_()
+            self.refresh_timer.start()
+
+    def refresh(self):
+        self.setText(frame_stats.report())
+        self.adjustSize()
+        self.move(self.parentWidget().width() - self.width() - 180, 80)  # Below the header, left of the buttons
+
+
+class SpectrumPanel(pg.GraphicsLayoutWidget):
+    """
+    Spectrogram and Welch power spectral density of a playing signal, updated from the newly revealed samples.
+    """
+
+    def __init__(self, nperseg=256, hop=64, columns=256):
+        super().__init__()
+        self.setBackground("k")
+        self.nperseg = nperseg
+        self.hop = hop
+        self.columns = columns
+        self.spectrogram = None  # StreamingSpectrogram of the current signal
+        self.source = None  # Amplitude data being analyzed
+        self.position = 0  # Index of the next sample to analyze
+
+        # Spectrogram on top: time on the x axis, frequency on the y axis
+        self.spectrogram_plot = self.addPlot(title="Spectrogram")
+        self.spectrogram_plot.setLabel("left", "Frequency (Hz)")
+        self.image_item = pg.ImageItem()
+        self.image_item.setLookupTable(pg.colormap.get("viridis").getLookupTable())
+        self.spectrogram_plot.addItem(self.image_item)
+        self.nextRow()
+
+        # Power spectral density below
+        self.psd_plot = self.addPlot(title="PSD (Welch)")
+        self.psd_plot.setLabel("bottom", "Frequency (Hz)")
+        self.psd_plot.setLogMode(y=True)
+        self.psd_curve = self.psd_plot.plot([], [], pen=pg.mkPen('c', width=2))
+
+    def update_spectrum(self, time_data, amplitude_data, end_index):
+        """
+        Analyze the samples of a signal revealed up to end_index since the last call.
+        Args:
+            time_data: The time data for the signal.
+            amplitude_data: The amplitude data for the signal.
+            end_index: Index of the last revealed sample plus one.
+        """
+        if self.source is not amplitude_data or end_index < self.position:
+            # New signal or playback went back: restart, catching up only with what the display can show
+            self.spectrogram = StreamingSpectrogram(sample_rate(time_data), self.nperseg, self.hop, self.columns)
+            self.source = amplitude_data
+            self.position = max(0, end_index - self.columns * self.hop - self.nperseg)
+            self.time_origin = time_data[0] if len(time_data) else 0.0
+
+        if end_index <= self.position:
+            return
+        new_columns = self.spectrogram.push(amplitude_data[self.position:end_index])
+        self.position = end_index
+        if new_columns == 0:
+            return
+
+        image = self.spectrogram.image()
+        finite = image[np.isfinite(image[:, 0])]
+        if len(finite):
+            self.image_item.setImage(image, autoLevels=False, levels=(finite.max() - 80.0, finite.max()))
+
+        # Place the image so that its right edge is the playback cursor
+        end_time = self.time_origin + end_index / self.spectrogram.fs
+        self.image_item.setRect(QtCore.QRectF(end_time - self.spectrogram.duration(), 0.0,
+                                              self.spectrogram.duration(), self.spectrogram.fs / 2.0))
+
+        frequencies, power = self.spectrogram.psd()
+        self.psd_curve.setData(frequencies[1:], power[1:] + 1e-20)
+
+
 class Ui_MainWindow(object):
     def __init__(self):
 
@@ -919,6 +1193,16 @@ class Ui_MainWindow(object):
         # Add the central widget to the main window
         MainWindow.setCentralWidget(self.centralwidget)
 
+        # Frame statistics overlay, toggled with F3, and the optional periodic dump
+        self.frame_stats_hud = FrameStatsHUD(MainWindow)
+        QtWidgets.QShortcut(QtGui.QKeySequence("F3"), MainWindow, activated=self.frame_stats_hud.toggle)
+        dump_seconds = float(os.environ.get("SIGNAL_VIEWER_FRAME_DUMP", 0) or 0)
+        if dump_seconds > 0:
+            self.frame_stats_timer = QTimer(MainWindow)
+            self.frame_stats_timer.timeout.connect(
+                lambda: frame_stats.dump(os.environ.get("SIGNAL_VIEWER_FRAME_DUMP_FILE")))
+            self.frame_stats_timer.start(int(dump_seconds * 1000))
+
         self.retranslateUi(MainWindow)
         QtCore.QMetaObject.connectSlotsByName(MainWindow)
 
@@ -1163,6 +1447,7 @@ class Ui_MainWindow(object):
             add_signal_graph02 = QtWidgets.QPushButton("Graph 02", self.rectangular_content)
             merge_button = QtWidgets.QPushButton("Merge", self.rectangular_content)
             glue_button = QtWidgets.QPushButton("Glue", self.rectangular_content)
+            self.static_signals = []  # Static signals added to the graphs, kept for workspaces
 
             # Initialize PyQtGraph Rectangular Graph
             self.initialize_pyqtgraph_rectangular_graph(
@@ -1197,13 +1482,10 @@ class Ui_MainWindow(object):
             )
 
             # Load signals for both plots
-            self.data_1 = np.loadtxt("Data/Rectangular Data/Cosine/signal_2Hz_100Hz.csv", delimiter=',', skiprows=1)
-            self.time_data_1 = self.data_1[:, 0]
-            self.amplitude_data_1 = self.data_1[:, 1]
-
-            self.data_2 = np.loadtxt("Data/Rectangular Data/Cosine/signal_2Hz_6Hz.csv", delimiter=',', skiprows=1)
-            self.time_data_2 = self.data_2[:, 0]
-            self.amplitude_data_2 = self.data_2[:, 1]
+            self.signal_sources = {1: "Data/Rectangular Data/Cosine/signal_2Hz_100Hz.csv",
+                                   2: "Data/Rectangular Data/Cosine/signal_2Hz_6Hz.csv"}
+            self.time_data_1, self.amplitude_data_1 = load_time_series(self.signal_sources[1])
+            self.time_data_2, self.amplitude_data_2 = load_time_series(self.signal_sources[2])
 
             # Initialize timers for each plot
             self.timer_1 = QTimer()
@@ -1235,11 +1517,13 @@ class Ui_MainWindow(object):
             )
             speed_button.clicked.connect(lambda: self.toggle_speed(speed_button))
             self.timer_1.timeout.connect(lambda: setattr(self, 'current_index_1',
-                                                         self.update_plot(self.pg_plot_widget_1, self.time_data_1,
-                                                                          self.amplitude_data_1, self.current_index_1)))
+                                                         self.play_frame(self.pg_plot_widget_1, self.time_data_1,
+                                                                         self.amplitude_data_1, self.current_index_1,
+                                                                         self.timer_1)))
             self.timer_2.timeout.connect(lambda: setattr(self, 'current_index_2',
-                                                         self.update_plot(self.pg_plot_widget_2, self.time_data_2,
-                                                                          self.amplitude_data_2, self.current_index_2)))
+                                                         self.play_frame(self.pg_plot_widget_2, self.time_data_2,
+                                                                         self.amplitude_data_2, self.current_index_2,
+                                                                         self.timer_2)))
 
             self.rectangular_initialized = True
 
@@ -1257,10 +1541,45 @@ class Ui_MainWindow(object):
         self.configure_plot(self.pg_plot_widget_1, signal_1_label)
         self.configure_plot(self.pg_plot_widget_2, signal_2_label)
 
+        # Show the statistics of the visible part of the played signal as the view scrolls or zooms, and send the
+        # newly visible samples of signals on an implicit time axis
+        for plot_widget in (self.pg_plot_widget_1, self.pg_plot_widget_2):
+            plot_widget.sigXRangeChanged.connect(lambda *args, widget=plot_widget: self.update_view_statistics(widget))
+            plot_widget.sigXRangeChanged.connect(lambda *args, widget=plot_widget: self.redraw_visible(widget))
+
+        # Spectrum panels next to the plots, shown with the Spectrum button
+        self.spectrum_panel_1 = SpectrumPanel()
+        self.spectrum_panel_2 = SpectrumPanel()
+        self.spectrum_panels = {self.pg_plot_widget_1: self.spectrum_panel_1,
+                                self.pg_plot_widget_2: self.spectrum_panel_2}
+        for panel in self.spectrum_panels.values():
+            panel.setMinimumWidth(300)
+            panel.hide()
+
+        # Heart rate trend panels, shown with the Beats button
+        self.beat_panels = {}
+        for plot_widget in self.spectrum_panels:
+            beat_panel = pg.PlotWidget(background="k")
+            beat_panel.setTitle("Heart Rate", color="w", size="10pt")
+            beat_panel.setLabel("left", "HR (bpm)", color="w", size="10pt")
+            beat_panel.setLabel("bottom", "Time (s)", color="w", size="10pt")
+            beat_panel.hr_curve = beat_panel.plot([], [], pen=pg.mkPen('r', width=2), symbol='o', symbolSize=4)
+            beat_panel.setMinimumWidth(250)
+            beat_panel.hide()
+            self.beat_panels[plot_widget] = beat_panel
+        self.beats_enabled = False
+        self.beat_trackers = {}  # Plot widget -> BeatTracker
+        self.anomaly_scorer = None  # AnomalyScorer trained on Signal 1 while anomalies are shown
+        self.anomaly_trackers = {}  # Plot widget -> AnomalyTracker
+
         # Layout for the plots
         graph_layout = QVBoxLayout()
-        graph_layout.addWidget(self.pg_plot_widget_1)
-        graph_layout.addWidget(self.pg_plot_widget_2)
+        for plot_widget, panel in self.spectrum_panels.items():
+            row_layout = QtWidgets.QHBoxLayout()
+            row_layout.addWidget(plot_widget, stretch=3)
+            row_layout.addWidget(panel, stretch=2)
+            row_layout.addWidget(self.beat_panels[plot_widget], stretch=2)
+            graph_layout.addLayout(row_layout)
 
         # Stretch the plots to take full height within their space
         graph_layout.setStretch(0, 1)  # Stretch for the first plot
@@ -1273,10 +1592,22 @@ class Ui_MainWindow(object):
 
         # Button layout
         button_layout = QVBoxLayout()
+        spectrum_button = QtWidgets.QPushButton("Spectrum", content_widget)
+        filter_button = QtWidgets.QPushButton("Filter: Off", content_widget)
+        beats_button = QtWidgets.QPushButton("Beats", content_widget)
+        align_button = QtWidgets.QPushButton("Auto Align", content_widget)
+        trace_button = QtWidgets.QPushButton("Traces: Off", content_widget)
+        anomalies_button = QtWidgets.QPushButton("Anomalies", content_widget)
+        save_workspace_button = QtWidgets.QPushButton("Save Workspace", content_widget)
+        open_workspace_button = QtWidgets.QPushButton("Open Workspace", content_widget)
+        self.filter_preset = 'Off'  # Key of FILTER_PRESETS applied to the displayed signals
+        self.derived_trace = 'Off'  # One of DERIVED_TRACES drawn over the signals, or 'Off'
+        self.playback_filters = {}  # Displayed line -> PlaybackFilter
         self.setup_buttons(button_layout, unified_play_pause_button, play_pause_button_1, play_pause_button_2,
                            link_button, reset_button, change_signal_01, change_signal_02, change_dynamic_signal,
                            add_signal_graph01, add_signal_graph02, merge_button, glue_button, speed_button,
-                           add_signal_button)
+                           add_signal_button, spectrum_button, filter_button, beats_button, align_button,
+                           anomalies_button, trace_button, save_workspace_button, open_workspace_button)
 
         # Remove margins and spacing in the button layout
         button_layout.setContentsMargins(0, 0, 0, 0)
@@ -1297,7 +1628,15 @@ class Ui_MainWindow(object):
             'add_signal_graph02': add_signal_graph02,
             'merge_button': merge_button,
             'glue_button': glue_button,
-            'add_signal_button': add_signal_button
+            'add_signal_button': add_signal_button,
+            'spectrum_button': spectrum_button,
+            'filter_button': filter_button,
+            'beats_button': beats_button,
+            'align_button': align_button,
+            'anomalies_button': anomalies_button,
+            'trace_button': trace_button,
+            'save_workspace_button': save_workspace_button,
+            'open_workspace_button': open_workspace_button
         }
 
         # Connect reset button to reset functionality
@@ -1320,6 +1659,14 @@ class Ui_MainWindow(object):
 
         merge_button.clicked.connect(self.toggle_merge)
         glue_button.clicked.connect(self.toggle_glue)
+        spectrum_button.clicked.connect(self.toggle_spectrum)
+        filter_button.clicked.connect(lambda: self.toggle_filter(filter_button))
+        beats_button.clicked.connect(self.toggle_beats)
+        align_button.clicked.connect(self.auto_align_signals)
+        anomalies_button.clicked.connect(self.toggle_anomalies)
+        trace_button.clicked.connect(self.toggle_derived_trace)
+        save_workspace_button.clicked.connect(self.save_workspace_file)
+        open_workspace_button.clicked.connect(self.open_workspace_file)
         change_dynamic_signal.clicked.connect(self.toggle_change_signal_mode)
 
         # Combine layouts into the main content widget
@@ -1370,6 +1717,12 @@ class Ui_MainWindow(object):
             del widget.line_1
         if hasattr(widget, "line_2"):
             del widget.line_2
+        if hasattr(widget, "beat_scatter"):
+            del widget.beat_scatter
+        if hasattr(widget, "anomaly_regions"):
+            del widget.anomaly_regions
+        if hasattr(widget, "trace_curves"):
+            del widget.trace_curves
 
     def reinitialize_lines(self):
         if not hasattr(self.pg_plot_widget_1, "line_1"):
@@ -1386,11 +1739,11 @@ class Ui_MainWindow(object):
 
     def setup_timer_connections(self):
         self.timer_1.timeout.connect(
-            lambda: self.update_plot(self.pg_plot_widget_1, self.time_data_1, self.amplitude_data_1,
-                                     self.current_index_1))
+            lambda: self.play_frame(self.pg_plot_widget_1, self.time_data_1, self.amplitude_data_1,
+                                    self.current_index_1, self.timer_1))
         self.timer_2.timeout.connect(
-            lambda: self.update_plot(self.pg_plot_widget_2, self.time_data_2, self.amplitude_data_2,
-                                     self.current_index_2))
+            lambda: self.play_frame(self.pg_plot_widget_2, self.time_data_2, self.amplitude_data_2,
+                                    self.current_index_2, self.timer_2))
         print("Timer connections set up.")
 
     def update_plot(self, plot_widget, time_data, amplitude_data, current_index, max_points=5):
@@ -1511,27 +1864,32 @@ class Ui_MainWindow(object):
             # Connect timer to the update function based on the merge state
             if self.is_merged:
                 # Use the first plot widget for both signals when merged
-                self.timer_1.timeout.connect(lambda: self.update_plot(self.pg_plot_widget_1, self.time_data_1,
-                                                                      self.amplitude_data_1, self.current_index_1))
-                self.timer_2.timeout.connect(lambda: self.update_plot(self.pg_plot_widget_1, self.time_data_2,
-                                                                      self.amplitude_data_2, self.current_index_2))
+                self.timer_1.timeout.connect(lambda: self.play_frame(self.pg_plot_widget_1, self.time_data_1,
+                                                                     self.amplitude_data_1, self.current_index_1,
+                                                                     self.timer_1))
+                self.timer_2.timeout.connect(lambda: self.play_frame(self.pg_plot_widget_1, self.time_data_2,
+                                                                     self.amplitude_data_2, self.current_index_2,
+                                                                     self.timer_2))
             else:
                 # Update only the respective plot widget
                 timer.timeout.connect(lambda: setattr(
                     self, current_index_key,
-                    self.update_plot(
+                    self.play_frame(
                         plot_widget,
                         time_data,
                         amplitude_data,
-                        getattr(self, current_index_key)
+                        getattr(self, current_index_key),
+                        timer
                     )
                 ))
 
                 # If the specific plot widget is the first one, ensure the second widget updates independently
                 if plot_widget == self.pg_plot_widget_1:
-                    self.timer_2.timeout.connect(lambda: self.update_plot(self.pg_plot_widget_2, self.time_data_2,
-                                                                          self.amplitude_data_2, self.current_index_2))
+                    self.timer_2.timeout.connect(lambda: self.play_frame(self.pg_plot_widget_2, self.time_data_2,
+                                                                         self.amplitude_data_2, self.current_index_2,
+                                                                         self.timer_2))
 
+    @tracer.traced('load')
     def load_dynamic_signal(self, signal_number):
         """
         Open a file dialog to select a new signal file and update the plot for the given signal.
@@ -1553,11 +1911,12 @@ class Ui_MainWindow(object):
                 print("File selection canceled.")
                 return  # Exit if no file is selected
 
-            # Load the selected signal file
-            data = np.loadtxt(file_path, delimiter=',', skiprows=1)
-            time_data, amplitude_data = data[:, 0], data[:, 1]
+            # Load the selected signal file, keeping the samples in the storage policy
+            time_data, amplitude_data = load_time_series(file_path)
 
             # Update the appropriate signal and plot
+            if signal_number in (1, 2):
+                self.signal_sources[signal_number] = file_path
             if signal_number == 1:
                 self.time_data_1 = time_data
                 self.amplitude_data_1 = amplitude_data
@@ -1620,6 +1979,7 @@ class Ui_MainWindow(object):
             print(f"Error loading rectangular signal file: {e}")
             self.show_error_message(f"Error loading rectangular signal file: {e}")
 
+    @tracer.traced('load')
     def load_rectangular_signal_data(self, file_path, signal_data_attr, index_attr, is_static=False):
         """
         Load the rectangular signal data into the specified attribute based on the file type.
@@ -1632,22 +1992,22 @@ class Ui_MainWindow(object):
         try:
             _, file_extension = os.path.splitext(file_path)
 
-            if file_extension == ".txt":
-                # Load TXT file assuming whitespace-separated values
-                signal_data = np.loadtxt(file_path)
-            elif file_extension == ".csv":
-                # Load CSV file assuming signal is in the second column
-                data = np.loadtxt(file_path, delimiter=',', skiprows=1)
-                signal_data = data[:, 1]  # Select the second column
-            elif file_extension == ".edf":
-                # Load EDF file using pyEDFlib
-                with pyedflib.EdfReader(file_path) as f:
-                    n_signals = f.signals_in_file
-                    signal_data = np.zeros((n_signals, f.getNSamples()[0]))
-                    for i in range(n_signals):
-                        signal_data[i, :] = f.readSignal(i)
-            else:
-                raise ValueError(f"Unsupported file format: {file_extension}")
+            with tracer.span('parse ' + file_extension, 'parse', file=file_path):
+                if file_extension == ".txt":
+                    # Load TXT file assuming whitespace-separated values
+                    signal_data = store_signal(np.loadtxt(file_path))
+                elif file_extension == ".csv":
+                    # Load CSV file assuming signal is in the second column
+                    _, signal_data = load_time_series(file_path)
+                elif file_extension == ".edf":
+                    # Load EDF file using pyEDFlib, as scaled digital samples with the int16 storage policy
+                    import pyedflib
+
+                    with pyedflib.EdfReader(file_path) as f:
+                        channels = [read_edf_signal(f, i) for i in range(f.signals_in_file)]
+                    signal_data = channels[0] if len(channels) == 1 else np.vstack(channels)
+                else:
+                    raise ValueError(f"Unsupported file format: {file_extension}")
 
             # Assign the loaded data and reset the index if not static
             setattr(self, signal_data_attr, signal_data)
@@ -1659,6 +2019,7 @@ class Ui_MainWindow(object):
             print(f"Error processing rectangular signal data: {e}")
             self.show_error_message(f"Error processing rectangular signal data: {e}")
 
+    @tracer.traced('load')
     def load_and_process_rectangular_signal(self, file_name, plot_widget):
         """
         Load and plot rectangular signal data on the given widget without affecting existing dynamic plots.
@@ -1666,18 +2027,9 @@ class Ui_MainWindow(object):
         """
         try:
             # Load the signal data from the file
-            data = np.loadtxt(file_name, delimiter=',', skiprows=1)
-            if data.ndim != 2 or data.shape[1] != 2:
-                raise ValueError("File must contain exactly two columns: Time and Signal.")
-
-            time, amplitude = data[:, 0], data[:, 1]
-            color = self.plot_colors[self.current_color_index]
-
-            # Create a new plot data item for the static signal
-            static_plot_item = pg.PlotDataItem(time, amplitude, pen=pg.mkPen(color=color, width=2))
-
-            # Add the static plot item to the widget
-            plot_widget.addItem(static_plot_item)
+            time, amplitude = load_time_series(file_name)
+            self.add_static_signal(plot_widget, time, amplitude, self.plot_colors[self.current_color_index],
+                                   self.filter_preset, file_name)
 
             # Update the color index for subsequent plots, but do not reset or affect dynamic plots
             self.current_color_index = (self.current_color_index + 1) % len(self.plot_colors)
@@ -1687,6 +2039,48 @@ class Ui_MainWindow(object):
         except Exception as e:
             print(f"Error in loading and processing static signal: {e}")
 
+    def add_static_signal(self, plot_widget, time, amplitude, color, preset, source):
+        """
+        Draw a static signal over a graph and remember it for workspaces.
+        Args:
+            plot_widget: The plot widget to draw on.
+            time: The time data of the signal.
+            amplitude: The amplitude data of the signal, before filtering.
+            color: Color of its line.
+            preset: Key of FILTER_PRESETS it is filtered with.
+            source: Path of the file it was loaded from.
+        """
+        # Static signals are filtered offline with zero phase, so they stay aligned with the originals
+        chain = FilterChain(sample_rate(time), FILTER_PRESETS[preset])
+        self.show_skipped_filters(chain)
+        values = chain.filtfilt(amplitude) if chain else amplitude
+
+        # Create a new plot data item for the static signal and add it to the widget
+        static_plot_item = pg.PlotDataItem(pen=pg.mkPen(color=color, width=2))
+        plot_widget.addItem(static_plot_item)
+        self.set_curve_data(plot_widget, static_plot_item, time, values, len(values))
+
+        self.static_signals.append({'plot_widget': plot_widget, 'item': static_plot_item, 'time': time,
+                                    'amplitude': amplitude, 'color': color, 'preset': preset, 'source': source})
+
+    @frame_stats.timed(
+        lambda self, *args: 'update_plot 1' if args[-1] is self.timer_1 else 'update_plot 2',
+        interval=lambda self, *args: args[-1].interval(),
+        samples=lambda end_index, self, plot_widget, time_data, amplitude_data, current_index, timer:
+        end_index - current_index)
+    def play_frame(self, plot_widget, time_data, amplitude_data, current_index, timer):
+        """
+        Timer callback of playback, the only caller of update_plot recorded in the frame statistics: redraws after
+        loading, aligning or restoring a workspace are not playback frames.
+        Args:
+            plot_widget, time_data, amplitude_data, current_index: See update_plot.
+            timer: The timer calling back, whose interval is the budget of the frame.
+        Returns:
+            The index after the last drawn sample.
+        """
+        return self.update_plot(plot_widget, time_data, amplitude_data, current_index)
+
+    @tracer.traced('render')
     def update_plot(self, plot_widget, time_data, amplitude_data, current_index, max_points=5):
         """
         Incrementally update the plot without redrawing everything.
@@ -1713,17 +2107,46 @@ class Ui_MainWindow(object):
         if not hasattr(plot_widget, "line_2"):
             plot_widget.line_2 = plot_widget.plot([], [], pen=pg.mkPen('y', width=2))  # Initialize second line (Yellow)
 
+        # In linked mode, Signal 2 advances by the same time span as Signal 1 whatever its sampling rate
+        if getattr(self, 'linked_mode', False) and plot_widget == self.pg_plot_widget_2 and max_points > 0:
+            rate_ratio = resample_cache.rate(time_data) / resample_cache.rate(self.time_data_1)
+            max_points = max(1, int(round(max_points * rate_ratio)))
+
         # Incrementally update the plot data
         end_index = min(current_index + max_points, len(time_data))
 
+        # Filter only the newly revealed samples when a filter chain is selected
+        display_data = self.filter_playback(plot_widget, time_data, amplitude_data, end_index)
+
         # Update data for line 1 (first signal)
-        plot_widget.line_1.setData(time_data[:end_index], amplitude_data[:end_index])
+        self.set_curve_data(plot_widget, plot_widget.line_1, time_data, display_data, end_index)
+
+        # Draw the selected derived trace of the played samples
+        if getattr(self, 'derived_trace', 'Off') != 'Off' and plot_widget in self.beat_panels:
+            self.update_derived_trace(plot_widget, time_data, amplitude_data, end_index)
 
         # If merged, update both signals (line_1 and line_2) on the same widget
         if self.is_merged:
             # Ensure the second signal exists and has matching time data
             if hasattr(self, "time_data_2") and hasattr(self, "amplitude_data_2"):
-                plot_widget.line_2.setData(self.time_data_2[:end_index], self.amplitude_data_2[:end_index])
+                # Put Signal 2 on the sample grid of this signal, so that equal indices mean equal times
+                time_2, amplitude_2 = resample_cache.get_aligned(self.time_data_2, self.amplitude_data_2,
+                                                                 resample_cache.rate(time_data))
+                merged_data = self.filter_playback('merged', time_2, amplitude_2, end_index)
+                self.set_curve_data(plot_widget, plot_widget.line_2, time_2, merged_data, end_index)
+
+        # Analyze only the newly revealed samples in the spectrum panel of this plot
+        panel = getattr(self, 'spectrum_panels', {}).get(plot_widget)
+        if panel is not None and panel.isVisible():
+            panel.update_spectrum(time_data, display_data, end_index)
+
+        # Detect beats in the newly revealed samples
+        if getattr(self, 'beats_enabled', False) and plot_widget in self.beat_panels:
+            self.update_beats(plot_widget, time_data, amplitude_data, display_data, end_index)
+
+        # Score the windows completed by the newly revealed samples and shade the anomalous spans
+        if getattr(self, 'anomaly_scorer', None) is not None and plot_widget in self.beat_panels:
+            self.update_anomalies(plot_widget, time_data, amplitude_data, end_index)
 
         # Update the current index
         if current_index >= len(time_data) - 1:
@@ -1731,6 +2154,312 @@ class Ui_MainWindow(object):
         else:
             return end_index  # Return the next index to plot
 
+    def update_view_statistics(self, plot_widget):
+        """
+        Show the statistics of the samples played so far within the visible time range in the title of a plot.
+        Args:
+            plot_widget: The plot widget whose view changed.
+        """
+        time_data, amplitude_data, index_attr = {
+            self.pg_plot_widget_1: ('time_data_1', 'amplitude_data_1', 'current_index_1'),
+            self.pg_plot_widget_2: ('time_data_2', 'amplitude_data_2', 'current_index_2'),
+        }[plot_widget]
+        time_data, amplitude_data = getattr(self, time_data, None), getattr(self, amplitude_data, None)
+        played = getattr(self, index_attr, 0)
+        if time_data is None or amplitude_data is None or played <= 0:
+            return
+
+        view_start, view_end = plot_widget.getViewBox().viewRange()[0]
+        start, end = np.searchsorted(time_data, view_start), np.searchsorted(time_data, view_end, side='right')
+        stats = resample_cache.summary_index(amplitude_data).query(start, min(end, played))
+        if stats is None:
+            plot_widget.setTitle(plot_widget.base_title, color="w", size="12pt")
+            return
+        plot_widget.setTitle(f"{plot_widget.base_title} | Mean: {stats['mean']:.3g} RMS: {stats['rms']:.3g} "
+                             f"Min: {stats['min']:.3g} Max: {stats['max']:.3g}", color="w", size="12pt")
+
+    def set_curve_data(self, plot_widget, curve, time_data, values, end_index):
+        """
+        Show the first end_index samples of a signal on a curve.
+
+        Explicit time columns are sent whole and clipped to the view by pyqtgraph. On an implicit time axis
+        (UniformTime) only the samples in the visible time range are sent, reduced to their min/max per pixel
+        column, and their times are computed from the kept indices; the curve keeps its source so that a pan or
+        zoom redraws it.
+        Args:
+            plot_widget: The plot widget holding the curve.
+            curve: The PlotDataItem to update.
+            time_data: The time data for the signal.
+            values: The values to draw.
+            end_index: Index of the last revealed sample plus one.
+        """
+        if not isinstance(time_data, UniformTime):
+            curve.setData(time_data[:end_index], values[:end_index])
+            return
+
+        # A merged or filtered line can hold fewer samples than the signal it is played with
+        end_index = min(end_index, len(time_data), len(values))
+        start, stop = self.visible_window(plot_widget, time_data, end_index)
+        curve.source, curve.window = (time_data, values, end_index), (start, stop)
+        if stop <= start:
+            curve.setData([], [])
+            return
+        x, y = minmax_decimate(values[start:stop], VISIBLE_POINTS)
+        if len(x) < stop - start:
+            # Keep the first and last samples, so the data bounds are those of the window
+            x = np.concatenate(([0], x, [stop - start - 1]))
+            y = np.concatenate((values[start:start + 1], y, values[stop - 1:stop]))
+        curve.setData(time_data.times(start + x), y)
+
+    def visible_window(self, plot_widget, time_data, end_index):
+        """
+        Returns:
+            (start, stop): the range of played samples of an implicit time axis to send for the current view; all
+            of them while the view follows the data.
+        """
+        view = plot_widget.getViewBox()
+        if view.autoRangeEnabled()[0]:
+            return 0, end_index
+        # One sample beyond each edge, so the line reaches the border of the view
+        view_start, view_end = view.viewRange()[0]
+        start = min(max(time_data.searchsorted(view_start) - 1, 0), end_index)
+        return start, min(time_data.searchsorted(view_end, side='right') + 1, end_index)
+
+    def redraw_visible(self, plot_widget):
+        """
+        Send the newly visible samples of the curves on an implicit time axis after a pan or zoom.
+        Args:
+            plot_widget: The plot widget whose view changed.
+        """
+        for curve in plot_widget.listDataItems():
+            source = getattr(curve, 'source', None)
+            if source is not None and curve.window != self.visible_window(plot_widget, source[0], source[2]):
+                self.set_curve_data(plot_widget, curve, *source)
+
+    def update_derived_trace(self, plot_widget, time_data, amplitude_data, end_index):
+        """
+        Draw the played part of the selected derived trace over a signal. The trace of the whole signal is computed
+        once per window length and cached; drawing it goes through the same clipping and downsampling as the signal.
+        Args:
+            plot_widget: The plot widget showing the signal.
+            time_data: The time data for the signal.
+            amplitude_data: The amplitude data for the signal.
+            end_index: Index of the last revealed sample plus one.
+        """
+        window = max(1, int(round(DERIVED_TRACE_WINDOW * resample_cache.rate(time_data))))
+        curves = resample_cache.derived_trace(amplitude_data, self.derived_trace, window)
+
+        # Create the trace curves if they do not exist; bands are drawn as their two edges
+        if not hasattr(plot_widget, "trace_curves"):
+            pen = pg.mkPen('w', width=1, style=QtCore.Qt.DashLine)
+            plot_widget.trace_curves = [plot_widget.plot([], [], pen=pen) for _ in curves]
+
+        for curve, values in zip(plot_widget.trace_curves, curves):
+            self.set_curve_data(plot_widget, curve, time_data, values, end_index)
+
+    def clear_derived_trace(self, plot_widget):
+        """Remove the derived trace curves of a plot."""
+        for curve in getattr(plot_widget, "trace_curves", []):
+            plot_widget.removeItem(curve)
+        if hasattr(plot_widget, "trace_curves"):
+            del plot_widget.trace_curves
+
+    def toggle_derived_trace(self):
+        """
+        Cycle through the derived traces drawn over the rectangular graphs.
+        """
+        choices = ['Off'] + list(DERIVED_TRACES)
+        self.derived_trace = choices[(choices.index(self.derived_trace) + 1) % len(choices)]
+        self.buttons['trace_button'].setText(self.derived_trace if self.derived_trace != 'Off' else "Traces: Off")
+
+        # Show the new trace right away, even while paused
+        for plot_widget, time_data, amplitude_data, index_attr in (
+                (self.pg_plot_widget_1, self.time_data_1, self.amplitude_data_1, 'current_index_1'),
+                (self.pg_plot_widget_2, self.time_data_2, self.amplitude_data_2, 'current_index_2')):
+            self.clear_derived_trace(plot_widget)
+            if getattr(self, index_attr) > 0:
+                self.update_plot(plot_widget, time_data, amplitude_data, getattr(self, index_attr), max_points=0)
+        print(f"Derived trace set to {self.derived_trace}")  # Debug
+
+    def filter_playback(self, key, time_data, amplitude_data, end_index):
+        """
+        Run the selected filter chain over the samples of a signal revealed since the last update.
+        Args:
+            key: Identifies the displayed line (its plot widget, or 'merged').
+            time_data: The time data for the signal.
+            amplitude_data: The amplitude data for the signal.
+            end_index: Index of the last revealed sample plus one.
+        Returns:
+            The signal to display: the filtered buffer, or amplitude_data itself when no filter is selected.
+        """
+        stages = FILTER_PRESETS[getattr(self, 'filter_preset', 'Off')]
+        if not stages:
+            return amplitude_data
+        playback_filter = self.playback_filters.setdefault(key, PlaybackFilter())
+        playback_filter.update(time_data, amplitude_data, end_index, stages)
+        if playback_filter.restarted:
+            self.show_skipped_filters(playback_filter.chain)
+        return playback_filter.output
+
+    def show_skipped_filters(self, chain):
+        """
+        Tell the user which stages of a filter chain are left out because the signal's sampling rate is too low.
+        Args:
+            chain: The FilterChain built for the signal.
+        """
+        if chain.skipped:
+            stages = ", ".join(f"{kind} at {frequency:g} Hz" for kind, frequency in chain.skipped)
+            self.statusbar.showMessage(f"Filter stages above the Nyquist frequency ({chain.fs / 2:g} Hz) skipped: "
+                                       f"{stages}")
+
+    def toggle_filter(self, filter_button):
+        """
+        Cycle through the filter presets applied during playback and to newly added static signals.
+        Args:
+            filter_button: The QPushButton selecting the filter.
+        """
+        presets = list(FILTER_PRESETS)
+        self.filter_preset = presets[(presets.index(self.filter_preset) + 1) % len(presets)]
+        filter_button.setText(self.filter_preset if self.filter_preset != 'Off' else "Filter: Off")
+
+        # Show the newly filtered signals right away, even while paused
+        for plot_widget, time_data, amplitude_data, index_attr in (
+                (self.pg_plot_widget_1, self.time_data_1, self.amplitude_data_1, 'current_index_1'),
+                (self.pg_plot_widget_2, self.time_data_2, self.amplitude_data_2, 'current_index_2')):
+            if getattr(self, index_attr) > 0:
+                self.update_plot(plot_widget, time_data, amplitude_data, getattr(self, index_attr), max_points=0)
+        print(f"Filter set to {self.filter_preset}")  # Debug
+
+    def update_beats(self, plot_widget, time_data, amplitude_data, display_data, end_index):
+        """
+        Run the QRS detector over the newly revealed samples, mark the new beats and update the heart rate trend.
+        Args:
+            plot_widget: The plot widget showing the signal.
+            time_data: The time data for the signal.
+            amplitude_data: The amplitude data the beats are detected in.
+            display_data: The displayed (possibly filtered) data the markers are placed on.
+            end_index: Index of the last revealed sample plus one.
+        """
+        tracker = self.beat_trackers.setdefault(plot_widget, BeatTracker())
+        new_peaks = tracker.update(time_data, amplitude_data, end_index)
+
+        # Create the beat markers if they do not exist
+        if not hasattr(plot_widget, "beat_scatter"):
+            plot_widget.beat_scatter = pg.ScatterPlotItem(size=10, pen=pg.mkPen('w'), brush=pg.mkBrush('r'))
+            plot_widget.addItem(plot_widget.beat_scatter)
+        beat_panel = self.beat_panels[plot_widget]
+        if tracker.restarted:
+            plot_widget.beat_scatter.clear()
+            if getattr(plot_widget, "heart_rate_unavailable", False):
+                self.statusbar.clearMessage()
+            plot_widget.heart_rate_unavailable = False
+            beat_panel.setTitle("Heart Rate", color="w", size="10pt")
+        if not tracker.detector.physiological:
+            # The time column does not match the samples, so no heart rate can be derived from it
+            if not plot_widget.heart_rate_unavailable:
+                plot_widget.heart_rate_unavailable = True
+                period = 1000 * tracker.detector.period / tracker.detector.fs
+                beat_panel.hr_curve.setData([], [])
+                beat_panel.setTitle("Heart Rate: unavailable", color="w", size="10pt")
+                self.statusbar.showMessage(f"Beats {period:.0f} ms apart are not physiological: check the time "
+                                           f"column of the signal. Heart rate unavailable.")
+            return
+        if len(new_peaks) == 0 and not tracker.restarted:
+            return
+
+        if len(new_peaks):
+            plot_widget.beat_scatter.addPoints(x=time_data[new_peaks], y=display_data[new_peaks])
+        beat_times, rr, heart_rate = tracker.heart_rate(time_data)
+        beat_panel.hr_curve.setData(beat_times, heart_rate)
+        if len(rr):
+            beat_panel.setTitle(f"Heart Rate: {heart_rate[-1]:.0f} bpm, RR: {1000 * rr[-1]:.0f} ms",
+                                color="w", size="10pt")
+
+    def toggle_beats(self):
+        """
+        Turn beat detection with markers and heart rate trends on or off.
+        """
+        self.beats_enabled = not self.beats_enabled
+        for plot_widget, beat_panel in self.beat_panels.items():
+            beat_panel.setVisible(self.beats_enabled and not plot_widget.isHidden())
+            if hasattr(plot_widget, "beat_scatter"):
+                plot_widget.removeItem(plot_widget.beat_scatter)
+                del plot_widget.beat_scatter
+        # Detection restarts from the beginning of the signals when turned on again
+        self.beat_trackers = {}
+        self.buttons['beats_button'].setText("Hide Beats" if self.beats_enabled else "Beats")
+
+    def update_anomalies(self, plot_widget, time_data, amplitude_data, end_index):
+        """
+        Score the windows completed since the last update and shade the anomalous spans.
+        Args:
+            plot_widget: The plot widget showing the signal.
+            time_data: The time data for the signal.
+            amplitude_data: The amplitude data for the signal.
+            end_index: Index of the last revealed sample plus one.
+        """
+        tracker = self.anomaly_trackers.setdefault(
+            plot_widget, AnomalyTracker(self.anomaly_scorer, self.anomaly_window, self.anomaly_window / 4))
+        spans = tracker.update(time_data, amplitude_data, end_index)
+        if tracker.restarted or not hasattr(plot_widget, "anomaly_regions"):
+            self.clear_anomalies(plot_widget)
+
+        for start, end in spans:
+            start_time, end_time = time_data[start], time_data[min(end, len(time_data)) - 1]
+            regions = plot_widget.anomaly_regions
+            # Overlapping windows extend the last span instead of stacking regions
+            if regions and start_time <= regions[-1].getRegion()[1]:
+                regions[-1].setRegion((regions[-1].getRegion()[0], end_time))
+                continue
+            region = pg.LinearRegionItem(values=(start_time, end_time), movable=False,
+                                         brush=pg.mkBrush(255, 0, 0, 60), pen=pg.mkPen(None))
+            region.setZValue(-10)  # Behind the signal
+            plot_widget.addItem(region)
+            regions.append(region)
+
+    def clear_anomalies(self, plot_widget):
+        """Remove the shaded anomalous spans of a plot."""
+        for region in getattr(plot_widget, "anomaly_regions", []):
+            plot_widget.removeItem(region)
+        plot_widget.anomaly_regions = []
+
+    def toggle_anomalies(self):
+        """
+        Turn anomaly scoring on or off. Signal 1 is taken as the normal reference: the distribution of its window
+        features is learned when turned on, and windows of the playing signals far from it are shaded.
+        """
+        for plot_widget in self.beat_panels:
+            self.clear_anomalies(plot_widget)
+        self.anomaly_trackers = {}
+        if self.anomaly_scorer is not None:
+            self.anomaly_scorer = None
+            self.buttons['anomalies_button'].setText("Anomalies")
+            return
+
+        try:
+            fs = sample_rate(self.time_data_1)
+            # Two-second windows, shortened so that short recordings still give enough windows to learn from
+            self.anomaly_window = min(2.0, len(self.amplitude_data_1) / fs / 8)
+            features, _ = window_features(self.amplitude_data_1, fs, self.anomaly_window, self.anomaly_window / 4)
+            self.anomaly_scorer = AnomalyScorer().fit(features)
+        except Exception as e:
+            print(f"Error learning the normal features: {e}")  # Debug
+            return
+        self.buttons['anomalies_button'].setText("Hide Anomalies")
+        print(f"Anomaly threshold: {self.anomaly_scorer.threshold:.2f}")  # Debug
+
+    def toggle_spectrum(self):
+        """
+        Show or hide the spectrogram and PSD panels next to the rectangular plots.
+        """
+        visible = not self.spectrum_panel_1.isVisible()
+        for panel in self.spectrum_panels.values():
+            panel.setVisible(visible)
+            panel.source = None  # Restart from the current playback position when shown again
+        if self.is_merged:
+            self.spectrum_panel_2.hide()  # Signal 2 shares the first plot while merged
+        self.buttons['spectrum_button'].setText("Hide Spectrum" if visible else "Spectrum")
+
     def toggle_change_signal_mode(self):
         """
         Toggle the visibility and state for the 'Change Signal' functionality.
@@ -1774,8 +2503,10 @@ class Ui_MainWindow(object):
         """
         Perform the merge action: hide one graph, create merged plot, and update button text.
         """
-        # Hide the second graph (graph 2)
+        # Hide the second graph (graph 2) and its spectrum
         self.pg_plot_widget_2.hide()
+        self.spectrum_panel_2.hide()
+        self.beat_panels[self.pg_plot_widget_2].hide()
 
         # Create a new plot widget for the merged graph
         self.merged_plot_widget = pg.PlotWidget(background="k")
@@ -1809,8 +2540,10 @@ class Ui_MainWindow(object):
         """
         Unmerge the signals and restore the original state.
         """
-        # Ensure the second plot widget is visible again
+        # Ensure the second plot widget is visible again, with its spectrum if the spectra are shown
         self.pg_plot_widget_2.show()
+        self.spectrum_panel_2.setVisible(self.spectrum_panel_1.isVisible())
+        self.beat_panels[self.pg_plot_widget_2].setVisible(self.beats_enabled)
 
         # Remove the merged plot widget from the layout and clear it
         if hasattr(self, 'merged_plot_widget'):
@@ -1821,10 +2554,10 @@ class Ui_MainWindow(object):
             self.merged_plot_widget.setParent(None)
 
         # Repopulate the original plots with their respective data
-        self.pg_plot_widget_1.plot(self.time_data_1, self.amplitude_data_1, pen=pg.mkPen(color='b', width=2),
-                                   clear=True)
-        self.pg_plot_widget_2.plot(self.time_data_2, self.amplitude_data_2, pen=pg.mkPen(color='g', width=2),
-                                   clear=True)
+        self.pg_plot_widget_1.plot(np.asarray(self.time_data_1), self.amplitude_data_1,
+                                   pen=pg.mkPen(color='b', width=2), clear=True)
+        self.pg_plot_widget_2.plot(np.asarray(self.time_data_2), self.amplitude_data_2,
+                                   pen=pg.mkPen(color='g', width=2), clear=True)
 
         # Set both plots to have the same minimum size to ensure equal height
         self.pg_plot_widget_1.setMinimumSize(500, 300)  # Adjust this to your preferred size (width, height)
@@ -1856,10 +2589,41 @@ class Ui_MainWindow(object):
         # else:
         #     self.glue_signal()  # Glue if currently unglued
         self.is_glued = not self.is_glued
+        # Glue on the sample grid of Signal 1, resampling Signal 2 if it was recorded at another rate
+        rate_1 = resample_cache.rate(self.time_data_1)
+        signal_2 = resample_cache.get(self.dynamic_signal_02, resample_cache.rate(self.time_data_2), rate_1)
+
         # Open the GlueSignalsWindow with signal data and set self as the parent
-        self.glue_window = GlueSignalsWindow(self.dynamic_signal_01, self.dynamic_signal_02, parent=self.main_window)
+        self.glue_window = GlueSignalsWindow(self.dynamic_signal_01, signal_2, parent=self.main_window, rate=rate_1)
         self.glue_window.show()
 
+    def auto_align_signals(self):
+        """
+        Estimate the delay between Signal 1 and Signal 2 by cross-correlation and shift Signal 2 so that matching
+        events share the same time and are reached together in linked playback.
+        """
+        try:
+            rate_1 = resample_cache.rate(self.time_data_1)
+            rate_2 = resample_cache.rate(self.time_data_2)
+
+            # Correlate on the grid of Signal 1
+            signal_2 = resample_cache.get(self.amplitude_data_2, rate_2, rate_1)
+            lag = estimate_lag(self.amplitude_data_1, signal_2)
+
+            # Sample n of Signal 2 matches sample n + lag of Signal 1: start Signal 2 at the time of sample lag
+            self.time_data_2 = self.time_data_2 - self.time_data_2[0] + self.time_data_1[0] + lag / rate_1
+
+            # Move the playback position of Signal 2 to the event Signal 1 is showing
+            position = int(round((self.current_index_1 - lag) * rate_2 / rate_1))
+            self.current_index_2 = min(max(position, 0), len(self.time_data_2))
+            self.update_plot(self.pg_plot_widget_2, self.time_data_2, self.amplitude_data_2, self.current_index_2,
+                             max_points=0)
+
+            self.buttons['align_button'].setText(f"Lag {lag / rate_1:+.3f}s")
+            print(f"Signal 2 aligned to Signal 1 with a lag of {lag} samples ({lag / rate_1:+.4f} s)")  # Debug
+        except Exception as e:
+            print(f"Error aligning signals: {e}")
+
     def toggle_link_mode(self, link_button, button_1, button_2, unified_button):
         self.linked_mode = not self.linked_mode  # Toggle the linked mode state
 
@@ -1905,6 +2669,176 @@ class Ui_MainWindow(object):
 
         print(f"Speed adjusted to {current_speed}X, Timer Interval: {new_interval}ms")  # Debug
 
+    def save_workspace_file(self):
+        """
+        Open a file dialog to save the signals, static signals and view state of the rectangular page.
+        """
+        parent_widget = self.main_window if hasattr(self, 'main_window') else None
+        file_path, selected_filter = QFileDialog.getSaveFileName(parent_widget, "Save Workspace", "",
+                                                                 ";;".join(WORKSPACE_FILTERS))
+        if not file_path:
+            return  # Exit if no file is selected
+        if not file_path.endswith(WORKSPACE_EXTENSION):
+            file_path += WORKSPACE_EXTENSION
+        self.save_workspace(file_path, WORKSPACE_FILTERS.get(selected_filter, 'raw'))
+
+    def open_workspace_file(self):
+        """
+        Open a file dialog to restore a workspace saved with "Save Workspace".
+        """
+        parent_widget = self.main_window if hasattr(self, 'main_window') else None
+        file_path, _ = QFileDialog.getOpenFileName(parent_widget, "Open Workspace", "",
+                                                   f"Workspace Files (*{WORKSPACE_EXTENSION});;All Files (*)")
+        if file_path:
+            self.restore_workspace(file_path)
+
+    def save_workspace(self, file_path, mode='raw'):
+        """
+        Save the rectangular page in a workspace file: both signals with their playback positions, the static
+        signals, merge and link state, speed, filter, derived trace, colors and zoomed view ranges.
+        Args:
+            file_path (str): Path of the workspace file.
+            mode (str): One of the values of WORKSPACE_FILTERS. With 'references' the samples of signals loaded
+                from a file are not stored, only the path of the file; their time axes are still kept, so a shift
+                by Auto Align is restored.
+        """
+        try:
+            writer = WorkspaceWriter(compress=mode == 'compressed')
+
+            def describe(values, name, source):
+                if mode == 'references' and source:
+                    return source_reference(source)
+                return writer.signal(values, name)
+
+            signals = {}
+            for number in (1, 2):
+                time_data = getattr(self, f'time_data_{number}')
+                plot_widget = getattr(self, f'pg_plot_widget_{number}')
+                view = plot_widget.getViewBox()
+                signals[number] = {
+                    'time': writer.signal(time_data, f'time_{number}'),
+                    'amplitude': describe(getattr(self, f'amplitude_data_{number}'), f'signal_{number}',
+                                          self.signal_sources.get(number)),
+                    'position': int(getattr(self, f'current_index_{number}')),
+                    'view': None if view.autoRangeEnabled()[0] else list(view.viewRange()[0])
+                }
+
+            # Only the static signals still drawn; resets and unmerging clear the graphs
+            static_signals = []
+            for entry in self.static_signals:
+                if entry['item'] not in entry['plot_widget'].listDataItems():
+                    continue
+                name = f'static_{len(static_signals)}'
+                static_signals.append({
+                    'graph': 1 if entry['plot_widget'] is self.pg_plot_widget_1 else 2,
+                    'time': writer.signal(entry['time'], name + '_time'),
+                    'amplitude': describe(entry['amplitude'], name, entry['source']),
+                    'color': entry['color'],
+                    'preset': entry['preset']
+                })
+
+            colors = {attr: getattr(self, attr) for attr in
+                      ('fig_color', 'graph_color', 'plot_color', 'label_color', 'backface_color')}
+            writer.save(file_path, {
+                'signals': signals,
+                'static_signals': static_signals,
+                'merged': self.is_merged,
+                'linked': self.linked_mode,
+                'speed_index': self.current_speed_index,
+                'filter_preset': self.filter_preset,
+                'derived_trace': self.derived_trace,
+                'plot_colors': self.plot_colors,
+                'color_index': self.current_color_index,
+                'colors': colors
+            })
+            print(f"Workspace saved to {file_path}")
+
+        except Exception as e:
+            print(f"Error saving workspace: {e}")
+
+    @tracer.traced('load')
+    def restore_workspace(self, file_path):
+        """
+        Restore the rectangular page from a workspace file. Stored samples are memory-mapped or decompressed
+        chunk by chunk when they are drawn, so the signals are shown without reading the whole file.
+        Args:
+            file_path (str): Path of the workspace file.
+        """
+        try:
+            workspace = Workspace(file_path)
+            state = workspace.state
+
+            def signal(descriptor):
+                if descriptor['kind'] == 'source':
+                    # Load referenced files with the current storage policy
+                    return load_time_series(check_source(descriptor))[1]
+                return workspace.signal(descriptor)
+
+            # Read everything before changing the page, so a missing source file leaves it as it was
+            signals = {int(number): (workspace.signal(entry['time']), signal(entry['amplitude']))
+                       for number, entry in state['signals'].items()}
+            static_signals = [(entry, workspace.signal(entry['time']), signal(entry['amplitude']))
+                              for entry in state['static_signals']]
+
+            self.show_rectangular_page()
+            self.timer_1.stop()
+            self.timer_2.stop()
+            if self.is_merged:
+                self.unmerge_signals()
+            self.clear_and_prepare_widgets()
+            self.static_signals = []
+            self.reset_button_texts()
+
+            # Settings used while drawing the signals
+            self.current_speed_index = state['speed_index']
+            self.buttons['speed_button'].setText(f"{self.speeds[self.current_speed_index]}X")
+            self.filter_preset = state['filter_preset'] if state['filter_preset'] in FILTER_PRESETS else 'Off'
+            self.buttons['filter_button'].setText(
+                self.filter_preset if self.filter_preset != 'Off' else "Filter: Off")
+            self.derived_trace = state['derived_trace'] if state['derived_trace'] in DERIVED_TRACES else 'Off'
+            self.buttons['trace_button'].setText(
+                self.derived_trace if self.derived_trace != 'Off' else "Traces: Off")
+            self.plot_colors = state['plot_colors']
+            self.current_color_index = state['color_index']
+            for attr, color in state['colors'].items():
+                setattr(self, attr, tuple(color) if isinstance(color, list) else color)
+
+            for number, (time_data, amplitude_data) in signals.items():
+                setattr(self, f'time_data_{number}', time_data)
+                setattr(self, f'amplitude_data_{number}', amplitude_data)
+                setattr(self, f'current_index_{number}', min(state['signals'][str(number)]['position'],
+                                                             len(time_data)))
+                source = state['signals'][str(number)]['amplitude']
+                self.signal_sources[number] = source['path'] if source['kind'] == 'source' else None
+
+            if state['merged']:
+                self.merge_signals()
+            if state['linked'] != self.linked_mode:
+                self.toggle_link_mode(self.buttons['link_button'], self.buttons['play_pause_button_1'],
+                                      self.buttons['play_pause_button_2'], self.buttons['unified_play_pause_button'])
+
+            # Zoomed views first, so only their samples are drawn
+            for number in (1, 2):
+                view_range = state['signals'][str(number)]['view']
+                if view_range is not None:
+                    getattr(self, f'pg_plot_widget_{number}').setXRange(*view_range, padding=0)
+
+            for number in ((1,) if self.is_merged else (1, 2)):
+                self.update_plot(getattr(self, f'pg_plot_widget_{number}'), getattr(self, f'time_data_{number}'),
+                                 getattr(self, f'amplitude_data_{number}'), getattr(self, f'current_index_{number}'),
+                                 max_points=0)
+
+            for entry, time_data, amplitude_data in static_signals:
+                plot_widget = self.pg_plot_widget_1 if entry['graph'] == 1 else self.pg_plot_widget_2
+                source = entry['amplitude']['path'] if entry['amplitude']['kind'] == 'source' else None
+                self.add_static_signal(plot_widget, time_data, amplitude_data, entry['color'],
+                                       entry['preset'] if entry['preset'] in FILTER_PRESETS else 'Off', source)
+
+            print(f"Workspace restored from {file_path}")
+
+        except Exception as e:
+            print(f"Error restoring workspace: {e}")
+
     def toggle_button_mode(self, button_key, active_text, inactive_text, buttons_to_hide, buttons_to_show):
         """
         Toggle the mode of a button and adjust the visibility of related buttons.
@@ -1970,6 +2904,10 @@ class Ui_MainWindow(object):
     def configure_plot(self, plot_widget, title):
         """Helper function to configure the plot widget."""
         plot_widget.setTitle(title, color="w", size="12pt")
+        plot_widget.base_title = title  # Title without the statistics of the visible range
+        # Draw only the visible samples, reduced to their min/max per pixel column; curves added later share this
+        plot_widget.setClipToView(True)
+        plot_widget.setDownsampling(auto=True, mode='peak')
         plot_widget.setLabel("left", "Amplitude (µV)", color="w", size="10pt")
         plot_widget.setLabel("bottom", "Time (s)", color="w", size="10pt")
         plot_widget.showGrid(x=True, y=True, alpha=0.3)
@@ -2008,6 +2946,9 @@ class Ui_MainWindow(object):
 
     def initialize_RTS_graph(self, content_widget, signal_1_button,
                              get_rectangular_report_button, signal_1_label="Signals"):
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
+
         # Set up the canvas for plotting signals
         self.figure = Figure(figsize=(8, 6), dpi=100, facecolor='black', edgecolor='blue', frameon=True)
         self.canvas = FigureCanvas(self.figure)
@@ -2099,11 +3040,7 @@ class Ui_MainWindow(object):
             self.Time_data_1 = np.loadtxt(filename02)
             self.signal_data_1 = np.loadtxt(filename)
             self.index_1 = 0
-            with open('Data/RTS Data/RTS_data.txt', 'r') as file:
-                sum = 0
-                for line in file:
-                    sum += 1
-            self.window_size_1 = sum
+            self.window_size_1 = len(self.signal_data_1)  # One sample per line of the file
             self.line_plot_1, = self.ax1.plot(self.Time_data_1[:self.window_size_1],
                                               self.signal_data_1[:self.window_size_1], color=self.plot_color)
             self.ax1.tick_params(colors=self.label_color)
@@ -2124,6 +3061,8 @@ class Ui_MainWindow(object):
             self.rts_initialized = True
             # Install event filter for scrolling
 
+    @frame_stats.timed('update_RTS_signal', interval=lambda self, *args: args[-1].interval())
+    @tracer.traced('render')
     def update_RTS_signal(self, signal_data_attr, Time_data_attr, index_attr, window_size, line_plot, ax, timer):
         self.update_RTS_data()  # Fetch new data
         # Reload the signal data from the file to ensure we have the latest data
@@ -2182,6 +3121,8 @@ class Ui_MainWindow(object):
 
     def get_real_time_data(self):
         """Fetch real-time data from the Weather API and return current time and temperature."""
+        import requests
+
         url = "https://api.weatherapi.com/v1/current.json?key=135b4139f4fc40a48ba202601240910&q=egypt&aqi=no"
         try:
             response = requests.get(url)
@@ -2299,6 +3240,8 @@ class Ui_MainWindow(object):
     def setup_circular_page(self):
         if not hasattr(self, 'circular_initialized') or not self.circular_initialized:
             print("Setting up Circular page...")
+            from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+            from matplotlib.figure import Figure
 
             # Set the background color of the widget to black
             self.circular_content.setStyleSheet("background-color: black;")
@@ -2363,6 +3306,11 @@ class Ui_MainWindow(object):
                     self.line_polar.set_data(angles[:frame + 1], radii)
                     return self.line_polar,
 
+                # Every frame draws one more sample, with a 5 ms budget
+                update_polar = frame_stats.timed('polar_animation', interval=lambda frame: 5,
+                                                 samples=lambda result, frame: 1)(
+                    tracer.traced('render', name='polar_animation')(update_polar))
+
                 def on_animation_complete(animation, *args):
                     button.setText("Play ▶")
                     animation.event_source.stop()  # Stop the animation event source when animation completes
@@ -2472,6 +3420,8 @@ class Ui_MainWindow(object):
 
         # Add RectangleSelector if callback is provided
         if selector_callback:
+            from matplotlib.widgets import RectangleSelector
+
             selector = RectangleSelector(
                 ax, onselect=selector_callback, useblit=True,
                 button=[1], minspanx=5, minspany=5,
@@ -2481,14 +3431,64 @@ class Ui_MainWindow(object):
         return None
 
 
+STARTUP_PAGES = {'home': None, 'rectangular': 'show_rectangular_page', 'rts': 'show_RTS_page',
+                 'circular': 'show_circular_page'}
+
+
+def finish_startup_measurement(app, ui, startup, page):
+    """
+    Called from the event loop once the main window is on screen: time the first visit of a page if asked, print
+    the startup phases and quit.
+    Args:
+        app: The QApplication.
+        ui: The Ui_MainWindow.
+        startup: The StartupTimer measuring since the start of the imports.
+        page: One of STARTUP_PAGES.
+    """
+    startup.mark("first event loop pass")
+    if STARTUP_PAGES[page]:
+        getattr(ui, STARTUP_PAGES[page])()
+        app.processEvents()
+        startup.mark(f"{page} page")
+    print(startup.report())
+    app.quit()
+
+
 if __name__ == "__main__":
+    import argparse
     import sys
 
-    app = QtWidgets.QApplication(sys.argv)
+    # Options of the viewer itself; everything else is left to Qt
+    parser = argparse.ArgumentParser(description="Dynamic multi-channel signal viewer")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="Record profiling spans and write them as a Chrome trace to PATH at exit "
+                             "(same as setting SIGNAL_VIEWER_TRACE)")
+    parser.add_argument("--startup-time", metavar="PAGE", nargs="?", const="home", choices=list(STARTUP_PAGES),
+                        help="Print how long the start of the viewer takes, up to the first visit of PAGE "
+                             "(default: home), and which optional dependencies were imported, then quit")
+    parser.add_argument("--storage", choices=STORAGE_POLICIES,
+                        help="Storage of loaded samples: float32 (default), int16 for EDF digital samples with "
+                             "their gain and offset, or float64 (same as setting SIGNAL_VIEWER_STORAGE)")
+    parser.add_argument("--workspace", metavar="PATH",
+                        help="Open the rectangular page restored from a workspace saved with \"Save Workspace\"")
+    options, qt_arguments = parser.parse_known_args()
+    if options.trace:
+        tracer.enable(options.trace)
+    if options.storage:
+        set_storage_policy(options.storage)
+    startup = StartupTimer(STARTUP_BEGAN)
+    startup.mark("imports")
+
+    app = QtWidgets.QApplication(sys.argv[:1] + qt_arguments)
+    startup.mark("QApplication")
     MainWindow = QtWidgets.QMainWindow()
-    global_saved_snapshots = []
-    global_saved_statistics = []
     ui = Ui_MainWindow()
     ui.setupUi(MainWindow)
+    startup.mark("main window")
     MainWindow.showFullScreen()
+    startup.mark("show")
+    if options.startup_time:
+        QTimer.singleShot(0, lambda: finish_startup_measurement(app, ui, startup, options.startup_time))
+    elif options.workspace:
+        QTimer.singleShot(0, lambda: ui.restore_workspace(options.workspace))
     sys.exit(app.exec_())
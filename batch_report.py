@@ -0,0 +1,287 @@
+"""
+Headless glue-and-report processing of a directory of recordings.
+
+Every recording (and, depending on the pairing, every glued pair of recordings) is processed on a worker pool
+without Qt: loaded, optionally glued with the same gap synthesis and cross-fade as the glue window, summarized with
+the single-pass statistics kernel and decimated for the report. The results are streamed into a PDF report and a
+machine-readable statistics file (CSV or JSON Lines).
+
+Usage:
+    python batch_report.py "Data/Rectangular Data/ECG" --spec glue.json --report report.pdf --stats stats.csv
+
+The glue spec is a JSON object; missing keys take the values of DEFAULT_SPEC.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from instrumentation import tracer
+from reporting import ReportBuilder, format_statistics, report_trace
+from signal_io import STORAGE_POLICIES, list_recordings, load_signal, set_storage_policy
+from signal_processing import GAP_FILL_METHODS, bridge_signals, crossfade_overlap, find_best_splice, signal_statistics
+
+DEFAULT_SPEC = {
+    'pairing': 'consecutive',  # 'consecutive' glues files 1+2, 3+4, ...; 'none' only summarizes every file
+    'region1': None,  # [start, end] samples of the first recording, None for all of it
+    'region2': None,  # [start, end] samples of the second recording, None for all of it
+    'gap': 50,  # Samples synthesized between the portions
+    'method': 'pchip',  # One of GAP_FILL_METHODS
+    'context': 16,  # Samples used on each side of the gap
+    'crossfade': 0,  # Overlap the portions by this many samples instead of inserting a gap
+    'snap': False,  # Move the join to the best nearby splice point first
+    'splice_radius': 256,  # Search radius of the splice point, in samples
+    'percentiles': [5, 50, 95],
+}
+
+STATS_COLUMNS = ['file', 'signal', 'count', 'mean', 'std', 'rms', 'min', 'max', 'peak_to_peak', 'zero_crossing_rate']
+
+# Colors of the report plots, as in the glue window
+SIGNAL_COLORS = {'Signal 1': 'blue', 'Signal 2': 'green', 'Glued Signal': 'red'}
+
+
+def load_spec(path=None):
+    """
+    Read a glue spec from a JSON file, filling in the defaults.
+    Args:
+        path: Path of the JSON file, or None for the defaults.
+    Returns:
+        The spec as a dictionary.
+    """
+    spec = dict(DEFAULT_SPEC)
+    if path:
+        with open(path) as f:
+            overrides = json.load(f)
+        unknown = set(overrides) - set(DEFAULT_SPEC)
+        if unknown:
+            raise ValueError(f"Unknown glue spec keys: {', '.join(sorted(unknown))}")
+        spec.update(overrides)
+
+    if spec['pairing'] not in ('consecutive', 'none'):
+        raise ValueError(f"Unsupported pairing: {spec['pairing']}")
+    if spec['method'] not in GAP_FILL_METHODS:
+        raise ValueError(f"Unsupported gap fill method: {spec['method']}")
+    return spec
+
+
+def make_jobs(paths, spec):
+    """
+    Group recordings into jobs: pairs to glue, or single files.
+    Returns:
+        A list of tuples of one or two file paths.
+    """
+    if spec['pairing'] == 'none':
+        return [(path,) for path in paths]
+    return [tuple(paths[i:i + 2]) for i in range(0, len(paths), 2)]
+
+
+def glue(signal1, signal2, spec):
+    """
+    Glue the selected regions of two signals as the glue window does.
+    Returns:
+        The glued signal.
+    """
+    start1, end1 = spec['region1'] or (0, len(signal1))
+    start2, end2 = spec['region2'] or (0, len(signal2))
+    start1, end1 = np.clip([start1, end1], 0, len(signal1))
+    start2, end2 = np.clip([start2, end2], 0, len(signal2))
+
+    if spec['snap']:
+        end1, start2, _ = find_best_splice(signal1, end1, signal2, start2, radius=spec['splice_radius'])
+
+    portion1, portion2 = signal1[start1:end1], signal2[start2:end2]
+    if len(portion1) == 0 or len(portion2) == 0:
+        raise ValueError("Empty glue region")
+
+    overlap = min(spec['crossfade'], len(portion1), len(portion2))
+    if overlap > 0:
+        split = len(portion1) - overlap
+        join = crossfade_overlap(portion1[split:], portion2[:overlap])
+        portion1, portion2 = portion1[:split], portion2[overlap:]
+    else:
+        join = bridge_signals(portion1, portion2, spec['gap'], method=spec['method'], context=spec['context'])
+    return np.concatenate([portion1, join, portion2])
+
+
+@tracer.traced('report')
+def process_job(job, spec):
+    """
+    Load, glue and summarize the recordings of one job. Runs in a worker process.
+    Args:
+        job: Tuple of one or two file paths.
+        spec: The glue spec.
+    Returns:
+        A session dictionary for ReportBuilder, with 'name' and 'entries'. Entries carry the raw statistics
+        under 'values' for the statistics file. A job that fails returns its error under 'error'.
+    """
+    name = " + ".join(os.path.basename(path) for path in job)
+    try:
+        # label -> (file, title in the report, samples)
+        signals = {}
+        for i, path in enumerate(job, start=1):
+            signals[f'Signal {i}'] = (path, f"Signal {i}: {os.path.basename(path)}", load_signal(path))
+        if len(job) == 2:
+            glued = glue(signals['Signal 1'][2], signals['Signal 2'][2], spec)
+            signals['Glued Signal'] = (name, f"Glued Signal: {name}", glued)
+
+        entries = {}
+        for label, (file, title, signal) in signals.items():
+            values = signal_statistics(signal, percentiles=spec['percentiles'], workers=1)
+            entries[title] = {
+                'file': file,
+                'signal': label,
+                'color': SIGNAL_COLORS[label],
+                'values': values,
+                'statistics': format_statistics(values, len(signal)),
+                'trace': report_trace(signal),
+            }
+        return {'name': name, 'entries': entries}
+    except Exception as e:
+        return {'name': name, 'entries': {}, 'error': str(e)}
+
+
+class StatsWriter:
+    """
+    Write one row per entry to a CSV or JSON Lines statistics file, chosen by the file extension.
+    """
+
+    def __init__(self, path, percentiles):
+        self.path = path
+        self.json_lines = stats_format(path) == 'jsonl'
+        self.columns = STATS_COLUMNS + [f'p{percentile:g}' for percentile in percentiles]
+        self.file = open(path, 'w', newline='')
+        if not self.json_lines:
+            self.writer = csv.DictWriter(self.file, fieldnames=self.columns + ['error'])
+            self.writer.writeheader()
+
+    def write_session(self, session):
+        rows = [dict(entry['values'], file=entry['file'], signal=entry['signal'])
+                for entry in session['entries'].values()]
+        if 'error' in session:
+            rows.append({'file': session['name'], 'error': session['error']})
+
+        for row in rows:
+            row = {key: to_builtin(value) for key, value in row.items() if key in self.columns or key == 'error'}
+            if self.json_lines:
+                self.file.write(json.dumps(row) + "\n")
+            else:
+                self.writer.writerow(row)
+
+    def close(self):
+        self.file.close()
+
+
+def stats_format(path):
+    """
+    Returns:
+        'jsonl' for a .jsonl statistics file, 'csv' otherwise.
+    Raises:
+        ValueError: For a .json path, as the rows are not written as a single JSON document.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.json':
+        raise ValueError(f"Statistics are written as CSV or JSON Lines; name the file .csv or .jsonl: {path}")
+    return 'jsonl' if extension == '.jsonl' else 'csv'
+
+
+def to_builtin(value):
+    """Convert numpy scalars to plain Python values for serialization."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def run_batch(directory, spec, report_path, stats_path, workers=None, recursive=False, progress=None):
+    """
+    Process every recording of a directory and write the report and the statistics file.
+    Args:
+        directory: Directory holding the recordings.
+        spec: The glue spec, see load_spec.
+        report_path: Path of the PDF report, or None to skip it.
+        stats_path: Path of the statistics file (.csv or .jsonl), or None to skip it.
+        workers: Number of worker processes; 1 processes everything in this process.
+        recursive: Also process recordings in sub-directories.
+        progress: Optional callable receiving (jobs done, total jobs, session) after every job.
+    Returns:
+        The number of jobs that failed.
+    """
+    jobs = make_jobs(list_recordings(directory, recursive), spec)
+    if not jobs:
+        raise ValueError(f"No recordings found in {directory}")
+
+    failures = 0
+    stats_writer = StatsWriter(stats_path, spec['percentiles']) if stats_path else None
+    pool = None
+    if workers != 1:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def sessions():
+        nonlocal failures
+        # Results arrive in job order; the chunk size keeps inter-process traffic low for thousands of files
+        results = (pool.map(process_job, jobs, [spec] * len(jobs), chunksize=max(1, len(jobs) // 64))
+                   if pool is not None else (process_job(job, spec) for job in jobs))
+        for done, session in enumerate(results, start=1):
+            failures += 'error' in session
+            if stats_writer is not None:
+                stats_writer.write_session(session)
+            if progress is not None:
+                progress(done, len(jobs), session)
+            yield session
+
+    try:
+        if report_path:
+            ReportBuilder(report_path, title="Batch Signal Statistics Report",
+                          subtitle=f"Recordings in {directory}").build(sessions())
+        else:
+            for _ in sessions():
+                pass
+    finally:
+        if stats_writer is not None:
+            stats_writer.close()
+        if pool is not None:
+            pool.shutdown()
+    return failures
+
+
+def print_progress(done, total, session):
+    if 'error' in session:
+        print(f"[{done}/{total}] {session['name']}: error: {session['error']}", file=sys.stderr)
+    else:
+        print(f"[{done}/{total}] {session['name']}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Glue and summarize every recording of a directory without the GUI.")
+    parser.add_argument("directory", help="Directory of CSV, TXT or EDF recordings")
+    parser.add_argument("--spec", help="JSON glue spec; see DEFAULT_SPEC in batch_report.py")
+    parser.add_argument("--report", default="batch_report.pdf", help="PDF report to write ('' to skip)")
+    parser.add_argument("--stats", default="batch_stats.csv", help="Statistics file, .csv or .jsonl ('' to skip)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--recursive", action="store_true", help="Include sub-directories")
+    parser.add_argument("--quiet", action="store_true", help="Do not print progress")
+    parser.add_argument("--storage", choices=STORAGE_POLICIES,
+                        help="Storage of loaded samples (default: float32, or SIGNAL_VIEWER_STORAGE)")
+    args = parser.parse_args(argv)
+    if args.stats:
+        try:
+            stats_format(args.stats)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.storage:
+        set_storage_policy(args.storage)
+
+    spec = load_spec(args.spec)
+    failures = run_batch(args.directory, spec, args.report or None, args.stats or None, workers=args.workers,
+                         recursive=args.recursive, progress=None if args.quiet else print_progress)
+    if args.report:
+        print(f"Report written to {args.report}")
+    if args.stats:
+        print(f"Statistics written to {args.stats}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,402 @@
+"""
+Headless benchmarks of the signal viewer's hot paths.
+
+Every case runs on synthetic signals of the requested sizes under the offscreen Qt platform, so the suite runs on
+build machines without a display. Results are appended to a JSON Lines file, one record per case and size, and can
+be compared with an earlier run to catch regressions.
+
+Usage:
+    python benchmarks.py --sizes 1e3,1e4,1e5,1e6 --output benchmarks.jsonl
+    python benchmarks.py --cases update_plot,statistics --sizes 1e8 --compare baseline.jsonl
+
+Some cases have a size cap (see CASES) because their cost is dominated by something other than the signal, such as
+writing a multi-gigabyte text file before loading it; pass --no-caps to lift the caps.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Must be set before Qt is imported, here or by Main
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+
+DEFAULT_SIZES = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6)
+
+# Ticks of the playback loops timed per measurement
+TICKS = 100
+
+
+def synthetic_signal(n, seed=0):
+    """
+    A reproducible ECG-like test signal: a 1.2 Hz pulse train over a slow baseline with noise, at 1 kHz.
+    Returns:
+        (time, amplitude) float64 arrays of n samples.
+    """
+    rng = np.random.default_rng(seed)
+    time_data = np.arange(n) / 1000.0
+    phase = (time_data * 1.2) % 1.0
+    amplitude = (np.exp(-((phase - 0.5) / 0.01) ** 2) + 0.2 * np.sin(2 * np.pi * 0.3 * time_data)
+                 + 0.02 * rng.standard_normal(n))
+    return time_data, amplitude
+
+
+def measure(run, repeats, budget):
+    """
+    Time a callable until it ran `repeats` times or `budget` seconds have passed, whichever comes first.
+    Returns:
+        The list of durations in seconds (at least one).
+    """
+    durations = []
+    started = time.perf_counter()
+    while len(durations) < repeats and (not durations or time.perf_counter() - started < budget):
+        begin = time.perf_counter()
+        run()
+        durations.append(time.perf_counter() - begin)
+    return durations
+
+
+class Harness:
+    """
+    Shared state of a benchmark run: the Qt application, the main window and a scratch directory.
+    """
+
+    def __init__(self):
+        self.directory = tempfile.mkdtemp(prefix="signal_viewer_bench_")
+        # The cases open the bundled data by relative paths, as the application does from its own folder
+        self.previous_directory = os.getcwd()
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+        # Keep the saved sessions of the report benchmarks out of the user's database
+        os.environ.setdefault("SIGNAL_VIEWER_SESSIONS", os.path.join(self.directory, "sessions.db"))
+
+        from PyQt5 import QtGui, QtWidgets
+
+        import Main
+
+        self.Main = Main
+        self.app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+        # Reports are written but not opened in a viewer
+        QtGui.QDesktopServices.openUrl = lambda url: True
+        self.ui = None
+
+    def main_window(self):
+        """The main window with its rectangular page, created on first use."""
+        if self.ui is None:
+            from PyQt5 import QtWidgets
+
+            self.window = QtWidgets.QMainWindow()
+            self.ui = self.Main.Ui_MainWindow()
+            self.ui.setupUi(self.window)
+            self.ui.setup_rectangular_page()
+            self.window.show()
+        return self.ui
+
+    def pump(self):
+        """Let Qt paint what changed, as the event loop would between timer ticks."""
+        self.app.processEvents()
+
+    def close(self):
+        os.chdir(self.previous_directory)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def bench_update_plot(harness, n):
+    """
+    The rectangular playback tick at every speed of the speed button, with the signal fully played, on an explicit
+    time column and on an implicit (UniformTime) axis.
+    """
+    from signal_io import UniformTime
+
+    ui = harness.main_window()
+    time_column, amplitude = synthetic_signal(n)
+    start = max(0, n - TICKS * 5)
+
+    for axis, time_data in (('explicit', time_column), ('implicit', UniformTime(0.0, 0.001, n))):
+        ui.time_data_1, ui.amplitude_data_1 = time_data, amplitude
+        for speed in ui.speeds:
+            def run(time_data=time_data):
+                index = start
+                for _ in range(TICKS):
+                    index = ui.update_plot(ui.pg_plot_widget_1, time_data, amplitude, index)
+                    harness.pump()
+            # The timer interval shrinks with the speed, so the same tick has less budget
+            yield {'axis': axis, 'speed': speed, 'ticks': TICKS, 'interval_ms': int(100 / speed)}, run
+
+
+def bench_loaders(harness, n):
+    """signal_io.load_signal on CSV, TXT and EDF files."""
+    from signal_io import load_signal
+
+    time_data, amplitude = synthetic_signal(n)
+    paths = {extension: os.path.join(harness.directory, f"signal_{n}{extension}") for extension in
+             ('.csv', '.txt', '.edf')}
+    np.savetxt(paths['.csv'], np.column_stack([time_data, amplitude]), delimiter=',', header='Time,Signal',
+               comments='')
+    np.savetxt(paths['.txt'], amplitude)
+    write_edf(paths['.edf'], amplitude)
+
+    for extension, path in paths.items():
+        yield {'format': extension[1:]}, lambda path=path: load_signal(path)
+
+
+def write_edf(path, signal, rate=1000):
+    """Write a single-channel EDF file with pyEDFlib."""
+    import pyedflib
+
+    # EDF stores whole data records, so the signal is padded to a multiple of the rate
+    padded = np.pad(signal, (0, -len(signal) % rate), mode='edge')
+    with pyedflib.EdfWriter(path, 1, file_type=pyedflib.FILETYPE_EDFPLUS) as writer:
+        writer.setSignalHeader(0, {'label': 'ECG', 'dimension': 'uV', 'sample_frequency': rate,
+                                   'physical_max': float(np.ceil(padded.max())) + 1.0,
+                                   'physical_min': float(np.floor(padded.min())) - 1.0,
+                                   'digital_max': 32767, 'digital_min': -32768})
+        writer.writeSamples([padded])
+
+
+def bench_glue(harness, n):
+    """perform_glue on half of each signal, and interpolate_gap with every gap fill method."""
+    _, signal1 = synthetic_signal(n, seed=1)
+    _, signal2 = synthetic_signal(n, seed=2)
+    window = glue_window(harness, signal1, signal2)
+
+    yield {'operation': 'perform_glue'}, window.perform_glue
+    portion1, portion2 = signal1[:n // 2], signal2[n // 2:]
+    for method in harness.Main.GAP_FILL_METHODS:
+        yield {'operation': 'interpolate_gap', 'method': method}, \
+            lambda method=method: window.interpolate_gap(portion1, portion2, 50, method)
+
+
+def glue_window(harness, signal1, signal2):
+    """A glue window with the first half of Signal 1 and the second half of Signal 2 selected."""
+    window = harness.Main.GlueSignalsWindow(signal1, signal2)
+    window.preview_timer.stop()
+    window.region1.setRegion((0, len(signal1) // 2))
+    window.region2.setRegion((len(signal2) // 2, len(signal2)))
+    window.preview_timer.stop()
+    return window
+
+
+def bench_reporting(harness, n):
+    """calculate_statistics and generate_report of a saved glue session."""
+    _, signal1 = synthetic_signal(n, seed=1)
+    _, signal2 = synthetic_signal(n, seed=2)
+    window = glue_window(harness, signal1, signal2)
+    window.perform_glue()
+
+    yield {'operation': 'calculate_statistics'}, lambda: window.calculate_statistics(signal1)
+
+    renders = iter(range(1 << 30))
+
+    def report():
+        window.signal_digests = None
+        window.signal1 = signal1 + next(renders)  # A new session for every report
+        window.save_data()
+        window.generate_report()
+        while window.report_worker is not None:
+            harness.pump()
+            time.sleep(0.001)
+    yield {'operation': 'generate_report'}, report
+
+
+def bench_rts(harness, n):
+    """The RTS tick: reloading the data files and redrawing the matplotlib line, without the weather request."""
+    directory = os.path.join(harness.directory, f"rts_{n}")
+    os.makedirs(os.path.join(directory, "Data", "RTS Data"), exist_ok=True)
+    time_data, amplitude = synthetic_signal(n)
+    np.savetxt(os.path.join(directory, "Data", "RTS Data", "RTS_data.txt"), amplitude, fmt='%.4f')
+    np.savetxt(os.path.join(directory, "Data", "RTS Data", "Time_data.txt"), time_data, fmt='%.4f')
+
+    ui = harness.main_window()
+    previous = os.getcwd()
+    os.chdir(directory)  # The RTS page reads its files relative to the working directory
+    try:
+        ui.setup_RTS_page()  # Built on the first size only, like the page itself
+    finally:
+        os.chdir(previous)
+    ui.update_RTS_data = lambda: None  # The live source is a web request, not part of the benchmark
+    window_size = max(1, n // 2)
+
+    def run():
+        os.chdir(directory)
+        try:
+            ui.index_1 = 0
+            for _ in range(TICKS // 10):
+                ui.update_RTS_signal('signal_data_1', 'Time_data_1', 'index_1', window_size, ui.line_plot_1,
+                                     ui.ax1, ui.timer_1)
+                harness.pump()
+        finally:
+            os.chdir(previous)
+    yield {'ticks': TICKS // 10}, run
+
+
+def bench_circular(harness, n):
+    """Frames of the polar animation of the circular page."""
+    from PyQt5 import QtWidgets
+
+    ui = harness.main_window()
+    ui.setup_circular_page()
+    ui.data = synthetic_signal(n)[1]
+    if hasattr(ui, 'ani_polar'):
+        del ui.ani_polar  # The animation is created for the current data
+    button = QtWidgets.QPushButton("Play ▶")
+    ui.toggle_play_pause_circular_signal(button)  # Creates the animation
+    ui.toggle_play_pause_circular_signal(button)  # Stops its timer; frames are drawn below
+    frames = iter(range(1 << 30))
+
+    def run():
+        for _ in range(TICKS):
+            ui.ani_polar._draw_next_frame(next(frames) % (n + 1), blit=True)
+        harness.pump()
+    yield {'frames': TICKS}, run
+
+
+# name -> (function yielding (parameters, callable) pairs for a size, largest size run without --no-caps)
+CASES = {
+    'update_plot': (bench_update_plot, 10 ** 7),
+    'loaders': (bench_loaders, 10 ** 6),
+    'glue': (bench_glue, 10 ** 8),
+    'reporting': (bench_reporting, 10 ** 7),
+    'rts': (bench_rts, 10 ** 5),
+    'circular': (bench_circular, 10 ** 6),
+}
+
+
+def environment():
+    """Describe the machine and code version, so results from different runs can be told apart."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+    return {'commit': commit or None, 'python': platform.python_version(), 'numpy': np.__version__,
+            'machine': platform.machine(), 'cpus': os.cpu_count()}
+
+
+def run_benchmarks(cases, sizes, repeats=5, budget=10.0, caps=True, progress=None):
+    """
+    Run benchmark cases over signal sizes.
+    Args:
+        cases: Names from CASES.
+        sizes: Signal lengths in samples.
+        repeats: Measurements per case and size.
+        budget: Seconds after which a case stops repeating (it always runs at least once).
+        caps: Skip sizes above the cap of a case.
+        progress: Optional callable receiving every record as it is produced.
+    Returns:
+        A list of result records.
+    """
+    harness = Harness()
+    run_id = time.strftime("%Y-%m-%dT%H:%M:%S")
+    context = environment()
+    records = []
+    try:
+        for name in cases:
+            function, cap = CASES[name]
+            for n in sizes:
+                if caps and n > cap:
+                    continue
+                try:
+                    for parameters, run in function(harness, n):
+                        durations = measure(run, repeats, budget)
+                        record = dict(run=run_id, case=name, size=n, parameters=parameters, repeats=len(durations),
+                                      min=min(durations), median=float(np.median(durations)),
+                                      mean=float(np.mean(durations)), **context)
+                        records.append(record)
+                        if progress is not None:
+                            progress(record)
+                except Exception as e:
+                    record = dict(run=run_id, case=name, size=n, error=f"{type(e).__name__}: {e}", **context)
+                    records.append(record)
+                    if progress is not None:
+                        progress(record)
+    finally:
+        harness.close()
+    return records
+
+
+def record_key(record):
+    return record['case'], record['size'], json.dumps(record.get('parameters'), sort_keys=True)
+
+
+def compare(records, baseline_path, tolerance=0.2):
+    """
+    Compare the median times of a run with the latest earlier result of every case in a results file.
+    Returns:
+        A list of (record, baseline median, ratio) for the cases more than `tolerance` slower than the baseline.
+    """
+    baseline = {}
+    with open(baseline_path) as f:
+        for line in f:
+            previous = json.loads(line)
+            if 'median' in previous:
+                baseline[record_key(previous)] = previous['median']  # Later runs replace earlier ones
+
+    regressions = []
+    for record in records:
+        reference = baseline.get(record_key(record))
+        if 'median' in record and reference:
+            ratio = record['median'] / reference
+            if ratio > 1.0 + tolerance:
+                regressions.append((record, reference, ratio))
+    return regressions
+
+
+def print_record(record):
+    parameters = ' '.join(f"{key}={value}" for key, value in (record.get('parameters') or {}).items())
+    if 'error' in record:
+        print(f"{record['case']:<12} n={record['size']:<10} {parameters} error: {record['error']}", file=sys.stderr)
+    else:
+        print(f"{record['case']:<12} n={record['size']:<10} {parameters:<40} median {1000 * record['median']:10.3f} ms "
+              f"(min {1000 * record['min']:.3f} ms, {record['repeats']} runs)", file=sys.stderr)
+
+
+def parse_sizes(text):
+    return [int(float(size)) for size in text.split(',') if size]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the signal viewer's hot paths without a display.")
+    parser.add_argument("--cases", default=",".join(CASES), help=f"Comma-separated cases ({', '.join(CASES)})")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="Comma-separated signal lengths, e.g. 1e3,1e6,1e8")
+    parser.add_argument("--repeats", type=int, default=5, help="Measurements per case and size")
+    parser.add_argument("--budget", type=float, default=10.0, help="Seconds after which a case stops repeating")
+    parser.add_argument("--no-caps", action="store_true", help="Run every case at every size")
+    parser.add_argument("--output", default="benchmarks.jsonl", help="JSON Lines file the results are appended to")
+    parser.add_argument("--compare", help="Earlier results file; exit with 1 if a case got slower")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before --compare fails")
+    args = parser.parse_args(argv)
+
+    cases = [name for name in args.cases.split(',') if name]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"Unknown cases: {', '.join(sorted(unknown))}")
+
+    # The harness runs from the folder of this script; result paths stay relative to the caller's
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = os.path.abspath(args.compare) if args.compare else None
+
+    records = run_benchmarks(cases, parse_sizes(args.sizes), args.repeats, args.budget, not args.no_caps,
+                             progress=print_record)
+    if output:
+        with open(output, 'a') as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        print(f"Results appended to {args.output}")
+
+    regressions = compare(records, baseline, args.tolerance) if baseline else []
+    for record, reference, ratio in regressions:
+        print(f"Slower: {record['case']} n={record['size']} {record.get('parameters')}: "
+              f"{1000 * reference:.3f} ms -> {1000 * record['median']:.3f} ms ({ratio:.2f}x)")
+    # A case that failed is a failure of the run, whether or not results are compared
+    return 1 if regressions or any('error' in record for record in records) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,373 @@
+"""
+Frame-time instrumentation of the timer-driven playback callbacks, and opt-in profiling spans.
+
+Every instrumented callback records its duration, the jitter of the time between its calls, the frames it dropped
+or finished late and the samples it drew into fixed log-spaced histograms. Recording a tick costs two clock reads
+and a few additions, so the instrumentation stays on in production and is read on demand by the on-screen HUD or a
+periodic dump. There is no Qt dependency: the callbacks report their timer interval themselves.
+
+The Tracer records spans of loading, parsing, decimation, rendering, glue, statistics and report generation on every
+thread and writes them as a Chrome trace (chrome://tracing, https://ui.perfetto.dev) when the process exits. It is
+switched on with the SIGNAL_VIEWER_TRACE environment variable (the path of the trace file) or Main.py's --trace
+option, and costs one attribute check per traced call while off. The StartupTimer measures the phases of the start
+of the viewer for Main.py's --startup-time option.
+"""
+import atexit
+import functools
+import json
+import math
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+# Histogram bins cover 1 us to about 16 s in quarter octaves (each bin is about 19% wide)
+BINS_PER_OCTAVE = 4
+LOWEST_OCTAVE = -10  # 2^-10 ms
+OCTAVES = 24
+
+# A gap longer than this many intervals is a pause or a restart, not dropped frames
+RESUME_GAP = 10
+
+
+class LogHistogram:
+    """
+    Histogram of positive durations in milliseconds with log-spaced bins, for percentiles in constant memory.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (BINS_PER_OCTAVE * OCTAVES)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if value > self.maximum:
+            self.maximum = value
+        if value > 0:
+            index = int((math.log2(value) - LOWEST_OCTAVE) * BINS_PER_OCTAVE)
+            self.counts[min(max(index, 0), len(self.counts) - 1)] += 1
+        else:
+            self.counts[0] += 1
+
+    def percentile(self, q):
+        """
+        Returns:
+            The upper edge of the bin holding the q-th percentile (0-100), or 0 for an empty histogram.
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(2.0 ** ((index + 1) / BINS_PER_OCTAVE + LOWEST_OCTAVE), self.maximum)
+        return self.maximum
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class TickMonitor:
+    """
+    Statistics of one timer-driven callback.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.durations = LogHistogram()  # Time spent in the callback, ms
+        self.jitter = LogHistogram()  # Deviation of the time between calls from the timer interval, ms
+        self.samples = 0  # Samples drawn, summed over the ticks
+        self.ticks = 0
+        self.late = 0  # Ticks that took longer than the timer interval
+        self.dropped = 0  # Timer intervals that passed without a tick
+        self.last_start = None
+        self.interval = None  # Latest timer interval, ms
+
+    def record(self, start, duration, interval=None, samples=None):
+        """
+        Record a tick.
+        Args:
+            start: Start of the tick, from time.perf_counter_ns().
+            duration: Duration of the tick in nanoseconds.
+            interval: Interval of the driving timer in milliseconds, if known.
+            samples: Samples drawn by the tick, if meaningful.
+        """
+        milliseconds = duration * 1e-6
+        self.ticks += 1
+        self.durations.add(milliseconds)
+        if samples is not None:
+            self.samples += samples
+
+        if interval:
+            self.interval = interval
+            if milliseconds > interval:
+                self.late += 1
+            if self.last_start is not None:
+                gap = (start - self.last_start) * 1e-6
+                if gap < RESUME_GAP * interval:
+                    self.jitter.add(abs(gap - interval))
+                    self.dropped += max(0, int(round(gap / interval)) - 1)
+        self.last_start = start
+
+    def summary(self):
+        """
+        Returns:
+            A dictionary of the tick count, duration and jitter percentiles (ms), late and dropped frames and the
+            mean samples per frame.
+        """
+        return {
+            'ticks': self.ticks,
+            'interval_ms': self.interval,
+            'duration_mean_ms': self.durations.mean(),
+            'duration_p50_ms': self.durations.percentile(50),
+            'duration_p99_ms': self.durations.percentile(99),
+            'duration_max_ms': self.durations.maximum,
+            'jitter_p50_ms': self.jitter.percentile(50),
+            'jitter_p99_ms': self.jitter.percentile(99),
+            'late': self.late,
+            'dropped': self.dropped,
+            'samples_per_frame': self.samples / self.ticks if self.ticks else 0.0,
+        }
+
+
+class FrameStats:
+    """
+    Registry of the TickMonitors of an application.
+    """
+
+    def __init__(self):
+        self.monitors = {}
+        self.lock = threading.Lock()
+
+    def monitor(self, name):
+        """The TickMonitor of a callback, created on first use."""
+        monitor = self.monitors.get(name)
+        if monitor is None:
+            with self.lock:
+                monitor = self.monitors.setdefault(name, TickMonitor(name))
+        return monitor
+
+    def timed(self, name, interval=None, samples=None):
+        """
+        Decorator recording every call of a timer callback.
+        Args:
+            name: Monitor name, or a callable receiving the call's arguments and returning it.
+            interval: Callable receiving the call's arguments and returning the timer interval in ms.
+            samples: Callable receiving the result followed by the call's arguments and returning the samples drawn.
+        """
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter_ns()
+                result = function(*args, **kwargs)
+                duration = time.perf_counter_ns() - start
+                try:
+                    self.monitor(name(*args, **kwargs) if callable(name) else name).record(
+                        start, duration,
+                        interval(*args, **kwargs) if interval is not None else None,
+                        samples(result, *args, **kwargs) if samples is not None else None)
+                except Exception as e:
+                    print(f"Error recording frame statistics: {e}")  # Never break playback
+                return result
+            return wrapper
+        return decorator
+
+    def summary(self):
+        """
+        Returns:
+            The summary of every monitor that recorded at least one tick, by name.
+        """
+        return {name: monitor.summary() for name, monitor in sorted(self.monitors.items()) if monitor.ticks}
+
+    def report(self):
+        """
+        Returns:
+            A fixed-width text table of the summary, one line per callback.
+        """
+        lines = [f"{'callback':<22}{'ticks':>7}{'p50 ms':>8}{'p99 ms':>8}{'max ms':>8}{'jit99':>7}"
+                 f"{'late':>6}{'drop':>6}{'smp/f':>7}"]
+        for name, stats in self.summary().items():
+            lines.append(f"{name:<22}{stats['ticks']:>7}{stats['duration_p50_ms']:>8.2f}"
+                         f"{stats['duration_p99_ms']:>8.2f}{stats['duration_max_ms']:>8.2f}"
+                         f"{stats['jitter_p99_ms']:>7.1f}{stats['late']:>6}{stats['dropped']:>6}"
+                         f"{stats['samples_per_frame']:>7.1f}")
+        return "\n".join(lines)
+
+    def dump(self, path=None):
+        """
+        Print the report, or append the summary as a JSON line with a timestamp to a file.
+        """
+        if path is None:
+            print(self.report())
+            return
+        with open(path, 'a') as f:
+            f.write(json.dumps({'time': time.time(), 'callbacks': self.summary()}) + "\n")
+
+    def reset(self):
+        with self.lock:
+            self.monitors = {}
+
+
+class Tracer:
+    """
+    Recorder of timed spans in the Chrome trace event format.
+    """
+
+    def __init__(self, path=None):
+        self.path = None
+        self.events = []  # list.append is atomic, so threads record without a lock
+        self.threads = {}  # Thread ident -> name, for the metadata events
+        self.origin = time.perf_counter_ns()
+        if path:
+            self.enable(path)
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def enable(self, path):
+        """
+        Start recording; the trace is written to `path` at exit. Worker processes inherit the setting through the
+        environment and write next to it, with their process id in the file name.
+        """
+        if self.path is None:
+            atexit.register(self.write)
+        self.path = path
+        os.environ["SIGNAL_VIEWER_TRACE"] = path
+
+    def span(self, name, category="app", **args):
+        """
+        Context manager recording a span; it does nothing while tracing is off.
+        Args:
+            name: Name of the span in the trace.
+            category: One of load, parse, decimate, render, glue, stats, report.
+            args: Values shown with the span, such as sizes.
+        """
+        if self.path is None:
+            return _NO_SPAN
+        return _Span(self, name, category, args)
+
+    def traced(self, category, name=None):
+        """
+        Decorator recording every call of a function as a span named after it.
+        """
+        def decorator(function):
+            label = name or function.__qualname__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if self.path is None:
+                    return function(*args, **kwargs)
+                start = time.perf_counter_ns()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.record(label, category, start, time.perf_counter_ns())
+            return wrapper
+        return decorator
+
+    def record(self, name, category, start, end, args=None):
+        """Add a complete event; times are perf_counter_ns values."""
+        thread = threading.get_ident()
+        if thread not in self.threads:
+            self.threads[thread] = threading.current_thread().name
+        event = {'name': name, 'cat': category, 'ph': 'X', 'pid': os.getpid(), 'tid': thread,
+                 'ts': (start - self.origin) / 1000.0, 'dur': (end - start) / 1000.0}
+        if args:
+            event['args'] = args
+        self.events.append(event)
+
+    def write(self):
+        """Write the recorded spans and the thread names as a Chrome trace JSON file."""
+        if self.path is None or not self.events:
+            return
+        path = self.path
+        if multiprocessing.parent_process() is not None:  # Only known once the worker has started
+            stem, extension = os.path.splitext(path)
+            path = f"{stem}.{os.getpid()}{extension or '.json'}"
+        metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': thread, 'args': {'name': name}}
+                    for thread, name in list(self.threads.items())]
+        try:
+            with open(path, 'w') as f:
+                json.dump({'traceEvents': metadata + list(self.events), 'displayTimeUnit': 'ns'}, f)
+            print(f"Trace written to {path}")
+        except OSError as e:
+            print(f"Error writing trace: {e}")
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'category', 'args', 'start')
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer, self.name, self.category, self.args = tracer, name, category, args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, self.category, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+# Optional dependencies that should only be imported when a page or feature needs them
+HEAVY_MODULES = ('matplotlib', 'scipy', 'reportlab', 'pyedflib', 'requests', 'pyqtgraph')
+
+
+class StartupTimer:
+    """
+    Wall-clock phases of the start of the application, for Main.py's --startup-time option.
+    """
+
+    def __init__(self, start=None):
+        """
+        Args:
+            start: perf_counter_ns() value the first phase is measured from, defaults to now.
+        """
+        self.start = start if start is not None else time.perf_counter_ns()
+        self.last = self.start
+        self.phases = []  # (name, duration in ns)
+
+    def mark(self, name):
+        """End the current phase; it is also recorded as a span when tracing is on."""
+        now = time.perf_counter_ns()
+        self.phases.append((name, now - self.last))
+        if tracer.enabled:
+            tracer.record(name, 'load', self.last, now)
+        self.last = now
+
+    def report(self, modules=HEAVY_MODULES):
+        """
+        Returns:
+            A text table of the phases and their running total in milliseconds, followed by which of the given
+            modules have been imported so far.
+        """
+        lines = [f"{'phase':<24}{'ms':>9}{'total ms':>10}"]
+        total = 0
+        for name, duration in self.phases:
+            total += duration
+            lines.append(f"{name:<24}{duration * 1e-6:>9.1f}{total * 1e-6:>10.1f}")
+        loaded = [name for name in modules if name in sys.modules]
+        lines.append("imported: " + (", ".join(loaded) or "none"))
+        lines.append("not imported: " + (", ".join(name for name in modules if name not in loaded) or "none"))
+        return "\n".join(lines)
+
+
+# Shared by every module, so spans of the numerical kernels and of the GUI end up in one trace
+tracer = Tracer(os.environ.get("SIGNAL_VIEWER_TRACE"))
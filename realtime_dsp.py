@@ -0,0 +1,826 @@
+"""
+Streaming signal processing for the playback views.
+
+The classes in this module consume a signal chunk by chunk, as playback reveals it, and carry their state between
+chunks so that the cost of every frame depends only on the number of new samples. Like signal_processing, they
+work on plain numpy arrays and have no Qt dependency.
+"""
+import bisect
+from functools import lru_cache
+
+import numpy as np
+
+from signal_processing import sample_rate
+
+
+@lru_cache(maxsize=32)
+def spectral_window(name, length):
+    """
+    Window of a given type and length, computed once and shared by every analyzer that uses it.
+    Returns:
+        A read-only float64 array.
+    """
+    from scipy.signal import get_window
+
+    window = get_window(name, length)
+    window.setflags(write=False)
+    return window
+
+
+class StreamingSpectrogram:
+    """
+    Short-time Fourier transform computed incrementally, with a running Welch power spectral density.
+
+    Only the frames completed by the newest samples are transformed. Spectrogram columns are written into a ring
+    buffer stored twice back to back, so the latest `columns` columns are always one contiguous slice that can be
+    handed to an image item without copying.
+    """
+
+    def __init__(self, fs, nperseg=256, hop=64, columns=256, window='hann'):
+        """
+        Args:
+            fs: Sampling rate in Hz.
+            nperseg: Samples per STFT frame.
+            hop: Samples between consecutive frames.
+            columns: Number of spectrogram columns kept for display.
+            window: Window name understood by scipy.signal.get_window.
+        """
+        self.fs = float(fs)
+        self.nperseg = nperseg
+        self.hop = hop
+        self.columns = columns
+        self.window = spectral_window(window, nperseg)
+        self.frequencies = np.fft.rfftfreq(nperseg, 1.0 / self.fs)
+
+        # Density scaling as in scipy.signal.welch, one-sided
+        self.scale = np.full(len(self.frequencies), 2.0 / (self.fs * np.dot(self.window, self.window)))
+        self.scale[0] /= 2.0
+        if nperseg % 2 == 0:
+            self.scale[-1] /= 2.0
+
+        self.pending = np.empty(0)  # Samples not yet part of a complete frame
+        self.ring = np.full((2 * columns, len(self.frequencies)), np.nan, dtype=np.float32)
+        self.head = 0  # Index of the oldest displayed column in the ring
+        self.count = 0  # Number of columns computed so far
+        self.power_sum = np.zeros(len(self.frequencies))
+
+    def push(self, samples):
+        """
+        Add new samples and transform the frames they complete.
+        Args:
+            samples: The newly revealed samples.
+        Returns:
+            The number of new spectrogram columns.
+        """
+        data = np.concatenate([self.pending, np.asarray(samples, dtype=np.float64)])
+        if len(data) < self.nperseg:
+            self.pending = data
+            return 0
+
+        n_frames = 1 + (len(data) - self.nperseg) // self.hop
+        frames = np.lib.stride_tricks.sliding_window_view(data, self.nperseg)[::self.hop][:n_frames]
+        power = np.abs(np.fft.rfft(frames * self.window, axis=1)) ** 2 * self.scale
+        self.pending = data[n_frames * self.hop:]
+
+        self.power_sum += power.sum(axis=0)
+        self.count += n_frames
+        self.write_columns(10.0 * np.log10(power[-self.columns:] + 1e-20))
+        return n_frames
+
+    def write_columns(self, decibels):
+        """Append columns to the ring buffer, writing each one to both halves."""
+        slots = (self.head + np.arange(len(decibels))) % self.columns
+        self.ring[slots] = decibels
+        self.ring[slots + self.columns] = decibels
+        self.head = (self.head + len(decibels)) % self.columns
+
+    def image(self):
+        """
+        Returns:
+            The displayed spectrogram in dB as a (columns, frequencies) view, oldest column first.
+        """
+        return self.ring[self.head:self.head + self.columns]
+
+    def psd(self):
+        """
+        Returns:
+            (frequencies, power spectral density) averaged over every frame so far (Welch's method).
+        """
+        return self.frequencies, self.power_sum / max(self.count, 1)
+
+    def duration(self):
+        """
+        Returns:
+            The time span covered by the displayed columns, in seconds.
+        """
+        return self.columns * self.hop / self.fs
+
+
+# Filter chains selectable during playback, as (kind, parameters) stages
+FILTER_PRESETS = {
+    'Off': [],
+    'ECG 50Hz': [('highpass', {'cutoff': 0.5}), ('notch', {'frequency': 50.0}), ('lowpass', {'cutoff': 40.0})],
+    'ECG 60Hz': [('highpass', {'cutoff': 0.5}), ('notch', {'frequency': 60.0}), ('lowpass', {'cutoff': 40.0})],
+    'Low-pass FIR': [('fir_lowpass', {'cutoff': 40.0, 'numtaps': 101})],
+}
+
+
+class FilterChain:
+    """
+    Cascade of IIR (second-order sections) and FIR filters that can be run chunk by chunk.
+
+    The state of every stage (`zi`) is carried from one chunk to the next, so filtering a signal in pieces gives
+    the same output as filtering it at once, at a cost proportional to the new samples only. filtfilt() applies
+    the same chain forwards and backwards for zero-phase offline filtering.
+    """
+
+    def __init__(self, fs, stages):
+        """
+        Args:
+            fs: Sampling rate in Hz.
+            stages: List of (kind, parameters) tuples. Kinds are 'highpass' and 'lowpass' (Butterworth, 'cutoff'
+                and optional 'order'), 'notch' ('frequency' and optional 'quality') and 'fir_lowpass' ('cutoff'
+                and optional 'numtaps'). Stages whose frequency is not below the Nyquist frequency are skipped and
+                listed in `skipped`.
+        """
+        from scipy import signal
+
+        self.fs = float(fs)
+        self.sections = []  # ('sos', sos) or ('fir', taps)
+        self.skipped = []  # (kind, frequency) of the stages outside (0, Nyquist)
+        nyquist = self.fs / 2.0
+        for kind, parameters in stages:
+            frequency = parameters.get('cutoff', parameters.get('frequency'))
+            if not 0 < frequency < nyquist:
+                self.skipped.append((kind, frequency))
+                continue
+            if kind in ('highpass', 'lowpass'):
+                sos = signal.butter(parameters.get('order', 2), frequency, btype=kind, fs=self.fs, output='sos')
+                self.sections.append(('sos', sos))
+            elif kind == 'notch':
+                b, a = signal.iirnotch(frequency, parameters.get('quality', 30.0), fs=self.fs)
+                self.sections.append(('sos', signal.tf2sos(b, a)))
+            elif kind == 'fir_lowpass':
+                taps = signal.firwin(parameters.get('numtaps', 101), frequency, fs=self.fs)
+                self.sections.append(('fir', taps))
+            else:
+                raise ValueError(f"Unsupported filter stage: {kind}")
+        self.states = None
+
+    def __bool__(self):
+        return bool(self.sections)
+
+    def reset(self):
+        """Forget the filter state; the next chunk starts a new signal."""
+        self.states = None
+
+    def process(self, chunk):
+        """
+        Filter the next chunk of a signal.
+        Args:
+            chunk: The new samples.
+        Returns:
+            The filtered samples, as many as in the chunk.
+        """
+        from scipy import signal
+
+        output = np.asarray(chunk, dtype=np.float64)
+        if len(output) == 0 or not self.sections:
+            return output
+
+        if self.states is None:
+            # Start every stage in steady state for the first sample, avoiding a turn-on transient
+            self.states = []
+            level = output[0]
+            for kind, coefficients in self.sections:
+                if kind == 'sos':
+                    self.states.append(signal.sosfilt_zi(coefficients) * level)
+                else:
+                    self.states.append(signal.lfilter_zi(coefficients, 1.0) * level)
+                level = level * self.dc_gain(kind, coefficients)
+
+        for i, (kind, coefficients) in enumerate(self.sections):
+            if kind == 'sos':
+                output, self.states[i] = signal.sosfilt(coefficients, output, zi=self.states[i])
+            else:
+                output, self.states[i] = signal.lfilter(coefficients, 1.0, output, zi=self.states[i])
+        return output
+
+    def filtfilt(self, data):
+        """
+        Zero-phase filtering of a whole signal, for static overlays.
+        """
+        from scipy import signal
+
+        output = np.asarray(data, dtype=np.float64)
+        for kind, coefficients in self.sections:
+            # Short signals cannot be padded by the default amount
+            if kind == 'sos':
+                padlen = min(3 * (2 * len(coefficients) + 1), len(output) - 1)
+                output = signal.sosfiltfilt(coefficients, output, padlen=max(padlen, 0))
+            else:
+                padlen = min(3 * len(coefficients), len(output) - 1)
+                output = signal.filtfilt(coefficients, 1.0, output, padlen=max(padlen, 0))
+        return output
+
+    @staticmethod
+    def dc_gain(kind, coefficients):
+        if kind == 'fir':
+            return float(np.sum(coefficients))
+        b, a = coefficients[:, :3], coefficients[:, 3:]
+        return float(np.prod(b.sum(axis=1) / a.sum(axis=1)))
+
+
+class PlaybackFilter:
+    """
+    Filtered copy of a playing signal, extended as playback reveals new samples.
+    """
+
+    def __init__(self):
+        self.chain = None
+        self.key = None  # (source, stages) the output belongs to
+        self.output = None
+        self.position = 0  # Number of samples filtered so far
+        self.restarted = False  # True when the last update started over with a new filter chain
+
+    def update(self, time_data, amplitude_data, end_index, stages):
+        """
+        Filter the samples revealed since the last call.
+        Args:
+            time_data: The time data for the signal.
+            amplitude_data: The amplitude data for the signal.
+            end_index: Index of the last revealed sample plus one.
+            stages: Filter stages, as in FILTER_PRESETS.
+        Returns:
+            The filtered signal up to end_index.
+        """
+        end_index = min(end_index, len(amplitude_data))
+        self.restarted = self.key is None or self.key[0] is not amplitude_data or self.key[1] != stages \
+            or end_index < self.position
+        if self.restarted:
+            # New signal, new filters or playback went back: start over
+            self.chain = FilterChain(sample_rate(time_data), stages)
+            self.key = (amplitude_data, stages)
+            self.output = np.empty(len(amplitude_data))
+            self.position = 0
+
+        if end_index > self.position:
+            self.output[self.position:end_index] = self.chain.process(amplitude_data[self.position:end_index])
+            self.position = end_index
+        return self.output[:end_index]
+
+
+def beat_period(signal, fs, shortest=0.02):
+    """
+    Estimate the beat period of an ECG from the autocorrelation of its first difference, which removes baseline
+    wander and keeps the sharp QRS slopes. Moving averages over one period of 50 Hz and of 60 Hz remove mains
+    interference first, whose own period would otherwise win.
+    Args:
+        signal: Samples spanning at least two beats.
+        fs: Sampling rate in Hz.
+        shortest: Shortest period considered, in seconds; shorter lags only see the width of the complexes.
+    Returns:
+        The period in samples, or None if the samples show no repeating beat.
+    """
+    slope = np.diff(np.asarray(signal, dtype=np.float64))
+    for mains in (50.0, 60.0):
+        width = int(round(fs / mains))
+        if 1 < width < len(slope):
+            sums = np.cumsum(np.concatenate(([0.0], slope)))
+            slope = (sums[width:] - sums[:-width]) / width
+    slope -= slope.mean() if len(slope) else 0.0
+    if len(slope) < 8 or not np.any(slope):
+        return None
+    size = 1 << int(2 * len(slope) - 1).bit_length()
+    spectrum = np.fft.rfft(slope, size)
+    correlation = np.fft.irfft(spectrum * np.conj(spectrum), size)[:len(slope) // 2]
+    correlation /= correlation[0]
+
+    # The strongest peak after the correlation of the complexes with themselves has died out
+    crossings = np.flatnonzero(correlation < 0)
+    first = max(int(crossings[0]) if len(crossings) else len(correlation), int(shortest * fs), 1)
+    lags = np.arange(first, len(correlation) - 1)
+    peaks = lags[(correlation[lags] > correlation[lags - 1]) & (correlation[lags] >= correlation[lags + 1])]
+    if len(peaks) == 0:
+        return None
+    best = peaks[np.argmax(correlation[peaks])]
+    return int(best) if correlation[best] > 0.3 else None
+
+
+class StreamingQRSDetector:
+    """
+    Pan-Tompkins QRS detector that runs on consecutive chunks of an ECG.
+
+    Every stage keeps the state it needs between chunks: the band-pass filter state, the last samples of the
+    derivative and integration windows, the integrated samples still undecided by the peak search, a short history
+    of the input for locating the R peak, and the adaptive signal/noise levels. A peak of the integrated signal is
+    only decided once the samples on both sides of it are known, so the beats do not depend on how the signal is
+    split into chunks. The filtering stages are vectorized over the chunk; only the few candidate peaks of the
+    integrated signal are visited one by one.
+
+    The samples of the learning phase are buffered and their beat period is checked before they are filtered (see
+    beat_period). A period below the refractory period is not physiological, which means the time column of the
+    recording does not match its samples: the detector then reports no beats rather than guess a sampling rate.
+    """
+
+    def __init__(self, fs, band=(5.0, 15.0), integration=0.150, refractory=0.200, learning=2.0):
+        """
+        Args:
+            fs: Sampling rate in Hz.
+            band: Pass band of the QRS enhancing filter, in Hz.
+            integration: Length of the moving-window integrator, in seconds.
+            refractory: Shortest interval between two beats, in seconds.
+            learning: Length of the learning phase that sets the initial signal and noise levels, in seconds.
+                The candidates seen while learning are classified once the levels are known.
+        """
+        self.fs = float(fs)
+        self.band = band
+        self.integration = integration
+        self.refractory_time = refractory
+        self.learning_end = max(1, int(round(learning * self.fs)))
+        self.started = False  # True once the learning samples are buffered and the stages are sized
+        self.period = None  # Beat period of the learning samples, in samples, or None if none was found
+        self.buffered = []  # Chunks of the learning phase, filtered once their beat period is checked
+
+        self.integrated_tail = np.empty(0)  # Integrated samples around the ones not decided yet
+        self.undecided = 0  # Index of the first integrated sample whose peak status is not decided yet
+        self.history = np.empty(0)  # Last input samples, for locating R peaks
+        self.offset = 0  # Index of the first sample of the next chunk
+        self.finished = False
+
+        # Running peak levels of the integrated signal (Pan and Tompkins' SPKI and NPKI)
+        self.signal_level = None
+        self.noise_level = 0.0
+        self.learning = []  # (position, height) of the candidates of the learning phase
+
+    def start(self):
+        """
+        Check the beat period of the buffered learning samples and size the stages of the detector.
+        """
+        from scipy import signal
+
+        buffered = np.concatenate(self.buffered) if self.buffered else np.empty(0)
+        self.buffered = []
+        self.started = True
+        high = min(self.band[1], 0.45 * self.fs)
+        self.sos = signal.butter(1, (min(self.band[0], high / 2), high), btype='bandpass', fs=self.fs, output='sos')
+        self.zi = None
+        self.window = max(1, int(round(self.integration * self.fs)))
+        self.refractory = max(1, int(round(self.refractory_time * self.fs)))
+        # Ripples on the slopes of a QRS complex are not beats: a peak must dominate this many samples on each side
+        self.radius = (self.window + 1) // 2
+        # The integrated peak trails the R peak by up to the integration window and the derivative delay
+        self.lookback = self.window + 4 + int(round(0.05 * self.fs))
+        self.derivative_tail = np.zeros(4)  # Last band-passed samples, for the five-point derivative
+        self.square_tail = np.zeros(self.window - 1)  # Last squared samples, for the moving-window integrator
+        self.last_beat = -self.refractory
+        self.offset = 0
+        self.period = beat_period(buffered, self.fs)
+        if not self.physiological:
+            self.offset = len(buffered)
+            return np.empty(0, dtype=np.intp)
+        return self.process(buffered)
+
+    @property
+    def physiological(self):
+        """False when the beats of the learning phase are closer than the refractory period."""
+        return not self.started or self.period is None or self.period >= self.refractory
+
+    def push(self, chunk):
+        """
+        Process the next chunk of the ECG.
+        Args:
+            chunk: The new samples.
+        Returns:
+            The indices (in the whole signal) of the R peaks found in this call, in increasing order.
+        """
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if len(chunk) == 0:
+            return np.empty(0, dtype=np.intp)
+        if self.started:
+            if not self.physiological:
+                self.offset += len(chunk)
+                return np.empty(0, dtype=np.intp)
+            return self.process(chunk)
+        self.buffered.append(chunk)
+        self.offset += len(chunk)
+        return self.start() if self.offset >= self.learning_end else np.empty(0, dtype=np.intp)
+
+    def process(self, chunk):
+        """
+        Filter a chunk and classify the peaks it completes.
+        """
+        from scipy import signal
+
+        if len(chunk) == 0:
+            return np.empty(0, dtype=np.intp)
+        start = self.offset
+        self.offset += len(chunk)
+        self.history = np.concatenate([self.history, chunk])
+
+        # Band-pass, five-point derivative, squaring and moving-window integration
+        if self.zi is None:
+            self.zi = signal.sosfilt_zi(self.sos) * chunk[0]
+        filtered, self.zi = signal.sosfilt(self.sos, chunk, zi=self.zi)
+        extended = np.concatenate([self.derivative_tail, filtered])
+        derivative = (2 * extended[4:] + extended[3:-1] - extended[1:-3] - 2 * extended[:-4]) * (self.fs / 8.0)
+        self.derivative_tail = extended[-4:]
+        squared = np.concatenate([self.square_tail, derivative * derivative])
+        sums = np.cumsum(np.concatenate(([0.0], squared)))
+        integrated = (sums[self.window:] - sums[:-self.window]) / self.window
+        self.square_tail = squared[len(squared) - (self.window - 1):] if self.window > 1 else np.empty(0)
+
+        data = np.concatenate([self.integrated_tail, integrated])
+        return self.decide(data, start - len(self.integrated_tail), final=False)
+
+    def finish(self):
+        """
+        Decide the last samples of a complete ECG, which no later chunk will follow.
+        Returns:
+            The indices of the R peaks found in this call.
+        """
+        if self.finished or self.offset == 0:
+            return np.empty(0, dtype=np.intp)
+        self.finished = True
+        beats = self.start() if not self.started else np.empty(0, dtype=np.intp)
+        if not self.physiological:
+            return beats
+        tail = self.decide(self.integrated_tail, self.offset - len(self.integrated_tail), final=True)
+        beats = np.concatenate([beats, tail])
+        if self.signal_level is None and self.learning:
+            # The ECG ended before the learning phase did
+            beats = np.concatenate([beats, np.asarray(self.end_learning(), dtype=np.intp)])
+        return beats
+
+    @property
+    def settled(self):
+        """Index of the first sample an R peak may still be reported at; every earlier beat is known."""
+        if self.finished or not self.physiological:
+            return self.offset
+        if self.signal_level is None:
+            # The beats of the learning phase are only reported when it ends
+            return 0
+        # Later candidates locate their R peaks at most the lookback before them
+        return max(0, self.undecided - self.lookback)
+
+    def decide(self, data, data_start, final):
+        """
+        Classify the peaks of the integrated samples whose neighbourhood is complete.
+        Args:
+            data: Integrated samples, starting with the context kept from the previous call.
+            data_start: Index of data[0] in the whole signal.
+            final: The signal ends with data.
+        Returns:
+            The indices of the R peaks found.
+        """
+        from scipy.ndimage import maximum_filter1d
+
+        first = self.undecided - data_start
+        last = max(first, len(data) - 1 if final else len(data) - self.radius)
+
+        # Local maxima dominating their neighbourhood; both ends of the signal are never peaks
+        indices = np.arange(max(first, 1), last)
+        if len(indices):
+            indices = indices[(data[indices] > data[indices - 1]) & (data[indices] >= data[indices + 1])]
+        if len(indices) > 1 or (len(indices) and self.radius > 1):
+            dominant = maximum_filter1d(data, size=2 * self.radius + 1, mode='nearest')
+            indices = indices[data[indices] >= dominant[indices]]
+
+        beats = []
+        for index in indices:
+            beats.extend(self.classify(data_start + int(index), data[index]))
+
+        self.undecided = data_start + last
+        self.integrated_tail = data[max(0, last - self.radius):]
+        if self.signal_level is not None:
+            # Keep the input samples R peaks of the undecided candidates can be located in
+            history_start = self.offset - len(self.history)
+            self.history = self.history[max(0, self.undecided - self.lookback - history_start):]
+        return np.asarray(beats, dtype=np.intp)
+
+    def classify(self, position, height):
+        """
+        Decide whether a peak of the integrated signal is a beat, updating the adaptive levels.
+        Returns:
+            The indices of the R peaks found: the peak itself, or the beats of the learning phase when it ends.
+        """
+        if self.signal_level is None:
+            self.learning.append((position, height))
+            if position < self.learning_end:
+                return []
+            return self.end_learning()
+        return self.classify_peak(position, height)
+
+    def end_learning(self):
+        """
+        Set the initial levels from the candidates of the learning phase, then classify them.
+        Returns:
+            The indices of the R peaks among them.
+        """
+        heights = [height for _, height in self.learning]
+        self.signal_level = 0.25 * max(heights)
+        self.noise_level = 0.5 * float(np.mean(heights))
+        learned, self.learning = self.learning, []
+        return [beat for position, height in learned for beat in self.classify_peak(position, height)]
+
+    def classify_peak(self, position, height):
+        """
+        Classify a peak against the adaptive threshold.
+        Returns:
+            [index of the R peak] for a beat, otherwise [].
+        """
+        threshold = self.noise_level + 0.25 * (self.signal_level - self.noise_level)
+        if height < threshold or position - self.last_beat < self.refractory:
+            self.noise_level = 0.125 * height + 0.875 * self.noise_level
+            return []
+
+        self.signal_level = 0.125 * height + 0.875 * self.signal_level
+        # The R peak is the largest deviation of the input in the window before the integrated peak
+        history_start = self.offset - len(self.history)
+        low = max(position - self.lookback, history_start, self.last_beat + 1)
+        window = self.history[low - history_start:position - history_start + 1]
+        if len(window) == 0:
+            return []
+        self.last_beat = position
+        return [low + int(np.argmax(np.abs(window - window.mean())))]
+
+
+class BeatTracker:
+    """
+    Beats and RR intervals of a playing ECG, extended as playback reveals new samples.
+    """
+
+    def __init__(self):
+        self.detector = None
+        self.source = None
+        self.position = 0
+        self.peaks = []  # Indices of the detected R peaks
+        self.restarted = False  # True when the last update started over and earlier beats were dropped
+
+    def update(self, time_data, amplitude_data, end_index):
+        """
+        Detect beats in the samples revealed since the last call.
+        Returns:
+            The indices of the new R peaks.
+        """
+        end_index = min(end_index, len(amplitude_data))
+        self.restarted = self.source is not amplitude_data or end_index < self.position
+        if self.restarted:
+            fs = sample_rate(time_data)
+            # Learn the levels over the first two seconds, or the first quarter of a shorter recording
+            self.detector = StreamingQRSDetector(fs, learning=min(2.0, 0.25 * len(amplitude_data) / fs))
+            self.source = amplitude_data
+            self.position = 0
+            self.peaks = []
+
+        if end_index <= self.position:
+            return np.empty(0, dtype=np.intp)
+        new_peaks = self.detector.push(amplitude_data[self.position:end_index])
+        if end_index == len(amplitude_data):
+            new_peaks = np.concatenate([new_peaks, self.detector.finish()])
+        self.position = end_index
+        self.peaks.extend(new_peaks.tolist())
+        return new_peaks
+
+    def heart_rate(self, time_data):
+        """
+        Returns:
+            (beat times, RR intervals in seconds, heart rate in beats per minute) for every beat after the first.
+        """
+        times = time_data[np.asarray(self.peaks, dtype=np.intp)]
+        rr = np.diff(times)
+        with np.errstate(divide='ignore'):
+            return times[1:], rr, np.where(rr > 0, 60.0 / np.where(rr > 0, rr, 1.0), np.nan)
+
+
+ANOMALY_FEATURES = ('energy (dB)', 'dominant frequency (Hz)', 'QRS width (s)', 'RR variability (s)')
+
+
+def qrs_widths(signal, peaks, fs, half_window=0.075):
+    """
+    Width of every QRS complex at half of its amplitude, for all beats at once.
+    Args:
+        signal: The ECG samples.
+        peaks: Indices of the R peaks.
+        fs: Sampling rate in Hz.
+        half_window: Half of the span around each peak that holds its complex, in seconds.
+    Returns:
+        The widths in seconds, one per peak.
+    """
+    peaks = np.asarray(peaks, dtype=np.intp)
+    if len(peaks) == 0 or len(signal) == 0:
+        return np.empty(0)
+    # A complex ends before the next one starts, whatever the time scale of the recording
+    radius = int(round(half_window * fs))
+    if len(peaks) > 1:
+        radius = min(radius, int(np.median(np.diff(peaks))) // 2)
+    radius = max(1, radius)
+
+    # One row of samples around every peak; samples outside the signal are never above half amplitude
+    indices = peaks[:, None] + np.arange(-radius, radius + 1)
+    inside = (indices >= 0) & (indices < len(signal))
+    segments = np.where(inside, signal[np.clip(indices, 0, len(signal) - 1)], np.nan)
+    deflection = np.abs(segments - np.nanmedian(segments, axis=1, keepdims=True))
+    above = inside & (deflection >= 0.5 * deflection[:, radius:radius + 1])
+
+    # Samples above half amplitude on each side of the peak, up to the first one below it
+    right = np.cumprod(above[:, radius:], axis=1).sum(axis=1)
+    left = np.cumprod(above[:, radius::-1], axis=1).sum(axis=1)
+    return (left + right - 1) / fs
+
+
+def window_features(signal, fs, window=2.0, hop=0.5, peaks=None, start=0, stop=None, block=4096):
+    """
+    Features of overlapping windows of an ECG, computed without copying the windows.
+    Args:
+        signal: The ECG samples.
+        fs: Sampling rate in Hz.
+        window: Window length in seconds.
+        hop: Distance between window starts in seconds.
+        peaks: Indices of the R peaks, detected with StreamingQRSDetector when None. Peaks outside the signal
+            (negative indices) only provide the RR interval of the first beat.
+        start, stop: Range of samples covered by the windows; the samples around it only serve as context for
+            the complexes near its edges.
+        block: Windows transformed at once, which bounds the memory of the spectra.
+    Returns:
+        (features, starts): an array with one row of ANOMALY_FEATURES per window and the first sample of every
+        window. Windows without beats have NaN QRS widths and RR variabilities.
+    """
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    signal = np.asarray(signal, dtype=np.float64)
+    length = max(4, int(round(window * fs)))
+    step = max(1, int(round(hop * fs)))
+    stop = len(signal) if stop is None else min(stop, len(signal))
+    if stop - start < length:
+        return np.empty((0, len(ANOMALY_FEATURES))), np.empty(0, dtype=np.intp)
+    starts = np.arange(start, stop - length + 1, step)
+    features = np.empty((len(starts), len(ANOMALY_FEATURES)))
+
+    # Energy: mean power of every window from a cumulative sum of squares
+    power = np.concatenate(([0.0], np.cumsum(signal * signal)))
+    features[:, 0] = 10 * np.log10((power[starts + length] - power[starts]) / length + 1e-12)
+
+    # Dominant frequency: strongest non-DC bin of the windowed spectrum, a block of windows at a time
+    frames = sliding_window_view(signal, length)[start:stop - length + 1:step]
+    taper = spectral_window('hann', length)
+    frequencies = np.fft.rfftfreq(length, 1.0 / fs)
+    for first in range(0, len(frames), block):
+        chunk = frames[first:first + block]
+        spectra = np.abs(np.fft.rfft((chunk - chunk.mean(axis=1, keepdims=True)) * taper, axis=1))
+        features[first:first + block, 1] = frequencies[1 + np.argmax(spectra[:, 1:], axis=1)]
+
+    # Beat features: sums over the beats of every window from cumulative sums
+    if peaks is None:
+        detector = StreamingQRSDetector(fs, learning=min(2.0, 0.25 * len(signal) / fs))
+        peaks = np.concatenate([detector.push(signal), detector.finish()])
+    peaks = np.asarray(peaks, dtype=np.intp)
+    inside = peaks[peaks >= 0]
+    widths = np.concatenate(([0.0], np.cumsum(qrs_widths(signal, inside, fs))))
+    low, high = np.searchsorted(inside, starts), np.searchsorted(inside, starts + length)
+    beats = high - low
+    with np.errstate(invalid='ignore', divide='ignore'):
+        features[:, 2] = np.where(beats > 0, (widths[high] - widths[low]) / beats, np.nan)
+
+        # RR intervals are attributed to the beat that ends them
+        rr = np.diff(peaks) / fs
+        ends = peaks[1:]
+        sums = np.concatenate(([0.0], np.cumsum(rr)))
+        squares = np.concatenate(([0.0], np.cumsum(rr * rr)))
+        low, high = np.searchsorted(ends, starts), np.searchsorted(ends, starts + length)
+        count = high - low
+        mean = (sums[high] - sums[low]) / count
+        variance = (squares[high] - squares[low]) / count - mean * mean
+        features[:, 3] = np.where(count > 1, np.sqrt(np.maximum(variance, 0.0)), np.nan)
+    return features, starts
+
+
+class AnomalyScorer:
+    """
+    Mahalanobis distance of window features from the distribution of a normal recording.
+    """
+
+    def __init__(self, ridge=1e-6, percentile=99.9, margin=1.5):
+        self.ridge = ridge  # Regularization of the covariance, relative to the variance of every feature
+        self.percentile = percentile
+        self.margin = margin  # Factor on the training distances, which are optimistic for unseen normal data
+        self.mean = None
+        self.inverse = None
+        self.threshold = None
+
+    def fit(self, features):
+        """
+        Learn the mean and covariance of normal windows and the distance above which a window is anomalous.
+        Args:
+            features: Window features of normal data, see window_features.
+        Returns:
+            The scorer.
+        """
+        features = np.asarray(features, dtype=np.float64)
+        if len(features) < 2:
+            raise ValueError("At least two windows are needed to learn the normal features")
+
+        # Features missing from every window (no beats at all) get a mean of zero
+        present = np.sum(~np.isnan(features), axis=0)
+        self.mean = np.nansum(features, axis=0) / np.maximum(present, 1)
+        filled = self.fill(features)
+        covariance = np.atleast_2d(np.cov(filled, rowvar=False))
+        # Features differ by orders of magnitude (seconds against hertz), so each is regularized by its own variance
+        covariance += self.ridge * np.diag(np.maximum(np.diag(covariance), 1e-12))
+        self.inverse = np.linalg.pinv(covariance)
+
+        # The threshold scales the larger of the training distances and the chi-square bound for normal features
+        from scipy.stats import chi2
+
+        bound = np.sqrt(chi2.ppf(0.999, df=features.shape[1]))
+        self.threshold = self.margin * max(float(np.percentile(self.score(features), self.percentile)), bound)
+        return self
+
+    def fill(self, features):
+        """Replace missing features (windows without beats) by the normal mean, so they add no distance."""
+        features = np.asarray(features, dtype=np.float64)
+        return np.where(np.isnan(features), self.mean, features)
+
+    def score(self, features):
+        """
+        Returns:
+            The Mahalanobis distance of every window.
+        """
+        deviation = self.fill(features) - self.mean
+        return np.sqrt(np.maximum(np.einsum('ij,jk,ik->i', deviation, self.inverse, deviation), 0.0))
+
+
+def anomaly_spans(starts, scores, threshold, length):
+    """
+    Merge the overlapping windows scoring above a threshold into spans.
+    Args:
+        starts: First sample of every window.
+        scores: Score of every window.
+        threshold: Scores above it are anomalous.
+        length: Window length in samples.
+    Returns:
+        A list of (start, end) sample ranges.
+    """
+    flagged = np.asarray(starts)[np.asarray(scores) > threshold]
+    if len(flagged) == 0:
+        return []
+    # A new span begins where a window starts after the end of the previous one
+    breaks = np.flatnonzero(flagged[1:] > flagged[:-1] + length) + 1
+    first = np.concatenate(([0], breaks))
+    last = np.concatenate((breaks - 1, [len(flagged) - 1]))
+    return [(int(flagged[i]), int(flagged[j]) + length) for i, j in zip(first, last)]
+
+
+class AnomalyTracker:
+    """
+    Anomalous spans of a playing ECG, scored window by window as playback reveals new samples.
+    """
+
+    def __init__(self, scorer, window=2.0, hop=0.5, delay=0.075):
+        self.scorer = scorer
+        self.window = window
+        self.hop = hop
+        self.delay = delay  # Seconds of samples the complexes near the end of a window extend past it
+        self.source = None
+        self.restarted = False  # True when the last update started over and earlier spans were dropped
+
+    def update(self, time_data, amplitude_data, end_index):
+        """
+        Score the windows completed since the last call.
+        Returns:
+            The new anomalous (start, end) sample ranges, possibly overlapping the last span of the previous call.
+        """
+        end_index = min(end_index, len(amplitude_data))
+        self.restarted = self.source is not amplitude_data or end_index < self.beats.position
+        if self.restarted:
+            self.source = amplitude_data
+            self.fs = sample_rate(time_data)
+            self.length = max(4, int(round(self.window * self.fs)))
+            self.step = max(1, int(round(self.hop * self.fs)))
+            self.next_start = 0
+            self.spans = []
+            self.beats = BeatTracker()
+        self.beats.update(time_data, amplitude_data, end_index)
+
+        # Windows ending before the beats still undecided by the detector and the samples of their last complexes
+        settled = self.beats.detector.settled
+        if settled < len(amplitude_data):
+            settled = min(settled, end_index - int(self.delay * self.fs))
+        ready = settled - self.length
+        if ready < self.next_start:
+            return []
+        count = (ready - self.next_start) // self.step + 1
+        stop = self.next_start + (count - 1) * self.step + self.length
+
+        # The revealed samples around the windows give the complexes at their edges the same context as offline
+        first = max(0, self.next_start - self.length)
+        peaks = np.asarray(self.beats.peaks[bisect.bisect_left(self.beats.peaks, first):], dtype=np.intp)
+        features, starts = window_features(amplitude_data[first:end_index], self.fs, self.length / self.fs,
+                                           self.step / self.fs, peaks=peaks - first,
+                                           start=self.next_start - first, stop=stop - first)
+        self.next_start += count * self.step
+
+        spans = [(start + first, end + first) for start, end in
+                 anomaly_spans(starts, self.scorer.score(features), self.scorer.threshold, self.length)]
+        self.spans.extend(spans)
+        return spans
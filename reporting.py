@@ -0,0 +1,237 @@
+"""
+Content hashes, statistics formatting and PDF reports for saved glue sessions.
+
+Reports are written entry by entry from decimated traces drawn as vector plots, so they can be built on a worker
+thread and stay small whatever the length of the signals.
+"""
+import hashlib
+import re
+
+import numpy as np
+
+from instrumentation import tracer
+from signal_io import ScaledSignal
+from signal_processing import minmax_decimate
+
+HASH_BLOCK_BYTES = 1 << 20  # Signals are hashed in blocks to avoid copying large buffers
+REPORT_TRACE_POINTS = 500  # Points per vector plot embedded in reports
+PERCENTILE_KEY = re.compile(r"p\d+(\.\d+)?")  # Percentile keys of signal_statistics, such as 'p5' or 'p99.9'
+
+
+def signal_digest(signal):
+    """
+    Content hash of a signal: its dtype, shape and samples, hashed blockwise with BLAKE2b.
+    Args:
+        signal: The signal data as a numpy array or a ScaledSignal.
+    Returns:
+        The digest as a hex string.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(signal, ScaledSignal):
+        # Hash the digital samples and their calibration rather than widening them
+        digest.update(f"scaled{signal.gain!r}{signal.offset!r}".encode())
+        signal = signal.digital
+    signal = np.ascontiguousarray(signal)
+    digest.update(f"{signal.dtype.str}{signal.shape}".encode())
+    buffer = memoryview(signal.reshape(-1)).cast("B")
+    for start in range(0, len(buffer), HASH_BLOCK_BYTES):
+        digest.update(buffer[start:start + HASH_BLOCK_BYTES])
+    return digest.hexdigest()
+
+
+def trace_color(color):
+    """
+    Turn a line color label such as 'red2' into a color name reportlab understands.
+    """
+    return re.sub(r"\d+$", "", color) or "black"
+
+
+@tracer.traced('decimate')
+def report_trace(signal, max_points=REPORT_TRACE_POINTS):
+    """
+    Decimate a signal for the vector plot of a report.
+    Returns:
+        (x, y) float32 arrays of at most `max_points` points.
+    """
+    x, y = minmax_decimate(np.asarray(signal), max_points)
+    return x.astype(np.float32), np.asarray(y, dtype=np.float32)
+
+
+def format_statistics(statistics, duration):
+    """
+    Round the output of signal_statistics for display in reports.
+    Args:
+        statistics: Dictionary returned by signal_statistics.
+        duration: Length of the signal in samples.
+    Returns:
+        An ordered dictionary of display name -> rounded value.
+    """
+    formatted = {
+        "mean": round(float(statistics['mean']), 2),
+        "std": round(float(statistics['std']), 2),
+        "rms": round(float(statistics['rms']), 2),
+        "min": round(float(statistics['min']), 2),
+        "max": round(float(statistics['max']), 2),
+        "peak_to_peak": round(float(statistics['peak_to_peak']), 2),
+    }
+    # Whichever percentiles were computed, in increasing order; p50 is shown as the median
+    percentiles = sorted((float(key[1:]), key) for key in statistics if PERCENTILE_KEY.fullmatch(key))
+    for _, key in percentiles:
+        formatted["median" if key == 'p50' else key] = round(statistics[key], 2)
+    formatted["zero_crossing_rate"] = round(statistics['zero_crossing_rate'], 4)
+    formatted["duration"] = duration  # Assuming duration is the number of data points
+    return formatted
+
+
+class ReportBuilder:
+    """
+    Write the statistics report of saved sessions to a PDF, one entry at a time.
+
+    Every entry is drawn in a box with its statistics on the left and its plot on the right, tall enough for all of
+    its statistic lines. Plots are drawn as vector polylines from the decimated trace of the entry, so each page
+    stays small no matter how long the signals are, and sessions are consumed lazily from an iterable.
+    """
+
+    def __init__(self, path, title="Signal Statistics Report", subtitle="Generated by Signal Viewer Application"):
+        """
+        Args:
+            path: Path of the PDF file to write.
+            title: Title drawn on the first page.
+            subtitle: Subtitle drawn under the title.
+        """
+        self.path = path
+        self.title = title
+        self.subtitle = subtitle
+
+    @tracer.traced('report')
+    def build(self, sessions, total=None, progress=None):
+        """
+        Write the report.
+        Args:
+            sessions: Iterable of sessions, each a dictionary with an 'entries' dictionary of name -> entry.
+                An entry holds 'statistics' and a 'trace' (x, y), and optionally a line 'color'.
+            total: Number of entries expected, used for progress reporting.
+            progress: Optional callable receiving (entries written, total) after every entry.
+        Returns:
+            The path of the written report.
+        """
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib.units import inch
+        from reportlab.pdfgen import canvas
+
+        c = canvas.Canvas(self.path, pagesize=letter, pageCompression=1)
+        width, height = letter
+        margin = 0.7 * inch
+        box_spacing = 0.2 * inch
+
+        # Set up the document title and subtitle
+        c.setFont("Times-Bold", 20)
+        c.drawCentredString(width / 2, height - 1 * inch, self.title)
+        c.setFont("Times-Italic", 14)
+        c.drawCentredString(width / 2, height - 1.3 * inch, self.subtitle)
+        top = height - 1.6 * inch
+
+        written = 0
+        for session in sessions:
+            for signal_name, entry in session['entries'].items():
+                if not entry.get('statistics'):
+                    continue
+
+                # Start a new page when the next box does not fit
+                box_height = self.box_height(entry)
+                if top - box_height < margin:
+                    c.showPage()
+                    top = height - margin
+
+                self.draw_entry(c, signal_name, entry, margin, top - box_height, width - 2 * margin, box_height)
+                top -= box_height + box_spacing
+
+                written += 1
+                if progress is not None:
+                    progress(written, max(total or 0, written))
+
+        c.save()
+        return self.path
+
+    @staticmethod
+    def box_height(entry):
+        """
+        Height of the box of an entry: room for the plot, or for its name and statistic lines if they need more.
+        """
+        from reportlab.lib.units import inch
+
+        lines = 1 + sum(value is not None for value in entry['statistics'].values())
+        return max(3.0 * inch, 0.35 * inch + lines * 0.2 * inch)
+
+    def draw_entry(self, c, signal_name, entry, left, bottom, width, height):
+        """
+        Draw the box of one entry: its name and statistics, and its plot.
+        """
+        from reportlab.lib.units import inch
+
+        c.setStrokeColorRGB(0, 0, 0)
+        c.setLineWidth(1)
+        c.setDash(3, 3)
+        c.rect(left, bottom, width, height, stroke=True, fill=False)
+        c.setDash()
+
+        line_spacing = 0.2 * inch
+        text_x = left + 0.2 * inch
+        text_y = bottom + height - 0.35 * inch
+        c.setFont("Times-Bold", 12)
+        c.drawString(text_x, text_y, signal_name)
+        text_y -= line_spacing
+
+        c.setFont("Times-Roman", 11)
+        for key, value in entry['statistics'].items():
+            if value is not None:
+                c.drawString(text_x, text_y, f"{key}: {value}")
+                text_y -= line_spacing
+
+        plot_width = 3.8 * inch
+        plot_left = left + width - plot_width - 0.2 * inch
+        plot_bottom = bottom + 0.3 * inch
+        plot_height = height - 0.6 * inch
+
+        if entry.get('trace') is not None:
+            self.draw_trace(c, entry['trace'], entry.get('color', 'black'), plot_left, plot_bottom, plot_width,
+                            plot_height)
+
+    def draw_trace(self, c, trace, color, left, bottom, width, height):
+        """
+        Draw a decimated trace as a vector polyline with its value range.
+        """
+        from reportlab.lib import colors
+
+        x, y = (np.asarray(values, dtype=np.float64) for values in trace)
+        finite = np.isfinite(y)
+        if not finite.any():
+            return
+        x, y = x[finite], y[finite]
+        low, high = float(y.min()), float(y.max())
+        span_y = high - low if high > low else 1.0
+        span_x = x[-1] - x[0] if x[-1] > x[0] else 1.0
+        xs = left + (x - x[0]) / span_x * width
+        ys = bottom + (y - low) / span_y * height
+
+        c.saveState()
+        c.setStrokeColorRGB(0.6, 0.6, 0.6)
+        c.setLineWidth(0.5)
+        c.rect(left, bottom, width, height, stroke=True, fill=False)
+        c.setFont("Times-Roman", 8)
+        c.setFillColorRGB(0.3, 0.3, 0.3)
+        c.drawString(left, bottom + height + 2, f"{high:.4g}")
+        c.drawString(left, bottom - 9, f"{low:.4g}")
+        c.drawRightString(left + width, bottom - 9, f"{int(x[-1]) + 1} samples")
+
+        try:
+            c.setStrokeColor(colors.toColor(trace_color(color)))
+        except ValueError:
+            c.setStrokeColorRGB(0, 0, 0)
+        c.setLineWidth(0.8)
+        path = c.beginPath()
+        path.moveTo(xs[0], ys[0])
+        for point_x, point_y in zip(xs[1:].tolist(), ys[1:].tolist()):
+            path.lineTo(point_x, point_y)
+        c.drawPath(path, stroke=1, fill=0)
+        c.restoreState()
@@ -0,0 +1,321 @@
+"""
+SQLite store of the glue sessions saved with "Save Data".
+
+Sessions and their entries (statistics and report trace) are kept in a local database, so saved data survives
+restarts and does not have to fit in memory. Writes are batched into a few transactions, entries are indexed by
+signal hash, date and the main statistics, and the report generator pages through pending sessions lazily.
+"""
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+# The database location can be overridden with the SIGNAL_VIEWER_SESSIONS environment variable
+DEFAULT_DATABASE = os.environ.get("SIGNAL_VIEWER_SESSIONS",
+                                  os.path.join(os.path.expanduser("~"), ".signal_viewer", "sessions.db"))
+BATCH_SIZE = 64  # Entries buffered before they are written in one transaction
+PAGE_SIZE = 32  # Sessions loaded per query while paging through a report
+
+# Statistics stored in their own indexed columns; the full dictionary is kept as JSON as well
+STAT_COLUMNS = ('mean', 'std', 'rms', 'min', 'max', 'peak_to_peak', 'duration')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    digest1 TEXT NOT NULL,
+    digest2 TEXT NOT NULL,
+    created REAL NOT NULL,
+    reported INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    glued INTEGER NOT NULL,
+    color TEXT,
+    created REAL NOT NULL,
+    mean REAL, std REAL, rms REAL, min REAL, max REAL, peak_to_peak REAL, duration INTEGER,
+    statistics TEXT,
+    trace_x BLOB,
+    trace_y BLOB
+);
+CREATE INDEX IF NOT EXISTS sessions_pending ON sessions(reported, id);
+CREATE INDEX IF NOT EXISTS sessions_digests ON sessions(digest1, digest2);
+CREATE INDEX IF NOT EXISTS entries_session ON entries(session_id, position);
+CREATE INDEX IF NOT EXISTS entries_digest ON entries(digest);
+CREATE INDEX IF NOT EXISTS entries_created ON entries(created);
+CREATE INDEX IF NOT EXISTS entries_mean ON entries(mean);
+CREATE INDEX IF NOT EXISTS entries_rms ON entries(rms);
+CREATE INDEX IF NOT EXISTS entries_peak_to_peak ON entries(peak_to_peak);
+"""
+
+
+class SessionStore:
+    """
+    Saved glue sessions in an SQLite database, with the interface of the glue window's session index.
+
+    Sessions that have not been reported yet are "pending": duplicate checks only consider them, as the report
+    consumes them. Their digests are mirrored in memory so every duplicate check is a dictionary lookup. Entry rows
+    are buffered and written in batches; reads flush the buffer first.
+    """
+
+    def __init__(self, path=DEFAULT_DATABASE, batch_size=BATCH_SIZE):
+        """
+        Args:
+            path: Database file, created on first use. ":memory:" keeps everything in memory.
+            batch_size: Number of buffered entries that triggers a write.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.connection = None  # Opened on first use, so importing processes do not touch the database
+        self.lock = threading.RLock()
+        self.pending = {}  # (digest 1, digest 2) -> {'id', 'glued' digests, 'count' of entries} of pending sessions
+        self.entry_rows = []  # Entry rows waiting to be written
+        atexit.register(self.close)
+
+    def connect(self):
+        """
+        Open the database, create the schema and load the pending sessions.
+        """
+        with self.lock:
+            if self.connection is not None:
+                return self.connection
+
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(SCHEMA)
+
+            self.pending = {}
+            rows = self.connection.execute(
+                "SELECT s.id, s.digest1, s.digest2, e.digest, e.glued FROM sessions s "
+                "LEFT JOIN entries e ON e.session_id = s.id WHERE s.reported = 0 ORDER BY s.id")
+            for session_id, digest1, digest2, digest, glued in rows:
+                session = self.pending.setdefault((digest1, digest2), {'id': session_id, 'glued': set(), 'count': 0})
+                if digest is not None:
+                    session['count'] += 1
+                    if glued:
+                        session['glued'].add(digest)
+            return self.connection
+
+    def __len__(self):
+        self.connect()
+        return len(self.pending)
+
+    def count_entries(self):
+        """
+        Returns:
+            The number of entries in pending sessions.
+        """
+        self.connect()
+        with self.lock:
+            return sum(session['count'] for session in self.pending.values())
+
+    def find(self, digest1, digest2):
+        """
+        Returns:
+            The pending session saved for this pair of signals, or None.
+        """
+        self.connect()
+        return self.pending.get((digest1, digest2))
+
+    def add_session(self, digest1, digest2, entries):
+        """
+        Save a new session for a pair of signals.
+        Args:
+            digest1: signal_digest of Signal 1.
+            digest2: signal_digest of Signal 2.
+            entries: Dictionary of entry name -> entry for Signal 1 and Signal 2.
+        Returns:
+            The new session.
+        """
+        connection = self.connect()
+        with self.lock:
+            cursor = connection.execute("INSERT INTO sessions (digest1, digest2, created) VALUES (?, ?, ?)",
+                                        (digest1, digest2, time.time()))
+            session = {'id': cursor.lastrowid, 'glued': set(), 'count': 0}
+            self.pending[(digest1, digest2)] = session
+            for name, entry in entries.items():
+                self.add_entry(session, name, entry, glued=False)
+        return session
+
+    def add_glued(self, session, digest, make_entry):
+        """
+        Add a glued signal to a session unless an identical one is already saved.
+        Args:
+            session: The session returned by find() or add_session().
+            digest: signal_digest of the glued signal.
+            make_entry: Callable creating the entry, only called for new glued signals.
+        Returns:
+            The name of the new entry, or None for a duplicate.
+        """
+        with self.lock:
+            if digest in session['glued']:
+                return None
+            session['glued'].add(digest)
+            count = len(session['glued'])
+            name = "Glued Signal" if count == 1 else f"Glued Signal {count}"
+            self.add_entry(session, name, make_entry(), glued=True)
+        return name
+
+    def add_entry(self, session, name, entry, glued):
+        """
+        Buffer the row of an entry.
+        """
+        statistics = entry.get('statistics') or {}
+        trace = entry.get('trace')
+        row = {
+            'session_id': session['id'],
+            'position': session['count'],
+            'name': name,
+            'digest': entry['digest'],
+            'glued': int(glued),
+            'color': entry.get('color'),
+            'created': time.time(),
+            'statistics': json.dumps(statistics),
+            'trace_x': np.asarray(trace[0], dtype=np.float32).tobytes() if trace is not None else None,
+            'trace_y': np.asarray(trace[1], dtype=np.float32).tobytes() if trace is not None else None,
+        }
+        for column in STAT_COLUMNS:
+            value = statistics.get(column)
+            row[column] = value if isinstance(value, (int, float)) else None
+        session['count'] += 1
+
+        with self.lock:
+            self.entry_rows.append(row)
+            if len(self.entry_rows) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        """
+        Write the buffered rows in a single transaction.
+        """
+        connection = self.connect()
+        with self.lock:
+            if self.entry_rows:
+                columns = list(self.entry_rows[0])
+                connection.executemany(
+                    f"INSERT INTO entries ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    [tuple(row[column] for column in columns) for row in self.entry_rows])
+                self.entry_rows = []
+            connection.commit()
+
+    def drain(self, page_size=PAGE_SIZE):
+        """
+        Yield every pending session in save order, loading a page of sessions at a time. Sessions stay pending until
+        they are passed to mark_reported, so a report that fails to be written does not lose them.
+        Sessions are dictionaries with an 'id' and an 'entries' dictionary of name -> entry, as ReportBuilder expects.
+        """
+        self.flush()
+        last_id = 0
+        while True:
+            with self.lock:
+                page = self.connection.execute(
+                    "SELECT id FROM sessions WHERE reported = 0 AND id > ? ORDER BY id LIMIT ?",
+                    (last_id, page_size)).fetchall()
+            if not page:
+                return
+
+            for session_id, in page:
+                last_id = session_id
+                yield {'id': session_id, 'entries': self.load_entries(session_id)}
+
+    def mark_reported(self, session_ids):
+        """
+        Mark sessions as reported once the report including them has been saved, in a single transaction.
+        Args:
+            session_ids: Ids of the sessions yielded by drain.
+        """
+        session_ids = set(session_ids)
+        if not session_ids:
+            return
+        connection = self.connect()
+        with self.lock:
+            self.flush()
+            connection.executemany("UPDATE sessions SET reported = 1 WHERE id = ?", [(i,) for i in session_ids])
+            connection.commit()
+            self.pending = {key: session for key, session in self.pending.items()
+                            if session['id'] not in session_ids}
+
+    def load_entries(self, session_id):
+        """
+        Returns:
+            Dictionary of entry name -> entry of a session, in save order.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT name, digest, color, statistics, trace_x, trace_y FROM entries "
+                "WHERE session_id = ? ORDER BY position", (session_id,)).fetchall()
+
+        entries = {}
+        for name, digest, color, statistics, trace_x, trace_y in rows:
+            entries[name] = {
+                'digest': digest,
+                'color': color,
+                'statistics': json.loads(statistics),
+                'trace': (np.frombuffer(trace_x, dtype=np.float32), np.frombuffer(trace_y, dtype=np.float32))
+                if trace_x is not None else None,
+            }
+        return entries
+
+    def query(self, digest=None, since=None, until=None, stat=None, low=None, high=None, limit=1000):
+        """
+        Look up saved entries, in any session, through the indexes.
+        Args:
+            digest: Only entries of signals with this signal_digest.
+            since: Only entries saved at or after this UNIX time.
+            until: Only entries saved before this UNIX time.
+            stat: One of STAT_COLUMNS, to select entries whose statistic lies in [low, high].
+            low: Lower bound of the statistic, or None.
+            high: Upper bound of the statistic, or None.
+            limit: Maximum number of rows returned.
+        Returns:
+            A list of dictionaries with the session id, name, digest, save time and statistics of every entry.
+        """
+        conditions, parameters = [], []
+        if digest is not None:
+            conditions.append("digest = ?")
+            parameters.append(digest)
+        if since is not None:
+            conditions.append("created >= ?")
+            parameters.append(since)
+        if until is not None:
+            conditions.append("created < ?")
+            parameters.append(until)
+        if stat is not None:
+            if stat not in STAT_COLUMNS:
+                raise ValueError(f"Unsupported statistic: {stat}")
+            if low is not None:
+                conditions.append(f"{stat} >= ?")
+                parameters.append(low)
+            if high is not None:
+                conditions.append(f"{stat} <= ?")
+                parameters.append(high)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        self.flush()
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT session_id, name, digest, created, statistics FROM entries {where} ORDER BY created LIMIT ?",
+                parameters + [limit]).fetchall()
+        return [{'session_id': session_id, 'name': name, 'digest': digest, 'created': created,
+                 'statistics': json.loads(statistics)} for session_id, name, digest, created, statistics in rows]
+
+    def close(self):
+        """
+        Write the buffered rows and close the database.
+        """
+        with self.lock:
+            if self.connection is None:
+                return
+            self.flush()
+            self.connection.close()
+            self.connection = None
@@ -0,0 +1,306 @@
+"""
+Loading of recordings from the file formats supported by the signal viewer.
+
+The loaders follow the conventions of the viewer: CSV files hold time in the first column and the signal in the
+second, TXT files hold one sample per line and EDF files are read with pyEDFlib. There is no Qt dependency, so the
+same loaders serve the GUI and batch processing.
+
+Loaded samples are kept in a compact storage policy, chosen with the SIGNAL_VIEWER_STORAGE environment variable or
+set_storage_policy(): 'float32' (the default) halves the memory of float64, 'int16' additionally keeps the digital
+samples of ADC recordings (EDF) with their gain and offset, a quarter of float64, and 'float64' keeps full precision.
+Samples are widened to float64 only where they are computed on; time columns always stay float64.
+
+Uniformly sampled time columns are not stored at all: they become a UniformTime (t0, dt, n) whose values are computed
+for the indices that are drawn, and whose time -> index lookups are arithmetic.
+"""
+import os
+
+import numpy as np
+
+from instrumentation import tracer
+
+SIGNAL_EXTENSIONS = ('.csv', '.txt', '.edf')
+
+STORAGE_POLICIES = ('float32', 'int16', 'float64')
+# Largest deviation from a uniform grid, in sampling steps, for a time column to be stored as a UniformTime
+UNIFORM_TOLERANCE = 0.01
+storage_policy = os.environ.get("SIGNAL_VIEWER_STORAGE", "float32")
+
+
+def set_storage_policy(policy):
+    """
+    Set the storage policy used by the loaders when none is given.
+    Args:
+        policy: One of STORAGE_POLICIES.
+    """
+    global storage_policy
+    if policy not in STORAGE_POLICIES:
+        raise ValueError(f"Unsupported storage policy: {policy}")
+    storage_policy = policy
+    os.environ["SIGNAL_VIEWER_STORAGE"] = policy  # Inherited by worker processes
+
+
+class ScaledSignal:
+    """
+    Signal stored as int16 digital samples with a gain and an offset, as recorded by an ADC.
+
+    It behaves as a read-only 1-D float64 array where it is computed on: indexing and slicing return widened
+    float64 values, and numpy functions widen it through __array__. Only the digital samples are kept in memory.
+    """
+    dtype = np.dtype(np.float64)  # Type of the widened values
+    ndim = 1
+
+    def __init__(self, digital, gain, offset):
+        """
+        Args:
+            digital: The digital samples; they must fit in int16. An int16 array-like, such as a memory-mapped or
+                lazily decompressed array, is kept as it is.
+            gain: Physical units per digital step.
+            offset: Physical value of the digital value 0.
+        """
+        self.digital = digital if getattr(digital, 'dtype', None) == np.int16 else np.asarray(digital, dtype=np.int16)
+        self.gain = float(gain)
+        self.offset = float(offset)
+
+    @property
+    def shape(self):
+        return self.digital.shape
+
+    @property
+    def size(self):
+        return self.digital.size
+
+    @property
+    def nbytes(self):
+        return self.digital.nbytes
+
+    def __len__(self):
+        return len(self.digital)
+
+    def __getitem__(self, key):
+        return self.widen(self.digital[key])
+
+    def __array__(self, dtype=None, copy=None):
+        return self.widen(self.digital, dtype)
+
+    def widen(self, digital, dtype=None):
+        """Physical values of digital samples, computed in float64 and returned as `dtype` (default float64)."""
+        values = np.multiply(digital, self.gain, dtype=np.float64)
+        values += self.offset
+        return values if dtype is None else values.astype(dtype, copy=False)
+
+    def __repr__(self):
+        return f"ScaledSignal({len(self)} samples, gain={self.gain:g}, offset={self.offset:g})"
+
+
+class UniformTime:
+    """
+    Implicit time axis of a uniformly sampled signal: sample i is at t0 + i * dt.
+
+    It behaves as a read-only 1-D float64 array: indexing and slicing compute the times of the requested samples,
+    searchsorted finds the sample of a time in constant time, and numpy functions materialize it through __array__.
+    Adding or subtracting a number shifts the axis.
+    """
+    dtype = np.dtype(np.float64)
+    ndim = 1
+
+    def __init__(self, t0, dt, n):
+        """
+        Args:
+            t0: Time of the first sample.
+            dt: Sampling step, positive.
+            n: Number of samples.
+        """
+        self.t0 = float(t0)
+        self.dt = float(dt)
+        self.n = int(n)
+
+    @property
+    def shape(self):
+        return (self.n,)
+
+    @property
+    def size(self):
+        return self.n
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.times(np.arange(*key.indices(self.n)))
+        if np.ndim(key) == 0:
+            index = int(key)
+            if not -self.n <= index < self.n:
+                raise IndexError(f"index {index} is out of bounds for a time axis of {self.n} samples")
+            return self.t0 + (index % self.n) * self.dt
+        return self.times(np.arange(self.n)[key])
+
+    def times(self, indices):
+        """Times of sample indices."""
+        return self.t0 + np.asarray(indices, dtype=np.float64) * self.dt
+
+    def searchsorted(self, value, side='left', sorter=None):
+        """
+        Index where a time would be inserted to keep the axis sorted, as numpy.searchsorted, without a search.
+        The axis is already sorted, so `sorter` is ignored.
+        """
+        position = (np.asarray(value, dtype=np.float64) - self.t0) / self.dt
+        nearest = np.round(position)
+        exact = np.abs(position - nearest) < 1e-9  # A time stamp of the axis, up to rounding
+        if side == 'left':
+            index = np.where(exact, nearest, np.ceil(position))
+        else:
+            index = np.where(exact, nearest, np.floor(position)) + 1
+        index = np.clip(index, 0, self.n).astype(np.intp)
+        return index if index.ndim else index.item()
+
+    def __array__(self, dtype=None, copy=None):
+        values = self.times(np.arange(self.n))
+        return values if dtype is None else values.astype(dtype, copy=False)
+
+    def __add__(self, offset):
+        if np.ndim(offset) != 0:
+            return NotImplemented
+        return UniformTime(self.t0 + offset, self.dt, self.n)
+
+    __radd__ = __add__
+
+    def __sub__(self, offset):
+        if np.ndim(offset) != 0:
+            return NotImplemented
+        return UniformTime(self.t0 - offset, self.dt, self.n)
+
+    def __repr__(self):
+        return f"UniformTime(t0={self.t0:g}, dt={self.dt:g}, n={self.n})"
+
+
+def implicit_time(time_data, tolerance=UNIFORM_TOLERANCE, chunk_size=1 << 20):
+    """
+    Replace a uniformly sampled time column by a UniformTime.
+    Args:
+        time_data: The time column.
+        tolerance: Largest deviation from the uniform grid through the first and last time stamps, in steps.
+        chunk_size: Samples compared at a time.
+    Returns:
+        A UniformTime, or the time column unchanged if it is not uniform within the tolerance.
+    """
+    n = len(time_data)
+    if n < 2:
+        return time_data
+    t0, dt = float(time_data[0]), (float(time_data[-1]) - float(time_data[0])) / (n - 1)
+    if not dt > 0:
+        return time_data
+    for start in range(0, n, chunk_size):
+        grid = t0 + np.arange(start, min(start + chunk_size, n)) * dt
+        if np.max(np.abs(time_data[start:start + chunk_size] - grid)) > tolerance * dt:
+            return time_data
+    return UniformTime(t0, dt, n)
+
+
+def store_signal(values, policy=None):
+    """
+    Convert loaded samples to a storage policy.
+    Args:
+        values: The samples.
+        policy: One of STORAGE_POLICIES, defaults to the configured policy. Floating point samples have no
+            digital form, so 'int16' stores them as float32.
+    Returns:
+        The samples as a float32 or float64 numpy array.
+    """
+    policy = policy or storage_policy
+    if policy not in STORAGE_POLICIES:
+        raise ValueError(f"Unsupported storage policy: {policy}")
+    return np.ascontiguousarray(values, dtype=np.float64 if policy == 'float64' else np.float32)
+
+
+def read_edf_signal(reader, channel=0, policy=None):
+    """
+    Read one signal of an open EDF file in a storage policy.
+    Args:
+        reader: A pyedflib.EdfReader.
+        channel: Signal index.
+        policy: One of STORAGE_POLICIES, defaults to the configured policy.
+    Returns:
+        A ScaledSignal of the digital samples for 'int16', otherwise the physical samples as a numpy array.
+    """
+    policy = policy or storage_policy
+    if policy != 'int16':
+        return store_signal(reader.readSignal(channel), policy)
+
+    # Physical value = gain * digital + offset, from the calibration of the header
+    digital_range = reader.getDigitalMaximum(channel) - reader.getDigitalMinimum(channel)
+    gain = (reader.getPhysicalMaximum(channel) - reader.getPhysicalMinimum(channel)) / digital_range
+    offset = reader.getPhysicalMaximum(channel) - gain * reader.getDigitalMaximum(channel)
+    return ScaledSignal(reader.readSignal(channel, digital=True), gain, offset)
+
+
+def list_recordings(directory, recursive=False):
+    """
+    List the recordings of a directory in a stable (sorted) order.
+    Args:
+        directory: Directory to scan.
+        recursive: Also scan sub-directories.
+    Returns:
+        A sorted list of file paths with one of SIGNAL_EXTENSIONS.
+    """
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        paths.extend(os.path.join(root, name) for name in files
+                     if os.path.splitext(name)[1].lower() in SIGNAL_EXTENSIONS)
+        if not recursive:
+            break
+    return sorted(paths)
+
+
+@tracer.traced('load')
+def load_signal(file_path, channel=0, policy=None):
+    """
+    Load the samples of a recording.
+    Args:
+        file_path: Path to a CSV, TXT or EDF file.
+        channel: Signal index to read from EDF files.
+        policy: One of STORAGE_POLICIES, defaults to the configured policy.
+    Returns:
+        The signal as a 1-D numpy array in the storage policy, or a ScaledSignal for EDF files with 'int16'.
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+
+    if extension == ".txt":
+        # One sample per line, whitespace separated
+        return store_signal(np.atleast_1d(np.loadtxt(file_path)).ravel(), policy)
+    if extension == ".csv":
+        data = load_csv(file_path)
+        # The signal is in the second column when a time column is present
+        return store_signal(data[:, 1] if data.ndim == 2 and data.shape[1] > 1 else data.ravel(), policy)
+    if extension == ".edf":
+        import pyedflib
+
+        with pyedflib.EdfReader(file_path) as f:
+            return read_edf_signal(f, channel, policy)
+    raise ValueError(f"Unsupported file format: {extension}")
+
+
+def load_time_series(file_path, policy=None):
+    """
+    Load a CSV recording with time in the first column and the signal in the second.
+    Returns:
+        (time, signal): a UniformTime if the recording is uniformly sampled, otherwise the time column as float64,
+        and the signal in the storage policy.
+    """
+    data = load_csv(file_path)
+    if data.shape[1] < 2:
+        raise ValueError("File must contain a time column and a signal column.")
+    return implicit_time(np.ascontiguousarray(data[:, 0])), store_signal(data[:, 1], policy)
+
+
+@tracer.traced('parse')
+def load_csv(file_path):
+    """
+    Load a numeric CSV file, skipping a header line if there is one.
+    """
+    try:
+        return np.loadtxt(file_path, delimiter=',', ndmin=2)
+    except ValueError:
+        return np.loadtxt(file_path, delimiter=',', skiprows=1, ndmin=2)
@@ -0,0 +1,1080 @@
+"""
+Numerical kernels shared by the signal viewer windows.
+
+Everything in this module works on plain numpy arrays and has no Qt dependency, so the same code paths
+serve the GUI, batch processing and benchmarks.
+"""
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from fractions import Fraction
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from instrumentation import tracer
+from signal_io import ScaledSignal, UniformTime
+
+GAP_FILL_METHODS = ('linear', 'pchip', 'cubic', 'ar')
+
+# Traces derived from a signal over a trailing window, drawn over it on the rectangular graphs
+DERIVED_TRACES = ('Moving Average', 'Moving RMS', 'Envelope', 'Min/Max Band')
+
+# Favour the candidate closest to the user's boundary when several splices score the same
+_TIE_BREAK = 1e-9
+
+# Samples per chunk of the statistics kernel: 8 MB of float64 per worker
+STATISTICS_CHUNK = 1 << 20
+# Number of points each chunk contributes to the percentile sketch
+SKETCH_POINTS = 1024
+
+
+def find_dropouts(signal):
+    """
+    Locate runs of missing (NaN or infinite) samples in a signal.
+    Args:
+        signal: The signal data as a 1-D numpy array.
+    Returns:
+        (starts, lengths) integer arrays describing every run of missing samples.
+    """
+    missing = ~np.isfinite(np.asarray(signal, dtype=np.float64))
+    if not missing.any():
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    # Rising and falling edges of the padded mask mark the start and end of every run
+    edges = np.diff(np.concatenate(([False], missing, [False])).astype(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return starts, ends - starts
+
+
+def fill_dropouts(signal, method='pchip', context=16, ar_order=4):
+    """
+    Repair every dropout (run of NaN samples) of a recording in a single vectorized call.
+    Args:
+        signal: The signal data as a 1-D numpy array.
+        method: One of GAP_FILL_METHODS.
+        context: Number of valid samples used on each side of a dropout.
+        ar_order: Model order used by the 'ar' method.
+    Returns:
+        A float64 copy of the signal with all dropouts filled.
+    """
+    starts, lengths = find_dropouts(signal)
+    return fill_gaps(signal, starts, lengths, method=method, context=context, ar_order=ar_order)
+
+
+@tracer.traced('glue')
+def bridge_signals(portion1, portion2, gap, method='pchip', context=16, ar_order=4):
+    """
+    Synthesize the samples joining the end of one signal portion to the start of another.
+    Args:
+        portion1: The portion placed before the gap.
+        portion2: The portion placed after the gap.
+        gap: Number of samples to synthesize between the portions.
+        method: One of GAP_FILL_METHODS.
+        context: Number of samples of each portion used to fit the bridge.
+        ar_order: Model order used by the 'ar' method.
+    Returns:
+        A float64 array with exactly `gap` samples.
+    """
+    gap = int(gap)
+    if gap <= 0:
+        return np.empty(0, dtype=np.float64)
+
+    # Only the context next to the join is needed, so the portions themselves are never copied
+    tail = np.asarray(portion1[-context:], dtype=np.float64) if context > 0 else np.empty(0)
+    head = np.asarray(portion2[:context], dtype=np.float64) if context > 0 else np.empty(0)
+    buffer = np.concatenate([tail, np.full(gap, np.nan), head])
+    filled = fill_gaps(buffer, [len(tail)], [gap], method=method, context=context, ar_order=ar_order)
+    return filled[len(tail):len(tail) + gap]
+
+
+def fill_gaps(signal, starts, lengths, method='pchip', context=16, ar_order=4):
+    """
+    Fill many gaps of a signal at once using the samples around each gap.
+
+    The bridge of each gap is fitted to `context` samples on both sides: 'linear' joins the two edge samples,
+    'cubic' is a Hermite spline whose end slopes are regressed from the context, 'pchip' is the same spline with
+    Fritsch-Carlson slope limiting (no overshoot), and 'ar' blends forward and backward autoregressive predictions.
+    All gaps are processed together, so thousands of gaps cost a handful of numpy calls.
+    Args:
+        signal: The signal data as a 1-D numpy array. Values inside the gaps are ignored.
+        starts: Index of the first missing sample of each gap.
+        lengths: Number of missing samples of each gap.
+        method: One of GAP_FILL_METHODS.
+        context: Number of samples used on each side of a gap.
+        ar_order: Model order used by the 'ar' method.
+    Returns:
+        A float64 copy of the signal with every gap filled.
+    """
+    if method not in GAP_FILL_METHODS:
+        raise ValueError(f"Unknown gap fill method '{method}'. Use one of {GAP_FILL_METHODS}.")
+
+    out = np.array(signal, dtype=np.float64)
+    starts = np.asarray(starts, dtype=np.intp).ravel()
+    lengths = np.asarray(lengths, dtype=np.intp).ravel()
+    keep = lengths > 0
+    starts, lengths = starts[keep], lengths[keep]
+    if len(starts) == 0:
+        return out
+
+    context = max(int(context), 1)
+    left, left_valid, right, right_valid = _gather_context(out, starts, lengths, context)
+
+    # Edge values: the samples touching the gap, falling back to the other side when one side is missing
+    has_left = left_valid[:, -1]
+    has_right = right_valid[:, 0]
+    y0 = np.where(has_left, left[:, -1], np.where(has_right, right[:, 0], 0.0))
+    y1 = np.where(has_right, right[:, 0], y0)
+    y0 = np.where(has_left, y0, y1)
+
+    # Flat (gap, offset) coordinates of every missing sample
+    gap_id = np.repeat(np.arange(len(starts)), lengths)
+    first = np.cumsum(lengths) - lengths
+    offset = np.arange(lengths.sum()) - np.repeat(first, lengths)
+    span = (lengths + 1).astype(np.float64)  # Distance between the two edge samples
+    t = (offset + 1) / span[gap_id]
+
+    if method == 'linear':
+        values = y0[gap_id] + (y1 - y0)[gap_id] * t
+    else:
+        m0 = np.where(has_left, _edge_slope(left, left_valid, context - 1), 0.0)
+        m1 = np.where(has_right, _edge_slope(right, right_valid, 0), 0.0)
+        if method == 'pchip':
+            m0, m1 = _limit_slopes(y0, y1, m0, m1, span)
+        values = _hermite(y0[gap_id], m0[gap_id], y1[gap_id], m1[gap_id], span[gap_id], t)
+        if method == 'ar':
+            ar_values, usable = _ar_bridge(left, left_valid, right, right_valid, lengths, offset, gap_id, t,
+                                           ar_order)
+            values = np.where(usable[gap_id], ar_values, values)
+
+    out[starts[gap_id] + offset] = values
+    return out
+
+
+def _gather_context(signal, starts, lengths, context):
+    """
+    Collect the context samples on both sides of every gap.
+    Returns:
+        (left, left_valid, right, right_valid) arrays of shape (n_gaps, context). The left block ends right
+        before the gap and the right block starts right after it, both ordered oldest sample first.
+    """
+    n = len(signal)
+    offsets = np.arange(context)
+    left_idx = starts[:, None] - context + offsets
+    right_idx = (starts + lengths)[:, None] + offsets
+    left = signal[np.clip(left_idx, 0, n - 1)]
+    right = signal[np.clip(right_idx, 0, n - 1)]
+    left_valid = (left_idx >= 0) & np.isfinite(left)
+    right_valid = (right_idx < n) & np.isfinite(right)
+    return left, left_valid, right, right_valid
+
+
+def _edge_slope(values, valid, edge):
+    """
+    Slope (per sample) of every row at its edge sample, ignoring invalid samples.
+
+    A weighted quadratic is fitted around the edge so curvature in the context does not bias the slope; rows with
+    fewer than three valid samples fall back to a straight line, and rows with fewer than two get a zero slope.
+    Args:
+        values: Context block of shape (n_gaps, context).
+        valid: Mask of usable samples in the block.
+        edge: Column index of the sample touching the gap.
+    """
+    weights = valid.astype(np.float64)
+    y = np.where(valid, values, 0.0)
+    x = np.arange(values.shape[1], dtype=np.float64) - edge
+    count = weights.sum(axis=1)
+
+    # Weighted normal equations of y = a + b*x + c*x^2, solved for all rows at once
+    powers = np.stack([np.ones_like(x), x, x * x])
+    gram = np.einsum('ik,jk,gk->gij', powers, powers, weights)
+    rhs = np.einsum('ik,gk->gi', powers, weights * y)
+    quadratic = count >= 3
+    gram[~quadratic, 2, :] = 0.0
+    gram[~quadratic, :, 2] = 0.0
+    gram[~quadratic, 2, 2] = 1.0
+    rhs[~quadratic, 2] = 0.0
+    singular = np.abs(np.linalg.det(gram)) < 1e-12
+    gram[singular] = np.eye(3)
+    coefficients = np.linalg.solve(gram, rhs[..., None])[..., 0]
+    return np.where((count >= 2) & ~singular, coefficients[:, 1], 0.0)
+
+
+def _limit_slopes(y0, y1, m0, m1, span):
+    """Fritsch-Carlson limiting of the end slopes so the bridge stays monotone between its edges."""
+    delta = (y1 - y0) / span
+    flat = delta == 0
+    safe_delta = np.where(flat, 1.0, delta)
+    alpha = np.where(flat, 0.0, np.maximum(m0 / safe_delta, 0.0))
+    beta = np.where(flat, 0.0, np.maximum(m1 / safe_delta, 0.0))
+    radius = np.hypot(alpha, beta)
+    scale = np.where(radius > 3.0, 3.0 / np.where(radius > 0, radius, 1.0), 1.0)
+    return alpha * scale * delta, beta * scale * delta
+
+
+def _hermite(y0, m0, y1, m1, span, t):
+    """Evaluate cubic Hermite bridges at normalized positions t in (0, 1)."""
+    t2 = t * t
+    t3 = t2 * t
+    return ((2 * t3 - 3 * t2 + 1) * y0 + (t3 - 2 * t2 + t) * span * m0 +
+            (-2 * t3 + 3 * t2) * y1 + (t3 - t2) * span * m1)
+
+
+def _fit_ar(history, order):
+    """
+    Fit AR coefficients to every row of a context block with batched ridge-regularized least squares.
+    Args:
+        history: Array of shape (n_gaps, context), oldest sample first.
+        order: Model order.
+    Returns:
+        Coefficients of shape (n_gaps, order) applied to the last `order` samples (oldest first).
+    """
+    windows = np.lib.stride_tricks.sliding_window_view(history, order + 1, axis=1)
+    lagged, target = windows[..., :order], windows[..., order]
+    gram = np.einsum('gni,gnj->gij', lagged, lagged)
+    rhs = np.einsum('gni,gn->gi', lagged, target)
+    ridge = 1e-6 * np.trace(gram, axis1=1, axis2=2) / order + 1e-12
+    gram += ridge[:, None, None] * np.eye(order)
+    return np.linalg.solve(gram, rhs[..., None])[..., 0]
+
+
+def _ar_predict(history, coefficients, steps):
+    """Run the AR recursion of every row forward for `steps` samples."""
+    order = coefficients.shape[1]
+    state = history[:, -order:].copy()
+    predictions = np.empty((history.shape[0], steps))
+    for step in range(steps):
+        value = np.einsum('gi,gi->g', state, coefficients)
+        predictions[:, step] = value
+        state[:, :-1] = state[:, 1:]
+        state[:, -1] = value
+    return predictions
+
+
+def _ar_bridge(left, left_valid, right, right_valid, lengths, offset, gap_id, t, order):
+    """
+    Predict every gap forward from its left context and backward from its right context and cross-fade both.
+    Returns:
+        (values, usable): the flat bridge values and a per-gap mask of gaps with enough context for the model.
+    """
+    order = max(int(order), 1)
+    context = left.shape[1]
+    usable = left_valid.all(axis=1) & right_valid.all(axis=1) & (context >= 2 * order + 1)
+    values = np.zeros(len(gap_id))
+    if not usable.any():
+        return values, usable
+
+    # Demean each side so the model only has to capture the dynamics
+    left_mean = left.mean(axis=1, keepdims=True)
+    right_mean = right.mean(axis=1, keepdims=True)
+    forward_history = np.where(usable[:, None], left - left_mean, 0.0)
+    backward_history = np.where(usable[:, None], (right - right_mean)[:, ::-1], 0.0)
+
+    steps = int(lengths.max())
+    forward = _ar_predict(forward_history, _fit_ar(forward_history, order), steps) + left_mean
+    backward = _ar_predict(backward_history, _fit_ar(backward_history, order), steps) + right_mean
+
+    # Keep unstable models from running away on long gaps
+    low = np.minimum(left.min(axis=1), right.min(axis=1))
+    high = np.maximum(left.max(axis=1), right.max(axis=1))
+    margin = (high - low)[:, None]
+    forward = np.clip(forward, (low[:, None] - margin), (high[:, None] + margin))
+    backward = np.clip(backward, (low[:, None] - margin), (high[:, None] + margin))
+
+    # The backward prediction runs from the end of the gap towards its start
+    values = (1.0 - t) * forward[gap_id, offset] + t * backward[gap_id, lengths[gap_id] - 1 - offset]
+    return values, usable
+
+
+def find_best_splice(signal1, end1, signal2, start2, radius=256, match_length=64, slope_weight=0.5):
+    """
+    Search the neighbourhood of both region boundaries for the splice that continues signal 1 most naturally.
+
+    First the start of signal 2 is moved within `radius` samples so that the samples preceding it look like the
+    tail of signal 1, then the end of signal 1 is moved so that the samples following it look like the head of
+    signal 2. Each candidate is scored by its normalized cross-correlation (computed for all candidates at once
+    with FFT correlation) minus a penalty for the slope and level mismatch at the join.
+    Args:
+        signal1: The signal placed before the join.
+        end1: Current end index (exclusive) of the signal 1 region.
+        signal2: The signal placed after the join.
+        start2: Current start index of the signal 2 region.
+        radius: Number of samples searched on each side of both boundaries.
+        match_length: Number of samples compared around the join.
+        slope_weight: Weight of the slope/level mismatch penalty relative to the correlation.
+    Returns:
+        (end1, start2, score) of the best splice found.
+    """
+    signal1 = np.asarray(signal1, dtype=np.float64)
+    signal2 = np.asarray(signal2, dtype=np.float64)
+    end1 = int(np.clip(end1, 2, len(signal1)))
+    start2 = int(np.clip(start2, 0, len(signal2) - 2))
+    radius = max(int(radius), 0)
+    score = -np.inf
+
+    # Move the start of signal 2: compare signal2[k - m:k] with the tail of signal 1
+    m = max(2, min(int(match_length), end1))
+    low, high = max(start2 - radius, m), min(start2 + radius, len(signal2) - 2)
+    if low <= high:
+        ncc = _ncc_scan(signal1[end1 - m:end1], signal2[low - m:high])
+        candidates = np.arange(low, high + 1)
+        penalty = _join_penalty(signal1[end1 - 1] - signal1[end1 - 2],
+                                signal2[candidates] - signal1[end1 - 1],
+                                signal2[candidates + 1] - signal2[candidates],
+                                signal1[end1 - m:end1])
+        scores = ncc - slope_weight * penalty - _TIE_BREAK * np.abs(candidates - start2)
+        best = int(np.argmax(scores))
+        start2, score = int(candidates[best]), float(scores[best])
+
+    # Move the end of signal 1: compare signal1[k:k + m] with the head of signal 2
+    m = max(2, min(int(match_length), len(signal2) - start2))
+    low, high = max(end1 - radius, 2), min(end1 + radius, len(signal1) - m)
+    if low <= high:
+        ncc = _ncc_scan(signal2[start2:start2 + m], signal1[low:high + m])
+        candidates = np.arange(low, high + 1)
+        penalty = _join_penalty(signal1[candidates - 1] - signal1[candidates - 2],
+                                signal2[start2] - signal1[candidates - 1],
+                                signal2[start2 + 1] - signal2[start2],
+                                signal2[start2:start2 + m])
+        scores = ncc - slope_weight * penalty - _TIE_BREAK * np.abs(candidates - end1)
+        best = int(np.argmax(scores))
+        end1, score = int(candidates[best]), float(scores[best])
+
+    return end1, start2, score
+
+
+def crossfade(portion1, portion2, overlap):
+    """
+    Join two portions by overlapping their ends with a raised-cosine cross-fade.
+    Args:
+        portion1: The portion placed first.
+        portion2: The portion placed second.
+        overlap: Number of samples shared by both portions.
+    Returns:
+        The joined signal, `overlap` samples shorter than the two portions together.
+    """
+    portion1 = np.asarray(portion1, dtype=np.float64)
+    portion2 = np.asarray(portion2, dtype=np.float64)
+    overlap = int(min(max(overlap, 0), len(portion1), len(portion2)))
+    split = len(portion1) - overlap
+
+    out = np.empty(len(portion1) + len(portion2) - overlap)
+    out[:split] = portion1[:split]
+    out[split:len(portion1)] = crossfade_overlap(portion1[split:], portion2[:overlap])
+    out[len(portion1):] = portion2[overlap:]
+    return out
+
+
+def crossfade_overlap(tail, head):
+    """
+    Blend the overlapping samples of a cross-fade.
+    Args:
+        tail: The last samples of the first portion.
+        head: The first samples of the second portion, same length as `tail`.
+    Returns:
+        The blended overlap, fading from `tail` into `head`.
+    """
+    overlap = len(tail)
+    if overlap == 0:
+        return np.empty(0, dtype=np.float64)
+    fade_in = 0.5 - 0.5 * np.cos(np.pi * (np.arange(overlap) + 0.5) / overlap)
+    return np.asarray(tail, dtype=np.float64) * (1.0 - fade_in) + np.asarray(head, dtype=np.float64) * fade_in
+
+
+@tracer.traced('decimate')
+def minmax_decimate(signal, max_points=4000):
+    """
+    Reduce a signal for display while keeping its visual envelope.
+
+    The signal is split into equal buckets and the minimum and maximum of every bucket are kept in the order they
+    occur, so spikes survive decimation. Signals that already fit are returned untouched.
+    Args:
+        signal: The signal data as a 1-D numpy array or a ScaledSignal.
+        max_points: Upper bound on the number of points returned.
+    Returns:
+        (x, y): sample indices and values of the kept points.
+    """
+    if isinstance(signal, ScaledSignal):
+        # The extremes of the digital samples are at the same positions, so only the kept points are widened
+        x, _ = minmax_decimate(signal.digital, max_points)
+        return x, signal[x]
+    signal = np.asarray(signal)
+    n = len(signal)
+    if n <= max_points:
+        return np.arange(n), signal
+
+    bucket = int(np.ceil(n / max(max_points // 2, 1)))
+    full = n - n % bucket
+    blocks = signal[:full].reshape(-1, bucket)
+    lows, highs = blocks.argmin(axis=1), blocks.argmax(axis=1)
+    base = np.arange(blocks.shape[0]) * bucket
+    x = np.column_stack([base + np.minimum(lows, highs), base + np.maximum(lows, highs)]).ravel()
+
+    if full < n:
+        tail = signal[full:]
+        x = np.concatenate([x, full + np.sort([tail.argmin(), tail.argmax()])])
+    return x, signal[x]
+
+
+def moving_average(signal, window):
+    """
+    Trailing moving average from a cumulative sum, in O(n) whatever the window.
+    Args:
+        signal: The signal data as a 1-D numpy array.
+        window: Window length in samples; the first samples average the window available so far.
+    Returns:
+        The averages, one per sample.
+    """
+    signal = np.asarray(signal, dtype=np.float64)
+    window = max(1, int(window))
+    sums = np.concatenate(([0.0], np.cumsum(signal)))
+    averages = np.empty(len(signal))
+    head = min(window, len(signal))
+    averages[:head] = sums[1:head + 1] / np.arange(1, head + 1)
+    averages[head:] = (sums[head + 1:] - sums[1:len(signal) - head + 1]) / window
+    return averages
+
+
+def moving_rms(signal, window):
+    """
+    Trailing moving RMS: the square root of the moving average of the squared signal.
+    """
+    signal = np.asarray(signal, dtype=np.float64)
+    return np.sqrt(np.maximum(moving_average(signal * signal, window), 0.0))
+
+
+def rolling_extrema(signal, window):
+    """
+    Trailing rolling minimum and maximum in O(n) whatever the window.
+
+    scipy's min/max filters keep a monotonic deque of candidate samples, so every sample enters and leaves it once.
+    Args:
+        signal: The signal data as a 1-D numpy array.
+        window: Window length in samples.
+    Returns:
+        (minimum, maximum) arrays, one value per sample.
+    """
+    from scipy.ndimage import maximum_filter1d, minimum_filter1d
+
+    signal = np.asarray(signal, dtype=np.float64)
+    window = max(1, int(window))
+    # The origin shifts the window so that it ends at the current sample
+    origin = (window - 1) // 2
+    return (minimum_filter1d(signal, window, mode='nearest', origin=origin),
+            maximum_filter1d(signal, window, mode='nearest', origin=origin))
+
+
+def peak_envelope(signal, window):
+    """
+    Peak envelope without a Hilbert transform: the signal is rectified, held at its rolling maximum and smoothed
+    with a moving average of the same window.
+    Returns:
+        The envelope, one value per sample.
+    """
+    _, peaks = rolling_extrema(np.abs(np.asarray(signal, dtype=np.float64)), window)
+    return moving_average(peaks, window)
+
+
+@tracer.traced('decimate')
+def derived_trace(signal, name, window):
+    """
+    Compute one of DERIVED_TRACES.
+    Args:
+        signal: The signal data as a 1-D numpy array.
+        name: One of DERIVED_TRACES.
+        window: Window length in samples.
+    Returns:
+        A tuple of one curve, or of the lower and upper curves of a band.
+    """
+    if name == 'Moving Average':
+        return (moving_average(signal, window),)
+    if name == 'Moving RMS':
+        return (moving_rms(signal, window),)
+    if name == 'Envelope':
+        return (peak_envelope(signal, window),)
+    if name == 'Min/Max Band':
+        return rolling_extrema(signal, window)
+    raise ValueError(f"Unsupported derived trace: {name}")
+
+
+class QuantileSketch:
+    """
+    Mergeable summary of a value distribution for approximate percentiles in bounded memory.
+
+    Every chunk contributes SKETCH_POINTS evenly spaced order statistics, each weighted by the number of
+    samples it stands for. A 10^9-sample recording gives about a million points; beyond max_points the summary is
+    compressed to an eighth of that, so memory stays bounded for streams of any length.
+    """
+
+    def __init__(self, size=SKETCH_POINTS, max_points=1 << 20):
+        self.size = size
+        self.max_points = max_points
+        self.values = np.empty(0)
+        self.weights = np.empty(0)
+
+    def add(self, chunk):
+        """Summarize a chunk of finite samples."""
+        n = len(chunk)
+        if n == 0:
+            return
+        if n <= self.size:
+            values, weights = np.sort(chunk), np.ones(n)
+        else:
+            # Midpoint ranks, so every point stands for the same number of samples
+            ranks = ((np.arange(self.size) + 0.5) * n / self.size).astype(np.intp)
+            values, weights = np.sort(chunk)[ranks], np.full(self.size, n / self.size)
+        self.append(values, weights)
+
+    def merge(self, other):
+        """Fold another sketch into this one."""
+        self.append(other.values, other.weights)
+
+    def append(self, values, weights):
+        self.values = np.concatenate([self.values, values])
+        self.weights = np.concatenate([self.weights, weights])
+        if len(self.values) > self.max_points:
+            self.compress(self.max_points // 8)
+
+    def compress(self, size):
+        order = np.argsort(self.values, kind='stable')
+        values, cumulative = self.values[order], np.cumsum(self.weights[order])
+        total = cumulative[-1]
+        targets = (np.arange(size) + 0.5) * total / size
+        self.values = values[np.minimum(np.searchsorted(cumulative, targets), len(values) - 1)]
+        self.weights = np.full(size, total / size)
+
+    def quantile(self, q):
+        """
+        Approximate quantiles of everything added so far.
+        Args:
+            q: A quantile or array of quantiles in [0, 1].
+        Returns:
+            The estimated values, NaN when the sketch is empty.
+        """
+        if len(self.values) == 0:
+            return np.full(np.shape(q), np.nan)
+        order = np.argsort(self.values, kind='stable')
+        values, weights = self.values[order], self.weights[order]
+        # Every point sits at the centre of the rank interval it represents
+        centres = (np.cumsum(weights) - weights / 2) / weights.sum()
+        return np.interp(q, centres, values)
+
+
+@tracer.traced('stats')
+def signal_statistics(signal, percentiles=(5, 50, 95), chunk_size=STATISTICS_CHUNK, workers=None):
+    """
+    Compute the summary statistics of a signal in a single chunked pass.
+
+    Chunks are processed independently and merged, so memory use is bounded by chunk_size per worker and
+    memory-mapped recordings far larger than RAM are handled. Large signals are split across threads; numpy
+    releases the GIL in the per-chunk reductions.
+    Args:
+        signal: The signal data as a 1-D numpy array, np.memmap or ScaledSignal.
+        percentiles: Percentiles (0-100) estimated with a QuantileSketch.
+        chunk_size: Samples per chunk.
+        workers: Number of threads, one per CPU by default.
+    Returns:
+        A dictionary with count, mean, std, rms, min, max, peak_to_peak, zero_crossing_rate and one 'p<k>'
+        entry per percentile. NaN samples propagate to the moments and extrema as they would with numpy,
+        while the percentiles are estimated from the finite samples.
+    """
+    n = len(signal)
+    if n == 0:
+        return None
+
+    bounds = [(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(bounds)))
+
+    if workers == 1:
+        partials = [_chunk_statistics(signal, start, stop) for start, stop in bounds]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            partials = list(pool.map(lambda bound: _chunk_statistics(signal, *bound), bounds))
+
+    # Chan et al. pairwise merge of the per-chunk means and squared deviations
+    count, mean, m2 = 0, 0.0, 0.0
+    low, high, crossings = np.inf, -np.inf, 0
+    sketch = QuantileSketch()
+    for partial in partials:
+        n_b = partial['count']
+        delta = partial['mean'] - mean
+        total = count + n_b
+        mean += delta * n_b / total
+        m2 += partial['m2'] + delta * delta * count * n_b / total
+        count = total
+        low, high = min(low, partial['min']), max(high, partial['max'])
+        crossings += partial['crossings']
+        sketch.merge(partial['sketch'])
+    if np.isnan(mean):
+        low = high = np.nan
+
+    variance = m2 / count
+    statistics = {
+        'count': count,
+        'mean': mean,
+        'std': np.sqrt(variance),
+        'rms': np.sqrt(variance + mean * mean),
+        'min': low,
+        'max': high,
+        'peak_to_peak': high - low,
+        'zero_crossing_rate': crossings / (count - 1) if count > 1 else 0.0,
+    }
+    values = sketch.quantile(np.asarray(percentiles, dtype=np.float64) / 100.0)
+    for percentile, value in zip(percentiles, np.atleast_1d(values)):
+        statistics[f'p{percentile:g}'] = float(value)
+    return statistics
+
+
+def sample_rate(time_data, default=1.0):
+    """
+    Estimate the sampling rate of a signal from its time axis.
+    Args:
+        time_data: The time data of the signal, in seconds.
+        default: Rate returned when the time axis does not give one.
+    """
+    if isinstance(time_data, UniformTime):
+        return 1.0 / time_data.dt
+    steps = np.diff(np.asarray(time_data[:4096], dtype=np.float64))
+    steps = steps[steps > 0]
+    return 1.0 / float(np.median(steps)) if len(steps) else default
+
+
+@tracer.traced('decimate')
+def resample_signal(signal, rate, target_rate, method='polyphase'):
+    """
+    Resample a uniformly sampled signal to another rate.
+    Args:
+        signal: The signal data as a 1-D numpy array.
+        rate: Its sampling rate in Hz.
+        target_rate: The new sampling rate in Hz.
+        method: 'polyphase' (anti-aliased rational resampling with scipy.signal.resample_poly) or 'fft'
+            (band-limited Fourier resampling with scipy.signal.resample, exact for periodic signals).
+    Returns:
+        The resampled signal; its first sample is at the same time as the first sample of the input.
+    """
+    from scipy import signal as scipy_signal
+
+    signal = np.asarray(signal, dtype=np.float64)
+    if np.isclose(rate, target_rate, rtol=1e-9) or len(signal) < 2:
+        return signal
+    if method == 'fft':
+        return scipy_signal.resample(signal, max(1, int(round(len(signal) * target_rate / rate))))
+    if method != 'polyphase':
+        raise ValueError(f"Unsupported resampling method: {method}")
+
+    ratio = Fraction(target_rate / rate).limit_denominator(1000)
+    resampled = scipy_signal.resample_poly(signal, ratio.numerator, ratio.denominator, padtype='line')
+    return resampled[:int(round(len(signal) * target_rate / rate))]
+
+
+class ResampleCache:
+    """
+    Least-recently-used cache of resampled signals, detected rates, summary indexes and derived traces, keyed by
+    the source array and the parameters.
+
+    Entries hold a weak reference to the source array, so a new array that happens to reuse the id of a freed one
+    is never served a stale result.
+    """
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # (id of the source, parameters) -> (weak reference, result)
+        self.lock = threading.Lock()
+
+    def get(self, signal, rate, target_rate, method='polyphase'):
+        """
+        Returns:
+            The signal resampled from rate to target_rate, computed only the first time.
+        """
+        return self.lookup(signal, (float(rate), float(target_rate), method),
+                           lambda: resample_signal(signal, rate, target_rate, method))
+
+    def get_aligned(self, time_data, signal, target_rate, method='polyphase'):
+        """
+        Put a signal on a uniform grid at target_rate that starts at its first time stamp.
+        Args:
+            time_data: The time data of the signal, used to detect its rate.
+            signal: The signal data.
+            target_rate: Rate of the common grid in Hz.
+        Returns:
+            (time, values) of the resampled signal.
+        """
+        rate = self.rate(time_data)
+        start = float(time_data[0])
+
+        def align():
+            values = resample_signal(signal, rate, target_rate, method)
+            return UniformTime(start, 1.0 / float(target_rate), len(values)), values
+
+        # The time axis is part of the key: shifting it (Auto Align) moves the grid without touching the signal
+        return self.lookup(signal, ('aligned', start, float(rate), float(target_rate), method), align)
+
+    def rate(self, time_data):
+        """
+        Returns:
+            The sampling rate detected from a time axis, computed only the first time.
+        """
+        return self.lookup(time_data, ('rate',), lambda: sample_rate(time_data))
+
+    def summary_index(self, signal):
+        """
+        Returns:
+            The BlockSummaryIndex of a signal, built only the first time.
+        """
+        return self.lookup(signal, ('summary',), lambda: BlockSummaryIndex(signal))
+
+    def derived_trace(self, signal, name, window):
+        """
+        Returns:
+            The derived_trace of a signal for a window length, computed only the first time.
+        """
+        return self.lookup(signal, ('trace', name, int(window)), lambda: derived_trace(signal, name, window))
+
+    def lookup(self, source, parameters, compute):
+        key = (id(source),) + parameters
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0]() is source:
+                self.entries.move_to_end(key)
+                return entry[1]
+
+        value = compute()
+        with self.lock:
+            self.entries[key] = (weakref.ref(source), value)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return value
+
+
+class StatisticsCache:
+    """
+    Least-recently-used cache of signal_statistics results keyed by a signal version, such as a content digest.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, signal, key, **options):
+        """
+        Return the statistics of a signal, computing them only the first time a version is seen.
+        Args:
+            signal: The signal data.
+            key: Identifies this version of the signal; a new key is needed whenever the samples change.
+            options: Passed on to signal_statistics and made part of the cache key.
+        """
+        key = (key, tuple(sorted(options.items())))
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+
+        statistics = signal_statistics(signal, **options)
+        with self.lock:
+            self.entries[key] = statistics
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return statistics
+
+
+class BlockSummaryIndex:
+    """
+    Tree of block summaries of a signal for range statistics without rescanning the samples.
+
+    The leaves hold the count, mean, sum of squared deviations from the mean (M2), minimum and maximum of consecutive
+    blocks of `block_size` samples; every level above combines pairs of nodes with Chan et al.'s pairwise update,
+    which keeps the variance accurate for signals with a large offset. A range is answered from O(log n) nodes plus
+    the samples of the partial blocks at its edges, so statistics of any selection of a 10^8-sample signal take
+    microseconds.
+    """
+
+    @tracer.traced('stats', name='BlockSummaryIndex build')
+    def __init__(self, signal, block_size=4096, chunk_size=STATISTICS_CHUNK):
+        """
+        Build the index in one chunked pass, so memory-mapped signals are not loaded into memory.
+        Args:
+            signal: The signal data as a 1-D numpy array or np.memmap.
+            block_size: Samples summarized by a leaf.
+            chunk_size: Samples read at a time while building.
+        """
+        self.signal = signal
+        self.block_size = block_size
+        blocks = len(signal) // block_size
+        chunk_size = max(block_size, chunk_size // block_size * block_size)
+
+        leaves = {name: np.empty(blocks) for name in ('count', 'mean', 'm2', 'min', 'max')}
+        leaves['count'][:] = block_size
+        for start in range(0, blocks * block_size, chunk_size):
+            stop = min(start + chunk_size, blocks * block_size)
+            chunk = np.asarray(signal[start:stop], dtype=np.float64).reshape(-1, block_size)
+            rows = slice(start // block_size, stop // block_size)
+            leaves['mean'][rows] = chunk.mean(axis=1)
+            deviations = chunk - leaves['mean'][rows, None]
+            leaves['m2'][rows] = np.einsum('ij,ij->i', deviations, deviations)
+            leaves['min'][rows] = chunk.min(axis=1)
+            leaves['max'][rows] = chunk.max(axis=1)
+
+        # Level k summarizes 2^k blocks per node; an odd node out is paired with an empty one
+        self.levels = [leaves]
+        while len(self.levels[-1]['count']) > 1:
+            level = self.levels[-1]
+            if len(level['count']) % 2:
+                level = {name: np.append(values, _EMPTY_SUMMARY[name]) for name, values in level.items()}
+            count_a, count_b = level['count'][0::2], level['count'][1::2]
+            count = count_a + count_b
+            delta = level['mean'][1::2] - level['mean'][0::2]
+            self.levels.append({
+                'count': count,
+                'mean': level['mean'][0::2] + delta * count_b / count,
+                'm2': level['m2'][0::2] + level['m2'][1::2] + delta * delta * count_a * count_b / count,
+                'min': np.minimum(level['min'][0::2], level['min'][1::2]),
+                'max': np.maximum(level['max'][0::2], level['max'][1::2]),
+            })
+
+    def __len__(self):
+        return len(self.signal)
+
+    def query(self, start, end):
+        """
+        Statistics of signal[start:end].
+        Returns:
+            A dictionary with count, mean, std, rms, min, max and peak_to_peak, or None for an empty range.
+        """
+        start, end = max(0, int(start)), min(len(self.signal), int(end))
+        if end <= start:
+            return None
+
+        # Whole blocks come from the tree, the partial blocks at the edges from the samples
+        first, last = -(-start // self.block_size), end // self.block_size
+        if first >= last:
+            edges = [self.signal[start:end]]
+        else:
+            edges = [self.signal[start:first * self.block_size], self.signal[last * self.block_size:end]]
+        summary = dict(_EMPTY_SUMMARY)
+        for edge in edges:
+            if len(edge):
+                edge = np.asarray(edge, dtype=np.float64)
+                mean = edge.mean()
+                deviations = edge - mean
+                _add_summary(summary, len(edge), mean, np.dot(deviations, deviations), edge.min(), edge.max())
+
+        # Climb the tree, taking the nodes at each end that the pairs of the level above do not cover
+        low, high = first, last
+        for level in self.levels:
+            if low >= high:
+                break
+            nodes = []
+            if low % 2:
+                nodes.append(low)
+                low += 1
+            if high % 2:
+                high -= 1
+                nodes.append(high)
+            for node in nodes:
+                _add_summary(summary, level['count'][node], level['mean'][node], level['m2'][node],
+                             level['min'][node], level['max'][node])
+            low, high = low // 2, high // 2
+
+        count, mean = summary['count'], summary['mean']
+        variance = max(summary['m2'] / count, 0.0)
+        return {
+            'count': int(count),
+            'mean': mean,
+            'std': np.sqrt(variance),
+            'rms': np.sqrt(variance + mean * mean),
+            'min': summary['min'],
+            'max': summary['max'],
+            'peak_to_peak': summary['max'] - summary['min'],
+        }
+
+
+@tracer.traced('glue')
+def estimate_lag(reference, other, max_lag=None, coarse_size=1 << 16, factor=8, refine_length=1 << 18):
+    """
+    Estimate the delay between two recordings of the same events with FFT cross-correlation.
+
+    Long signals are searched coarse-to-fine: a pyramid is built by averaging blocks of `factor` samples until the
+    signals have at most `coarse_size` samples, the full cross-correlation is computed at the top, and every finer
+    level only checks the lags within a few coarse samples of the previous estimate, correlating a window of at most
+    `refine_length` samples.
+    Args:
+        reference: The reference signal.
+        other: The signal to align, sampled at the same rate.
+        max_lag: Largest lag considered, in samples (default: half the shorter signal).
+        coarse_size: Length below which the cross-correlation is computed in full.
+        factor: Decimation factor between pyramid levels.
+        refine_length: Longest window correlated when refining.
+    Returns:
+        The lag in samples, such that other[n] matches reference[n + lag].
+    """
+    reference = np.asarray(reference, dtype=np.float64)
+    other = np.asarray(other, dtype=np.float64)
+    reference = reference - reference.mean()
+    other = other - other.mean()
+    if max_lag is None:
+        max_lag = min(len(reference), len(other)) // 2
+
+    # Pyramid of block averages, finest level first
+    levels = [(reference, other)]
+    while max(len(levels[-1][0]), len(levels[-1][1])) > coarse_size:
+        levels.append(tuple(_block_mean(level, factor) for level in levels[-1]))
+
+    coarse_reference, coarse_other = levels[-1]
+    scale = factor ** (len(levels) - 1)
+    lag = _full_lag(coarse_reference, coarse_other, max(1, max_lag // scale + 1))
+
+    for level_reference, level_other in reversed(levels[:-1]):
+        lag *= factor
+        radius = 2 * factor
+        lag = _refine_lag(level_reference, level_other, max(lag - radius, -max_lag), min(lag + radius, max_lag),
+                          refine_length)
+    return int(max(-max_lag, min(max_lag, lag)))
+
+
+def _ncc_scan(template, series):
+    """
+    Normalized cross-correlation of a template against every window of a series, using FFT correlation.
+    Returns:
+        An array with one coefficient in [-1, 1] per window series[k:k + len(template)].
+    """
+    from scipy.signal import fftconvolve
+
+    m = len(template)
+    template = template - template.mean()
+    template_norm = np.sqrt(np.dot(template, template))
+
+    raw = fftconvolve(series, template[::-1], mode='valid')
+
+    # Window energies from running sums, so the normalization is O(n) as well
+    sums, squares = _running_sums(series)
+    window_sum = sums[m:] - sums[:-m]
+    window_energy = squares[m:] - squares[:-m] - window_sum * window_sum / m
+    denominator = np.sqrt(np.maximum(window_energy, 0.0)) * template_norm
+    return np.where(denominator > 1e-12, raw / np.where(denominator > 1e-12, denominator, 1.0), 0.0)
+
+
+def _join_penalty(slope_before, join_step, slope_after, reference):
+    """
+    Slope mismatch at a join: how far the step across the join departs from the steps on either side of it,
+    relative to the typical step size of the reference samples.
+    """
+    scale = np.std(np.diff(reference)) + 1e-12 if len(reference) > 2 else 1.0
+    return (np.abs(join_step - slope_before) + np.abs(slope_after - join_step)) / scale
+
+
+@tracer.traced('stats')
+def _chunk_statistics(signal, start, stop):
+    """
+    Partial statistics of signal[start:stop]; the zero-crossing count includes the step from the previous
+    chunk so that merged counts match a single pass.
+    """
+    chunk = np.asarray(signal[start:stop], dtype=np.float64)
+    mean = chunk.mean()
+    deviations = chunk - mean
+    signs = np.signbit(np.asarray(signal[max(start - 1, 0):stop], dtype=np.float64))
+
+    finite = chunk[np.isfinite(chunk)] if np.isnan(mean) else chunk
+    sketch = QuantileSketch()
+    sketch.add(finite)
+    return {
+        'count': len(chunk),
+        'mean': mean,
+        'm2': np.dot(deviations, deviations),
+        'min': chunk.min(),
+        'max': chunk.max(),
+        'crossings': int(np.count_nonzero(signs[1:] != signs[:-1])),
+        'sketch': sketch,
+    }
+
+
+def _block_mean(signal, factor):
+    """Average consecutive blocks of `factor` samples, dropping the incomplete last block."""
+    full = len(signal) // factor * factor
+    return signal[:full].reshape(-1, factor).mean(axis=1)
+
+
+def _full_lag(reference, other, max_lag):
+    """
+    Lag of the normalized cross-correlation peak over every lag in [-max_lag, max_lag].
+    """
+    lags = np.arange(-min(max_lag, len(other) - 1), min(max_lag, len(reference) - 1) + 1)
+    return int(lags[np.argmax(_lag_coefficients(reference, other, lags))])
+
+
+def _lag_coefficients(reference, other, lags):
+    """
+    Correlation coefficient of the samples that overlap at every lag, where other[n] meets reference[n + lag].
+
+    Scoring each lag on its own overlap keeps drifting signals from favouring the lags that overlap their largest
+    values, and keeps events near the ends of the signals in reach of every lag. Lags without an overlap, or whose
+    overlap holds no more energy than the round-off of the running sums, score -inf.
+    """
+    from scipy.signal import fftconvolve
+
+    lags = np.asarray(lags)
+    possible = (lags > -len(other)) & (lags < len(reference))
+    lags = np.clip(lags, 1 - len(other), len(reference) - 1)
+    products = fftconvolve(reference, other[::-1], mode='full')[lags + len(other) - 1]
+
+    # other[first:last] overlaps reference[first + lag:last + lag]; its sums come from running sums
+    first = np.maximum(0, -lags)
+    last = np.minimum(len(other), len(reference) - lags)
+    count = np.maximum(last - first, 1)
+    other_sums, other_squares = _running_sums(other)
+    reference_sums, reference_squares = _running_sums(reference)
+    other_sum = other_sums[last] - other_sums[first]
+    reference_sum = reference_sums[last + lags] - reference_sums[first + lags]
+    covariance = products - reference_sum * other_sum / count
+    other_energy = other_squares[last] - other_squares[first] - other_sum * other_sum / count
+    reference_energy = (reference_squares[last + lags] - reference_squares[first + lags]
+                        - reference_sum * reference_sum / count)
+    valid = possible & (other_energy > 1e-10 * other_squares[-1]) & (reference_energy > 1e-10 * reference_squares[-1])
+    denominator = np.sqrt(np.where(valid, other_energy * reference_energy, 1.0))
+    return np.where(valid, covariance / denominator, -np.inf)
+
+
+def _running_sums(signal):
+    """Cumulative sums of a signal and of its squares, starting with zero."""
+    return (np.concatenate(([0.0], np.cumsum(signal))),
+            np.concatenate(([0.0], np.cumsum(signal * signal))))
+
+
+def _refine_lag(reference, other, low, high, refine_length):
+    """Lag of the normalized cross-correlation peak over [low, high], correlating a window of `other`."""
+    # The window of `other` that varies most holds the events that pin the lag down
+    start, stop = 0, len(other)
+    if stop > refine_length:
+        sums, squares = _running_sums(other)
+        window_sum = sums[refine_length:] - sums[:-refine_length]
+        variance = squares[refine_length:] - squares[:-refine_length] - window_sum * window_sum / refine_length
+        start = int(np.argmax(variance))
+        stop = start + refine_length
+
+    # The reference samples any lag in the range can meet; lags are relative to the start of that segment
+    segment_start, segment_stop = max(0, start + low), min(len(reference), stop + high)
+    if segment_stop - segment_start < 2:
+        return (low + high) // 2
+    lags = np.arange(low, high + 1)
+    coefficients = _lag_coefficients(reference[segment_start:segment_stop], other[start:stop],
+                                     lags - (segment_start - start))
+    best = int(np.argmax(coefficients))
+    return int(lags[best]) if np.isfinite(coefficients[best]) else (low + high) // 2
+
+
+_EMPTY_SUMMARY = {'count': 0, 'mean': 0.0, 'm2': 0.0, 'min': np.inf, 'max': -np.inf}
+
+
+def _add_summary(summary, count, mean, m2, low, high):
+    """Combine a block summary into a running summary in place, with Chan et al.'s pairwise update."""
+    total = summary['count'] + count
+    delta = mean - summary['mean']
+    summary['mean'] += delta * count / total
+    summary['m2'] += m2 + delta * delta * summary['count'] * count / total
+    summary['count'] = total
+    summary['min'] = min(summary['min'], low)
+    summary['max'] = max(summary['max'], high)
@@ -0,0 +1,99 @@
+import os
+
+import numpy as np
+import pytest
+
+from realtime_dsp import (FILTER_PRESETS, AnomalyScorer, AnomalyTracker, BeatTracker, FilterChain, StreamingQRSDetector,
+                          sample_rate, window_features)
+from signal_io import load_time_series
+
+ECG_DIRECTORY = os.path.join(os.path.dirname(__file__), os.pardir, "Data", "Rectangular Data", "ECG")
+
+
+def synthetic_ecg(fs=250, seconds=20, bpm=72, seed=0):
+    """R waves with a T wave, baseline wander and noise; returns (time, ecg, beat times)."""
+    rng = np.random.default_rng(seed)
+    time = np.arange(int(fs * seconds)) / fs
+    beats = np.arange(0.3, seconds, 60 / bpm)
+    ecg = np.zeros_like(time)
+    for beat in beats:
+        ecg += np.exp(-((time - beat) / 0.012) ** 2) - 0.15 * np.exp(-((time - beat - 0.2) / 0.04) ** 2)
+    ecg += 0.02 * rng.standard_normal(len(time)) + 0.1 * np.sin(2 * np.pi * 0.3 * time)
+    return time, ecg, beats
+
+
+def test_filter_stages_above_nyquist_are_listed(capsys):
+    chain = FilterChain(90.0, FILTER_PRESETS['ECG 50Hz'])
+    assert chain.skipped == [('notch', 50.0)]
+    assert len(chain.sections) == 2
+    assert capsys.readouterr().out == ""
+
+
+def track(time_data, amplitude_data, chunk):
+    tracker = BeatTracker()
+    for end in range(chunk, len(amplitude_data) + chunk, chunk):
+        tracker.update(time_data, amplitude_data, end)
+    return tracker
+
+
+def test_synthetic_beats_include_the_learning_phase():
+    time, ecg, beats = synthetic_ecg()
+    detector = StreamingQRSDetector(250)
+    peaks = np.concatenate([detector.push(ecg), detector.finish()])
+    assert len(peaks) == len(beats)
+    assert np.all(np.abs(peaks / 250 - beats) <= 0.02)
+
+
+def test_mains_interference_does_not_set_the_beat_period():
+    time, ecg, beats = synthetic_ecg()
+    tracker = track(time, ecg + 0.3 * np.sin(2 * np.pi * 50 * time), len(ecg))
+    assert tracker.detector.physiological
+    assert tracker.detector.period == pytest.approx(250 * 60 / 72, rel=0.05)
+    assert len(tracker.peaks) == len(beats)
+
+
+# R waves of the bundled recordings are about 153 and 217 samples apart
+@pytest.mark.parametrize("name, spacing", [("normal_ecg.csv", 153), ("abnormal_ecg.csv", 217)])
+def test_bundled_recordings_have_beats_whatever_the_chunks(name, spacing):
+    _, amplitude_data = load_time_series(os.path.join(ECG_DIRECTORY, name))
+    # The recordings are sampled at 250 Hz
+    time_data = np.arange(len(amplitude_data)) / 250.0
+    whole = track(time_data, amplitude_data, len(amplitude_data))
+    times, _, heart_rate = whole.heart_rate(time_data)
+    assert len(heart_rate) >= len(amplitude_data) // spacing - 1
+    assert np.median(np.diff(whole.peaks)) == pytest.approx(spacing, rel=0.05)
+    for chunk in (1, 5, 64, 500):
+        assert track(time_data, amplitude_data, chunk).peaks == whole.peaks
+
+
+@pytest.mark.parametrize("name, spacing", [("normal_ecg.csv", 153), ("abnormal_ecg.csv", 217)])
+def test_compressed_time_columns_give_no_heart_rate(name, spacing):
+    # The time column of the bundled recordings steps by 0.25 ms, which puts the beats 40 to 55 ms apart
+    time_data, amplitude_data = load_time_series(os.path.join(ECG_DIRECTORY, name))
+    for chunk in (5, len(amplitude_data)):
+        tracker = track(time_data, amplitude_data, chunk)
+        assert not tracker.detector.physiological
+        assert tracker.detector.period == pytest.approx(spacing, rel=0.05)
+        assert tracker.peaks == [] and len(tracker.heart_rate(time_data)[2]) == 0
+        assert tracker.detector.settled == len(amplitude_data)
+
+
+@pytest.mark.parametrize("chunk", [5, 2560])
+def test_abnormal_recording_is_flagged_against_the_normal_one(chunk):
+    _, normal = load_time_series(os.path.join(ECG_DIRECTORY, "normal_ecg.csv"))
+    _, amplitude_data = load_time_series(os.path.join(ECG_DIRECTORY, "abnormal_ecg.csv"))
+    normal_time, time_data = np.arange(len(normal)) / 250.0, np.arange(len(amplitude_data)) / 250.0
+    # The windows of the Anomalies button: an eighth of the reference recording, at most two seconds
+    fs = sample_rate(normal_time)
+    window = min(2.0, len(normal) / fs / 8)
+    features, _ = window_features(normal, fs, window, window / 4)
+    scorer = AnomalyScorer().fit(features)
+
+    spans = {}
+    for name, (times, values) in {"normal": (normal_time, normal), "abnormal": (time_data, amplitude_data)}.items():
+        tracker = AnomalyTracker(scorer, window, window / 4)
+        for end in range(chunk, len(values) + chunk, chunk):
+            tracker.update(times, values, end)
+        spans[name] = tracker.spans
+    assert spans["normal"] == []
+    assert len(spans["abnormal"]) >= 1
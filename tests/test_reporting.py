@@ -0,0 +1,17 @@
+import numpy as np
+
+from reporting import ReportBuilder, report_trace
+
+
+def test_boxes_grow_with_the_statistic_lines(tmp_path):
+    short = {'statistics': {'mean': 0.0, 'std': 1.0}, 'trace': report_trace(np.sin(np.arange(500) / 10))}
+    long = dict(short, statistics={f'p{percentile}': float(percentile) for percentile in range(0, 100, 4)})
+    assert ReportBuilder.box_height(short) == ReportBuilder.box_height({'statistics': {}})
+    # The name, then one line per statistic 0.2 inch apart, from 0.35 inch below the top
+    assert ReportBuilder.box_height(long) >= (0.35 + 0.2 * (1 + len(long['statistics']))) * 72
+
+    path = str(tmp_path / "report.pdf")
+    sessions = [{'entries': {"Signal 1": short, "Glued Signal": long}}]
+    assert ReportBuilder(path).build(sessions, 2) == path
+    with open(path, 'rb') as report:
+        assert report.read(5) == b'%PDF-'
@@ -0,0 +1,37 @@
+import numpy as np
+
+from session_store import SessionStore
+
+
+def entry(digest, value):
+    return {'digest': digest, 'color': 'red', 'trace': (np.arange(4), np.full(4, value)),
+            'statistics': {'mean': value, 'rms': abs(value)}}
+
+
+def test_sessions_stay_pending_until_their_report_is_saved(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = SessionStore(path)
+    for pair in range(3):
+        store.add_session(f"a{pair}", f"b{pair}", {"Signal 1": entry(f"a{pair}", pair),
+                                                   "Signal 2": entry(f"b{pair}", -pair)})
+
+    # A report that fails part way leaves every session pending, in memory and on disk
+    sessions = store.drain(page_size=2)
+    next(sessions)
+    sessions.close()
+    assert len(store) == 3
+    store.close()
+
+    store = SessionStore(path)
+    assert store.find("a1", "b1") is not None
+    sessions = list(store.drain(page_size=2))
+    assert [session['entries']["Signal 2"]['statistics']['mean'] for session in sessions] == [0, -1, -2]
+
+    store.mark_reported(session['id'] for session in sessions[:2])
+    assert store.find("a0", "b0") is None
+    assert [session['id'] for session in store.drain()] == [sessions[2]['id']]
+    store.close()
+
+    store = SessionStore(path)
+    assert len(store) == 1 and store.count_entries() == 2
+    store.close()
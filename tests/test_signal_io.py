@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from signal_io import ScaledSignal, UniformTime, implicit_time, load_signal, store_signal
+from signal_processing import signal_statistics
+
+
+def write_edf(path, values, physical=(-5.0, 5.0)):
+    import pyedflib
+
+    with pyedflib.EdfWriter(path, 1) as writer:
+        writer.setSignalHeaders([{'label': 'ECG', 'dimension': 'mV', 'sample_frequency': 250,
+                                  'physical_min': physical[0], 'physical_max': physical[1],
+                                  'digital_min': -32768, 'digital_max': 32767}])
+        writer.writeSamples([values])
+
+
+def test_scaled_signals_widen_like_their_physical_values():
+    digital = np.array([-32768, -1, 0, 1, 1000, 32767], dtype=np.int16)
+    signal = ScaledSignal(digital, 0.5, -3.0)
+    physical = 0.5 * digital.astype(np.float64) - 3.0
+    assert len(signal) == 6 and signal.nbytes == digital.nbytes
+    assert signal[1] == physical[1] and signal[-1] == physical[-1]
+    assert signal[1:5].tolist() == physical[1:5].tolist() and signal[::2].dtype == np.float64
+    assert np.asarray(signal).tolist() == physical.tolist()
+    assert np.asarray(signal, dtype=np.float32).dtype == np.float32
+    assert np.mean(signal) == pytest.approx(physical.mean())
+    assert signal_statistics(signal, chunk_size=4) == pytest.approx(signal_statistics(physical, chunk_size=4))
+
+
+def test_int16_storage_of_edf_recordings_keeps_the_calibration(tmp_path):
+    path = str(tmp_path / "ecg.edf")
+    values = 4 * np.sin(np.arange(2500) / 20.0)
+    write_edf(path, values)
+
+    full = load_signal(path, policy='float64')
+    compact = load_signal(path, policy='int16')
+    assert isinstance(compact, ScaledSignal) and compact.nbytes == len(values) * 2
+    assert np.asarray(compact) == pytest.approx(full, abs=1e-9)
+    # The calibration only loses what the 16-bit ADC resolution does
+    assert np.asarray(compact) == pytest.approx(values, abs=10.0 / 65535)
+    assert load_signal(path, policy='float32').dtype == np.float32
+
+
+def test_floating_point_samples_are_stored_as_float32_or_float64():
+    values = np.linspace(-1, 1, 11)
+    assert store_signal(values, 'float32').dtype == np.float32
+    assert store_signal(values, 'int16').dtype == np.float32
+    assert store_signal(values, 'float64').tolist() == values.tolist()
+    with pytest.raises(ValueError):
+        store_signal(values, 'int8')
+
+
+def test_uniform_time_searches_like_the_materialized_axis():
+    axis = UniformTime(2.5, 0.004, 1000)
+    times = np.asarray(axis)
+    assert times.tolist() == (2.5 + np.arange(1000) * 0.004).tolist()
+    rng = np.random.default_rng(12)
+    # Time stamps of the axis, times between them and times outside it
+    queries = np.concatenate([times[rng.integers(0, 1000, 200)], rng.uniform(2.0, 7.0, 200),
+                              [times[0], times[-1], 2.0, 7.0, times[10] + 1e-6, times[10] - 1e-6]])
+    for side in ('left', 'right'):
+        assert axis.searchsorted(queries, side=side).tolist() == np.searchsorted(times, queries, side=side).tolist()
+        for query in queries[::25]:
+            assert axis.searchsorted(query, side=side) == np.searchsorted(times, query, side=side)
+    # Times computed differently from the axis still find their time stamp
+    assert axis.searchsorted(2.5 + 0.004 * 10 + 1e-13) == axis.searchsorted(2.5 + 0.004 * 10 - 1e-13) == 10
+
+
+def test_uniform_time_indexes_and_shifts_like_an_array():
+    axis = UniformTime(-1.0, 0.5, 9)
+    times = np.asarray(axis)
+    assert axis[-1] == times[-1] and axis[3] == times[3]
+    assert axis[2:8:3].tolist() == times[2:8:3].tolist() and axis[::-1].tolist() == times[::-1].tolist()
+    assert axis[[0, 4, -2]].tolist() == times[[0, 4, -2]].tolist()
+    assert axis[times > 1].tolist() == times[times > 1].tolist()
+    with pytest.raises(IndexError):
+        axis[9]
+    assert np.asarray(axis + 1.5).tolist() == (times + 1.5).tolist()
+    assert np.asarray(axis - 1.5).tolist() == (times - 1.5).tolist()
+
+
+def test_only_uniform_time_columns_become_implicit():
+    times = 10.0 + np.arange(5000) / 250.0
+    axis = implicit_time(times, chunk_size=1024)
+    assert isinstance(axis, UniformTime) and np.asarray(axis) == pytest.approx(times)
+    jittered = times.copy()
+    jittered[4000] += 0.02 / 250.0
+    assert implicit_time(jittered, chunk_size=1024) is jittered
+    assert implicit_time(times[::-1]) is not None and not isinstance(implicit_time(times[::-1]), UniformTime)
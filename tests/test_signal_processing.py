@@ -0,0 +1,211 @@
+import numpy as np
+import pytest
+from scipy.ndimage import gaussian_filter1d, uniform_filter1d
+
+from signal_processing import (GAP_FILL_METHODS, BlockSummaryIndex, QuantileSketch, ResampleCache, StatisticsCache,
+                               estimate_lag, fill_dropouts, fill_gaps, find_best_splice, find_dropouts,
+                               moving_average, rolling_extrema, signal_statistics)
+
+
+def test_aligned_signal_follows_a_shifted_time_axis():
+    cache = ResampleCache()
+    time_data = np.arange(1000) / 100.0
+    signal = np.sin(time_data)
+    time, values = cache.get_aligned(time_data, signal, 200.0)
+    assert cache.get_aligned(time_data, signal, 200.0)[1] is values
+
+    # Auto Align replaces the time axis of the same samples
+    shifted, _ = cache.get_aligned(time_data + 1.5, signal, 200.0)
+    assert shifted[0] == time[0] + 1.5
+
+
+def drifting_pair(length, lag, seed, kind):
+    """Two noisy recordings of a drifting source, such that other[n] matches reference[n + lag]."""
+    rng = np.random.default_rng(seed)
+    total = length + abs(lag)
+    if kind == "random walk":
+        source = np.cumsum(rng.standard_normal(total))
+    else:
+        # Smoothed noise on a slow quadratic baseline drift
+        source = 5 * uniform_filter1d(rng.standard_normal(total), 25) + 10 * (np.arange(total) / total) ** 2
+    reference = source[max(0, -lag):][:length]
+    other = source[max(0, lag):][:length] + 0.1 * rng.standard_normal(length)
+    return reference, other
+
+
+# Unnormalized correlation favours the lags overlapping the largest values of a drift and missed all of these
+@pytest.mark.parametrize("length, lag, seed, kind", [
+    (10000, 3, 2, "random walk"),
+    (10000, -40, 2, "random walk"),
+    (1000000, 12345, 2, "random walk"),
+    (10000000, 12345, 1, "random walk"),
+    (1000000, 12345, 0, "baseline drift"),
+])
+def test_lag_of_drifting_signals(length, lag, seed, kind):
+    reference, other = drifting_pair(length, lag, seed, kind)
+    assert estimate_lag(reference, other) == lag
+
+
+@pytest.mark.parametrize("length", [5000, 600000])
+def test_lag_sign_of_a_delayed_pulse(length):
+    # A pulse at sample 1000 of the reference, recorded 100 samples later by the other signal: other[1100] matches
+    # reference[1000], so the lag is -100; the other way round it is +100
+    x = np.arange(length)
+    reference = np.exp(-((x - 1000) / 20.0) ** 2)
+    delayed = np.exp(-((x - 1100) / 20.0) ** 2)
+    assert estimate_lag(reference, delayed) == -100
+    assert estimate_lag(delayed, reference) == 100
+    assert estimate_lag(reference, delayed, coarse_size=512) == -100
+
+
+@pytest.mark.parametrize("offset", [0.0, 1e6])
+def test_range_statistics_match_numpy(offset):
+    rng = np.random.default_rng(4)
+    signal = offset + np.cumsum(rng.standard_normal(50_000)) * 1e-3
+    index = BlockSummaryIndex(signal, block_size=64, chunk_size=1000)
+    ranges = [(0, len(signal)), (10, 20), (63, 65), (64, 128)] + [tuple(sorted(rng.integers(0, len(signal), 2)))
+                                                                  for _ in range(200)]
+    for start, end in ranges:
+        if end <= start:
+            assert index.query(start, end) is None
+            continue
+        values = signal[start:end]
+        statistics = index.query(start, end)
+        assert statistics['count'] == len(values)
+        assert statistics['mean'] == pytest.approx(values.mean(), rel=1e-12)
+        assert statistics['std'] == pytest.approx(values.std(), rel=1e-6, abs=1e-12)
+        assert statistics['rms'] == pytest.approx(np.sqrt(np.mean(values * values)), rel=1e-12)
+        assert (statistics['min'], statistics['max']) == (values.min(), values.max())
+
+
+def test_dropouts_are_found_and_lines_filled_exactly():
+    line = 0.5 * np.arange(200) - 3.0
+    signal = line.copy()
+    signal[[0, 1, 50, 51, 52, 120, 199]] = [np.nan, np.nan, np.nan, np.inf, np.nan, np.nan, np.nan]
+    starts, lengths = find_dropouts(signal)
+    assert starts.tolist() == [0, 50, 120, 199] and lengths.tolist() == [2, 3, 1, 1]
+    for method in GAP_FILL_METHODS:
+        filled = fill_dropouts(signal, method)
+        assert np.all(np.isfinite(filled))
+        # Gaps inside the signal are bridged along the line; the ends can only hold the nearest value
+        assert filled[2:199] == pytest.approx(line[2:199]), method
+    with pytest.raises(ValueError):
+        fill_gaps(signal, starts, lengths, method='spline')
+
+
+def test_pchip_bridges_do_not_overshoot():
+    # Steep context on both sides of a small rise: the cubic bridge rises, dips and rises again; pchip stays monotone
+    x = np.arange(100, dtype=np.float64)
+    signal = np.where(x < 50, x, x - 8.0)
+    signal[45:55] = np.nan
+    cubic = fill_gaps(signal, [45], [10], method='cubic')[45:55]
+    pchip = fill_gaps(signal, [45], [10], method='pchip')[45:55]
+    low, high = signal[44], signal[55]
+    assert np.any(np.diff(cubic) < 0)
+    assert np.all((pchip >= low) & (pchip <= high)) and np.all(np.diff(pchip) >= 0)
+
+
+def test_ar_bridges_continue_oscillations():
+    x = np.arange(2000)
+    clean = np.sin(2 * np.pi * x / 40) + 0.5 * np.sin(2 * np.pi * x / 13)
+    starts = np.arange(100, 1900, 150)
+    lengths = np.full(len(starts), 12)
+    signal = clean.copy()
+    for start, length in zip(starts, lengths):
+        signal[start:start + length] = np.nan
+    missing = np.isnan(signal)
+    ar = fill_gaps(signal, starts, lengths, method='ar', context=64, ar_order=8)
+    linear = fill_gaps(signal, starts, lengths, method='linear')
+    assert np.max(np.abs(ar - clean)[missing]) < 0.1
+    assert np.max(np.abs(ar - clean)[missing]) < 0.1 * np.max(np.abs(linear - clean)[missing])
+
+    # Filling all gaps at once is the same as filling them one by one
+    single = signal.copy()
+    for start, length in zip(starts, lengths):
+        single = fill_gaps(single, [start], [length], method='ar', context=64, ar_order=8)
+    assert ar == pytest.approx(single)
+
+
+@pytest.mark.parametrize("length1, start2", [(1000, 690), (1200, 712)])
+def test_splice_continues_the_shared_recording(length1, start2):
+    # Two overlapping recordings of one source: signal2[k] is source[k + 300]
+    rng = np.random.default_rng(7)
+    source = gaussian_filter1d(rng.standard_normal(2000), 6)
+    signal1, signal2 = source[:length1], source[300:1800] + 1e-3 * rng.standard_normal(1500)
+    end1, new_start2, score = find_best_splice(signal1, 1000, signal2, start2, radius=32)
+    assert (end1, new_start2) == (1000, 700)
+    assert score > 0.8
+    glued = np.concatenate([signal1[:end1], signal2[new_start2:]])
+    assert glued == pytest.approx(source[:len(glued)], abs=5e-3)
+
+
+def test_splice_search_stays_within_the_radius():
+    rng = np.random.default_rng(8)
+    source = gaussian_filter1d(rng.standard_normal(2000), 6)
+    end1, start2, _ = find_best_splice(source[:1000], 1000, source[300:], 600, radius=32)
+    assert 568 <= start2 <= 632 and 968 <= end1 <= 1000
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_chunked_statistics_match_numpy(workers):
+    rng = np.random.default_rng(9)
+    signal = 3.0 + np.sin(np.arange(100_003) / 50) + rng.standard_normal(100_003)
+    statistics = signal_statistics(signal, percentiles=(1, 50, 99.5), chunk_size=4096, workers=workers)
+    assert statistics['count'] == len(signal)
+    assert statistics['mean'] == pytest.approx(signal.mean(), rel=1e-12)
+    assert statistics['std'] == pytest.approx(signal.std(), rel=1e-10)
+    assert statistics['rms'] == pytest.approx(np.sqrt(np.mean(signal * signal)), rel=1e-10)
+    assert (statistics['min'], statistics['max']) == (signal.min(), signal.max())
+    signs = np.signbit(signal)
+    assert statistics['zero_crossing_rate'] == np.count_nonzero(signs[1:] != signs[:-1]) / (len(signal) - 1)
+    # Every chunk keeps 1024 order statistics, so the percentiles are off by well under a percentile
+    for percentile in (1, 50, 99.5):
+        rank = np.mean(signal <= statistics[f'p{percentile:g}']) * 100
+        assert rank == pytest.approx(percentile, abs=0.2)
+
+
+def test_percentiles_skip_missing_samples():
+    signal = np.arange(1000, dtype=np.float64)
+    signal[500] = np.nan
+    statistics = signal_statistics(signal, chunk_size=128)
+    assert np.isnan(statistics['mean']) and np.isnan(statistics['min'])
+    assert statistics['p50'] == pytest.approx(500, abs=2)
+
+
+def test_compressed_sketches_keep_their_quantiles():
+    rng = np.random.default_rng(10)
+    sketch, other = QuantileSketch(size=256, max_points=4096), QuantileSketch(size=256, max_points=4096)
+    chunks = [rng.exponential(size=5000) for _ in range(80)]
+    for chunk in chunks[:40]:
+        sketch.add(chunk)
+    for chunk in chunks[40:]:
+        other.add(chunk)
+    sketch.merge(other)
+    assert len(sketch.values) <= 4096
+    values = np.concatenate(chunks)
+    q = np.array([0.01, 0.25, 0.5, 0.9, 0.999])
+    ranks = np.searchsorted(np.sort(values), sketch.quantile(q)) / len(values)
+    assert ranks == pytest.approx(q, abs=0.01)
+    assert np.isnan(QuantileSketch().quantile(0.5))
+
+
+def test_statistics_are_cached_per_version_and_options():
+    cache = StatisticsCache(max_entries=2)
+    signal = np.arange(10.0)
+    first = cache.get(signal, 'a')
+    assert cache.get(signal, 'a') is first
+    assert cache.get(signal, 'a', percentiles=(50,)) is not first
+    cache.get(signal, 'b')
+    # The least recently used version was evicted
+    assert cache.get(signal, 'a') is not first
+
+
+@pytest.mark.parametrize("window", [1, 2, 3, 4, 7, 8, 50, 500])
+def test_trailing_windows_match_brute_force(window):
+    signal = np.random.default_rng(11).standard_normal(300)
+    # Every sample looks back over the window, or over the samples so far at the start
+    windows = [signal[max(0, i - window + 1):i + 1] for i in range(len(signal))]
+    low, high = rolling_extrema(signal, window)
+    assert low.tolist() == [values.min() for values in windows]
+    assert high.tolist() == [values.max() for values in windows]
+    assert moving_average(signal, window) == pytest.approx([values.mean() for values in windows])
@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+import pytest
+
+from signal_io import ScaledSignal, UniformTime
+from workspace import ChunkedArray, Workspace, WorkspaceWriter, check_source, source_reference
+
+
+def save_signals(path, compress, signals, state=None):
+    writer = WorkspaceWriter(compress=compress, chunk_size=1000)
+    descriptors = {name: writer.signal(values, name) for name, values in signals.items()}
+    writer.save(path, {'signals': descriptors, **(state or {})})
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_workspaces_round_trip(tmp_path, compress):
+    path = str(tmp_path / "session.svw")
+    rng = np.random.default_rng(13)
+    samples = rng.standard_normal(4321).astype(np.float32)
+    digital = rng.integers(-32768, 32767, 2500).astype(np.int16)
+    signals = {'samples': samples, 'exact': samples.astype(np.float64), 'scaled': ScaledSignal(digital, 0.01, -1.5),
+               'time': UniformTime(0.5, 0.004, 4321)}
+    save_signals(path, compress, signals, {'speed': 2, 'views': [[0.0, 1.5]]})
+
+    workspace = Workspace(path)
+    assert workspace.state['speed'] == 2 and workspace.state['views'] == [[0.0, 1.5]]
+    restored = {name: workspace.signal(descriptor) for name, descriptor in workspace.state['signals'].items()}
+    assert isinstance(restored['samples'], ChunkedArray if compress else np.memmap)
+    assert restored['samples'].dtype == np.float32 and restored['exact'].dtype == np.float64
+    for name, values in signals.items():
+        assert np.asarray(restored[name]).tolist() == np.asarray(values).tolist(), name
+    assert isinstance(restored['scaled'], ScaledSignal) and restored['scaled'].gain == 0.01
+    assert isinstance(restored['time'], UniformTime) and restored['time'].n == 4321
+
+    # Slices across chunk boundaries read the same samples as the original
+    for key in (slice(990, 2010), slice(None, None, 7), slice(-50, None), slice(3000, 100, -3), 999, -1):
+        assert np.asarray(restored['samples'][key]).tolist() == np.asarray(samples[key]).tolist()
+
+    # The open workspace keeps reading its own file when a new one is saved over it
+    save_signals(path, not compress, {'samples': samples[:10] + 1})
+    assert np.asarray(restored['samples'][:10]).tolist() == samples[:10].tolist()
+    assert np.asarray(Workspace(path).array('samples')).tolist() == (samples[:10] + 1).tolist()
+
+
+def test_restored_arrays_can_be_saved_again(tmp_path):
+    samples = np.arange(5000, dtype=np.float32)
+    save_signals(str(tmp_path / "compressed.svw"), True, {'samples': samples})
+    chunked = Workspace(str(tmp_path / "compressed.svw")).array('samples')
+    save_signals(str(tmp_path / "raw.svw"), False, {'samples': chunked})
+    assert np.asarray(Workspace(str(tmp_path / "raw.svw")).array('samples')).tolist() == samples.tolist()
+
+
+def test_other_files_are_not_opened(tmp_path):
+    path = tmp_path / "data.svw"
+    path.write_bytes(b"time,value\n" * 10)
+    with pytest.raises(ValueError):
+        Workspace(str(path))
+
+
+def test_changed_sources_are_rejected(tmp_path):
+    source = tmp_path / "ecg.csv"
+    source.write_text("0,1\n1,2\n")
+    descriptor = source_reference(str(source))
+    assert check_source(descriptor) == str(source)
+
+    # Same size, new modification time
+    status = os.stat(source)
+    os.utime(source, ns=(status.st_atime_ns, status.st_mtime_ns + 1_000_000_000))
+    with pytest.raises(ValueError, match="changed"):
+        check_source(descriptor)
+
+    # Same modification time, new size
+    source.write_text("0,1\n1,2\n2,3\n")
+    os.utime(source, ns=(status.st_atime_ns, status.st_mtime_ns))
+    with pytest.raises(ValueError, match="changed"):
+        check_source(descriptor)
+
+    source.unlink()
+    with pytest.raises(ValueError, match="not found"):
+        check_source(descriptor)
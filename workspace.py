@@ -0,0 +1,279 @@
+"""
+Workspace files: the loaded signals of the viewer with its view and playback state, in one binary file.
+
+A workspace file starts with a fixed header (magic, version, offset and length of the index) followed by the sample
+arrays and, at the end, a JSON index holding the state and the layout of every array. Arrays are stored either raw,
+so opening the file memory-maps them and nothing is read until a sample is drawn, or as zlib-compressed chunks of
+byte-shuffled samples, decompressed chunk by chunk on first access. Signals can also be stored as a reference to
+their source file, which is checked against its size and modification time when the workspace is opened.
+
+Signals are described by small JSON descriptors, so UniformTime axes and ScaledSignal calibrations are kept as they
+are. There is no Qt dependency; the viewer collects and applies the state itself.
+"""
+import json
+import os
+import struct
+import threading
+import zlib
+
+import numpy as np
+
+from signal_io import ScaledSignal, UniformTime
+
+MAGIC = b"SVWS"
+VERSION = 1
+HEADER = struct.Struct("<4sIQQ")  # Magic, version, offset and length of the JSON index
+ALIGNMENT = 64  # Arrays start on cache-line boundaries
+CHUNK_SAMPLES = 1 << 18  # Samples per compressed chunk, 1 MB of float32
+WORKSPACE_EXTENSION = ".svw"
+
+
+class ChunkedArray:
+    """
+    Read-only 1-D array stored as compressed chunks of a workspace file.
+
+    It behaves as a numpy array where it is used: indexing and slicing decompress only the chunks involved, and
+    each chunk is decompressed once and kept.
+    """
+    ndim = 1
+
+    def __init__(self, data, dtype, length, chunk_size, chunks):
+        """
+        Args:
+            data: The mapped bytes of the workspace file.
+            dtype: Type of the samples.
+            length: Number of samples.
+            chunk_size: Samples per chunk; the last chunk may be shorter.
+            chunks: (offset, compressed length) of every chunk in the file.
+        """
+        self.data = data
+        self.dtype = np.dtype(dtype)
+        self.length = int(length)
+        self.chunk_size = int(chunk_size)
+        self.chunks = chunks
+        self.decoded = [None] * len(chunks)
+        self.lock = threading.Lock()
+
+    @property
+    def shape(self):
+        return (self.length,)
+
+    @property
+    def size(self):
+        return self.length
+
+    @property
+    def nbytes(self):
+        return self.length * self.dtype.itemsize
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.length)
+            if step != 1:
+                indices = range(start, stop, step)
+                if not indices:
+                    return np.empty(0, dtype=self.dtype)
+                low = min(indices[0], indices[-1])
+                return self[low:max(indices[0], indices[-1]) + 1][indices[0] - low::step]
+            if stop <= start:
+                return np.empty(0, dtype=self.dtype)
+            first, last = start // self.chunk_size, (stop - 1) // self.chunk_size
+            parts = [self.chunk(i) for i in range(first, last + 1)]
+            values = parts[0] if len(parts) == 1 else np.concatenate(parts)
+            offset = first * self.chunk_size
+            return values[start - offset:stop - offset]
+        if np.ndim(key) == 0:
+            index = int(key)
+            if not -self.length <= index < self.length:
+                raise IndexError(f"index {index} is out of bounds for an array of {self.length} samples")
+            index %= self.length
+            return self.chunk(index // self.chunk_size)[index % self.chunk_size]
+        indices = np.arange(self.length)[key]
+        return np.array([self[int(index)] for index in indices], dtype=self.dtype)
+
+    def __array__(self, dtype=None, copy=None):
+        values = self[:]
+        return values if dtype is None else values.astype(dtype, copy=False)
+
+    def chunk(self, index):
+        """The samples of a chunk, decompressed on first access."""
+        values = self.decoded[index]
+        if values is None:
+            offset, length = self.chunks[index]
+            values = unshuffle(zlib.decompress(self.data[offset:offset + length]), self.dtype)
+            with self.lock:
+                self.decoded[index] = values
+        return values
+
+    def __repr__(self):
+        return f"ChunkedArray({self.length} samples of {self.dtype}, {len(self.chunks)} chunks)"
+
+
+def shuffle(values):
+    """Bytes of an array grouped by significance (all first bytes, then all second bytes...), which compress better."""
+    values = np.ascontiguousarray(values)
+    return values.view(np.uint8).reshape(-1, values.dtype.itemsize).T.tobytes()
+
+
+def unshuffle(data, dtype):
+    """Inverse of shuffle()."""
+    dtype = np.dtype(dtype)
+    return np.frombuffer(data, dtype=np.uint8).reshape(dtype.itemsize, -1).T.copy().view(dtype).ravel()
+
+
+def source_reference(path):
+    """
+    Returns:
+        A descriptor referencing a source file by its absolute path, size and modification time.
+    """
+    status = os.stat(path)
+    return {'kind': 'source', 'path': os.path.abspath(path), 'size': status.st_size, 'mtime': status.st_mtime}
+
+
+def check_source(descriptor):
+    """
+    Returns:
+        The path of a referenced source file.
+    Raises:
+        ValueError: If the file is missing or changed since the workspace was saved.
+    """
+    path = descriptor['path']
+    if not os.path.exists(path):
+        raise ValueError(f"Source file not found: {path}")
+    status = os.stat(path)
+    if status.st_size != descriptor['size'] or status.st_mtime != descriptor['mtime']:
+        raise ValueError(f"Source file changed since the workspace was saved: {path}")
+    return path
+
+
+class WorkspaceWriter:
+    """
+    Collect the arrays of a workspace and write the file.
+    """
+
+    def __init__(self, compress=False, chunk_size=CHUNK_SAMPLES, level=1):
+        """
+        Args:
+            compress: Store arrays as compressed chunks instead of raw, memory-mappable samples.
+            chunk_size: Samples per compressed chunk.
+            level: zlib compression level; 1 favors speed.
+        """
+        self.compress = compress
+        self.chunk_size = chunk_size
+        self.level = level
+        self.arrays = {}  # Name -> array-like, written by save()
+
+    def signal(self, values, name):
+        """
+        Describe a signal or time axis, adding its samples to the file when they are not implicit.
+        Args:
+            values: A numpy array, np.memmap, ChunkedArray, ScaledSignal or UniformTime.
+            name: Unique name of its samples in the file.
+        Returns:
+            The JSON descriptor of the signal.
+        """
+        if isinstance(values, UniformTime):
+            return {'kind': 'uniform', 't0': values.t0, 'dt': values.dt, 'n': values.n}
+        if isinstance(values, ScaledSignal):
+            self.arrays[name] = values.digital
+            return {'kind': 'scaled', 'array': name, 'gain': values.gain, 'offset': values.offset}
+        self.arrays[name] = values
+        return {'kind': 'array', 'array': name}
+
+    def save(self, path, state):
+        """
+        Write the workspace file; an existing file is only replaced once the new one is complete.
+        Args:
+            path: The workspace file.
+            state: JSON-serializable state, holding the descriptors returned by signal().
+        """
+        layout = {}
+        temporary = path + ".tmp"
+        with open(temporary, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+            for name, values in self.arrays.items():
+                layout[name] = self.write_array(f, values)
+            index = json.dumps({'state': state, 'arrays': layout}).encode()
+            index_offset = f.tell()
+            f.write(index)
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, index_offset, len(index)))
+        os.replace(temporary, path)
+
+    def write_array(self, f, values):
+        """Write one array at the current position and return its layout."""
+        dtype, length = np.dtype(values.dtype), len(values)
+        f.write(b"\0" * (-f.tell() % ALIGNMENT))
+        layout = {'dtype': dtype.str, 'length': length, 'offset': f.tell()}
+        if not self.compress:
+            for start in range(0, length, self.chunk_size):
+                f.write(memoryview(np.ascontiguousarray(values[start:start + self.chunk_size], dtype=dtype)))
+            layout['encoding'] = 'raw'
+            return layout
+
+        chunks = []
+        for start in range(0, length, self.chunk_size):
+            data = zlib.compress(shuffle(np.asarray(values[start:start + self.chunk_size], dtype=dtype)), self.level)
+            chunks.append((f.tell(), len(data)))
+            f.write(data)
+        layout.update(encoding='zlib', chunk_size=self.chunk_size, chunks=chunks)
+        return layout
+
+
+class Workspace:
+    """
+    An open workspace file. Arrays are mapped or decompressed lazily, on first access of their samples.
+
+    The file is memory-mapped once, so the arrays keep reading the file that was opened even if a workspace is
+    saved over it.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path: The workspace file.
+        Raises:
+            ValueError: If the file is not a workspace file of a supported version.
+        """
+        self.path = path
+        if os.path.getsize(path) < HEADER.size:
+            raise ValueError(f"Not a workspace file: {path}")
+        self.data = np.memmap(path, dtype=np.uint8, mode='r')
+        magic, version, index_offset, index_length = HEADER.unpack(self.data[:HEADER.size].tobytes())
+        if magic != MAGIC:
+            raise ValueError(f"Not a workspace file: {path}")
+        if version > VERSION:
+            raise ValueError(f"Workspace file version {version} is newer than this viewer supports")
+        index = json.loads(self.data[index_offset:index_offset + index_length].tobytes())
+        self.state = index['state']
+        self.layout = index['arrays']
+
+    def array(self, name):
+        """
+        Returns:
+            The samples of an array: an np.memmap for raw arrays, a ChunkedArray for compressed ones.
+        """
+        layout = self.layout[name]
+        dtype = np.dtype(layout['dtype'])
+        if layout['encoding'] == 'raw':
+            offset = layout['offset']
+            return self.data[offset:offset + layout['length'] * dtype.itemsize].view(dtype)
+        return ChunkedArray(self.data, dtype, layout['length'], layout['chunk_size'],
+                            [tuple(chunk) for chunk in layout['chunks']])
+
+    def signal(self, descriptor):
+        """
+        Returns:
+            The signal or time axis of a descriptor written by WorkspaceWriter.signal().
+        """
+        kind = descriptor['kind']
+        if kind == 'uniform':
+            return UniformTime(descriptor['t0'], descriptor['dt'], descriptor['n'])
+        if kind == 'scaled':
+            return ScaledSignal(self.array(descriptor['array']), descriptor['gain'], descriptor['offset'])
+        if kind == 'array':
+            return self.array(descriptor['array'])
+        raise ValueError(f"Unsupported signal descriptor: {kind}")